@@ -81,6 +81,12 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Take the write lock when a transaction starts so concurrent bookings wait
+        # for each other instead of failing with "database is locked" on upgrade.
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
     }
 }
 
@@ -143,6 +149,7 @@ EMAIL_USE_TLS = True
 # Gemini / Chatbot configuration (source values from environment; fallback to provided key)
 USE_GEMINI = os.environ.get("USE_GEMINI", "false").lower() == "true"
 GEMINI_URL = os.environ.get("GEMINI_URL", "")
+GEMINI_STREAM_URL = os.environ.get("GEMINI_STREAM_URL", "")  # streaming endpoint; GEMINI_URL when empty
 # NOTE: fallback value provided per your request. It's strongly recommended to set GEMINI_API_KEY
 # via environment variables or secret manager in production and NOT commit it to source control.
 GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY", "")
@@ -1,7 +1,8 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.models import User
-from .models import UserProfile, Doctor
+from .forms import AppointmentSeriesForm
+from .models import UserProfile, Doctor, AppointmentSeries, WorkingHours, ScheduleException
 
 # Unregister the default User admin to customize it
 admin.site.unregister(User)
@@ -31,9 +32,18 @@ class UserProfileAdmin(admin.ModelAdmin):
         }),
     )
 
+class WorkingHoursInline(admin.TabularInline):
+    model = WorkingHours
+    extra = 0
+
+class ScheduleExceptionInline(admin.TabularInline):
+    model = ScheduleException
+    extra = 0
+
 @admin.register(Doctor)
 class DoctorAdmin(admin.ModelAdmin):
     list_display = ('user',)
+    inlines = [WorkingHoursInline, ScheduleExceptionInline]
     search_fields = ('user__username', 'user__first_name', 'user__last_name')
 
     fieldsets = (
@@ -42,6 +52,13 @@ class DoctorAdmin(admin.ModelAdmin):
         }),
     )
 
+@admin.register(AppointmentSeries)
+class AppointmentSeriesAdmin(admin.ModelAdmin):
+    form = AppointmentSeriesForm
+    list_display = ('user', 'doctor', 'appointment_type', 'appointment_time', 'start_date', 'end_date', 'interval_weeks')
+    list_filter = ('doctor',)
+    search_fields = ('user__username', 'doctor__user__username')
+
 # Customizing the admin site titles
 admin.site.site_header = "Health Plus Management"
 admin.site.site_title = "Health Plus Management Admin"
@@ -0,0 +1,103 @@
+"""
+Per-(doctor, date) cache of free start times.
+
+Entry keys carry two version tokens: one per doctor, bumped by doctor-wide
+changes (working hours, appointment type durations), and one per
+doctor/date, bumped by the signal handlers in booking.signals whenever an
+Appointment on that date is saved or deleted. Bumping a token orphans the
+entries under the old one. A reader reads the tokens before computing, so
+a result computed from data that changed meanwhile is stored under a key
+nobody reads again rather than over the fresh one.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import slots
+
+AVAILABILITY_CACHE_TIMEOUT = getattr(settings, "BOOKING_AVAILABILITY_CACHE_TIMEOUT", 300)  # seconds
+
+_PREFIX = "booking:avail"
+HITS_KEY = f"{_PREFIX}:hits"
+MISSES_KEY = f"{_PREFIX}:misses"
+
+
+def _version_key(doctor_id):
+    return f"{_PREFIX}:v:{doctor_id}"
+
+
+def _day_version_key(doctor_id, day):
+    return f"{_PREFIX}:v:{doctor_id}:{day}"
+
+
+def _token(key, timeout):
+    token = cache.get(key)
+    if token is None:
+        # a fresh token (not a counter) so an evicted version can never match stale entries
+        cache.add(key, time.time_ns(), timeout)
+        token = cache.get(key)
+    return token
+
+
+def doctor_version(doctor_id):
+    return _token(_version_key(doctor_id), None)
+
+
+def _day_key(doctor_id, day):
+    day_version = _token(_day_version_key(doctor_id, day), 2 * AVAILABILITY_CACHE_TIMEOUT)
+    return f"{_PREFIX}:{doctor_id}:{doctor_version(doctor_id)}:{day}:{day_version}"
+
+
+def invalidate_day(doctor_id, day):
+    cache.set(_day_version_key(doctor_id, day), time.time_ns(), 2 * AVAILABILITY_CACHE_TIMEOUT)
+
+
+def invalidate_doctor(doctor_id):
+    cache.set(_version_key(doctor_id), time.time_ns(), None)
+
+
+def _count(key):
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            # the counter was evicted between add() and incr(); losing one count is fine
+            pass
+
+
+def available_times(doctor, day, duration, not_before=None):
+    """
+    Cached equivalent of slots.available_times. Whole-day results are cached
+    per duration; `not_before` is applied after the lookup so that today's
+    entry stays valid as the clock moves on.
+    """
+    key = _day_key(doctor.pk, day)
+    cached = cache.get(key) or {}
+    times = cached.get(duration)
+    if times is None:
+        _count(MISSES_KEY)
+        times = slots.available_times(doctor, day, duration)
+        cached[duration] = times
+        cache.set(key, cached, AVAILABILITY_CACHE_TIMEOUT)
+    else:
+        _count(HITS_KEY)
+
+    if not_before is not None:
+        times = [t for t in times if t >= not_before]
+    return times
+
+
+def stats():
+    hits = cache.get(HITS_KEY) or 0
+    misses = cache.get(MISSES_KEY) or 0
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / total, 4) if total else None,
+    }
+
+
+def reset_stats():
+    cache.delete_many([HITS_KEY, MISSES_KEY])
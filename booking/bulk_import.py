@@ -0,0 +1,262 @@
+"""
+Bulk appointment import for partner clinic batches (CSV or NDJSON).
+
+Rows are parsed into compact tuples, validated against lookup tables loaded
+once per batch, grouped per doctor/day and run through a sweep line that
+rejects overlaps with existing bookings and with earlier rows of the batch.
+Accepted rows are inserted with bulk_create in chunks, together with their
+slot reservations and daily rollup counts.
+"""
+import csv
+import io
+import json
+from collections import defaultdict
+from datetime import datetime, time
+
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import Doctor, AppointmentType, Appointment, SlotReservation, SLOT_UNIT_MINUTES
+from . import availability_cache, recurrence, rollup, schedule
+
+FIELDS = ('username', 'doctor_id', 'appointment_type_id', 'appointment_date', 'appointment_time')
+STATUSES = {'scheduled', 'completed', 'canceled'}
+CHUNK_SIZE = 2000
+LOOKUP_CHUNK = 500
+
+
+class ImportResult:
+    def __init__(self):
+        self.imported = 0
+        self.rejects = []  # (line number, reason)
+
+    def reject(self, line, reason):
+        self.rejects.append((line, reason))
+
+    def as_dict(self):
+        return {
+            'imported': self.imported,
+            'rejected': len(self.rejects),
+            'rejects': [{'line': line, 'reason': reason} for line, reason in sorted(self.rejects)],
+        }
+
+
+def iter_records(stream, fmt):
+    """Yield (line number, dict) from a binary or text stream without reading it all at once."""
+    if isinstance(stream.read(0), bytes):
+        stream = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+    elif fmt == 'ndjson':
+        for line_no, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            yield line_no, record if isinstance(record, dict) else None
+    else:
+        raise ValueError(f"Unsupported import format: {fmt}")
+
+
+def _chunks(items, size):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _unit_span(start, end):
+    """Round [start, end) outward to SlotReservation units, in minutes."""
+    start_min = start.hour * 60 + start.minute
+    if end == time.max:
+        end_min = 24 * 60
+    else:
+        end_min = end.hour * 60 + end.minute + (1 if end.second or end.microsecond else 0)
+    return (start_min // SLOT_UNIT_MINUTES) * SLOT_UNIT_MINUTES, -(-end_min // SLOT_UNIT_MINUTES) * SLOT_UNIT_MINUTES
+
+
+def _parse(records, result):
+    """Turn raw records into (line, username, doctor_id, type_id, date, time, status) tuples."""
+    rows = []
+    for line, record in records:
+        if record is None:
+            result.reject(line, 'Malformed row.')
+            continue
+        missing = [f for f in FIELDS if not str(record.get(f) or '').strip()]
+        if missing:
+            result.reject(line, f"Missing field(s): {', '.join(missing)}.")
+            continue
+        try:
+            doctor_id = int(record['doctor_id'])
+            type_id = int(record['appointment_type_id'])
+            day = datetime.strptime(str(record['appointment_date']).strip(), '%Y-%m-%d').date()
+            start = datetime.strptime(str(record['appointment_time']).strip(), '%H:%M').time()
+        except ValueError:
+            result.reject(line, 'Invalid doctor id, appointment type id, date or time.')
+            continue
+        status = str(record.get('status') or 'scheduled').strip().lower()
+        if status not in STATUSES:
+            result.reject(line, f"Invalid status '{status}'.")
+            continue
+        rows.append((line, str(record['username']).strip(), doctor_id, type_id, day, start, status))
+    return rows
+
+
+def _load_lookups(rows):
+    usernames = {row[1] for row in rows}
+    doctor_ids = {row[2] for row in rows}
+    user_ids = {}
+    for chunk in _chunks(usernames, LOOKUP_CHUNK):
+        user_ids.update(User.objects.filter(username__in=chunk).values_list('username', 'id'))
+    doctors = {}
+    offered = set()
+    for chunk in _chunks(doctor_ids, LOOKUP_CHUNK):
+        doctors.update(
+            (doctor.pk, doctor)
+            for doctor in Doctor.objects.filter(pk__in=chunk).only('pk', 'working_weekdays', 'available_time_start', 'available_time_end')
+        )
+        offered.update(Doctor.appointment_types.through.objects.filter(doctor_id__in=chunk).values_list('doctor_id', 'appointmenttype_id'))
+    durations = dict(AppointmentType.objects.values_list('pk', 'duration'))
+    return user_ids, doctors, offered, durations
+
+
+def _existing_intervals(groups):
+    """
+    {(doctor_id, date): sorted unit-rounded intervals} of the appointments and
+    series occurrences on every doctor/day in the batch.
+    """
+    existing = defaultdict(list)
+    by_doctor = defaultdict(set)
+    for doctor_id, day in groups:
+        by_doctor[doctor_id].add(day)
+    for doctor_chunk in _chunks(by_doctor, LOOKUP_CHUNK):
+        days = set().union(*(by_doctor[d] for d in doctor_chunk))
+        rows = Appointment.objects.filter(doctor_id__in=doctor_chunk, appointment_date__in=days).exclude(
+            end_time=None).exclude(status='canceled').values_list('doctor_id', 'appointment_date', 'appointment_time', 'end_time')
+        for doctor_id, day, start, end in rows:
+            if (doctor_id, day) in groups:
+                existing[(doctor_id, day)].append(_unit_span(start, end))
+
+    by_day = defaultdict(list)
+    for doctor_id, day in groups:
+        by_day[day].append(doctor_id)
+    for day, doctor_ids in by_day.items():
+        for doctor_chunk in _chunks(doctor_ids, LOOKUP_CHUNK):
+            for doctor_id, times in recurrence.occurrence_times(doctor_chunk, day).items():
+                existing[(doctor_id, day)].extend(_unit_span(start, end) for start, end in times)
+    for intervals in existing.values():
+        intervals.sort()
+    return existing
+
+
+def _sweep(candidates, existing, result):
+    """
+    Accept candidates (sorted by start) that overlap neither `existing` nor an
+    earlier accepted candidate. Both lists hold unit-rounded minute intervals.
+    """
+    accepted = []
+    busy_until = 0
+    busy_line = None
+    next_existing = 0
+    for start, end, row in candidates:
+        while next_existing < len(existing) and existing[next_existing][0] <= start:
+            if existing[next_existing][1] > busy_until:
+                busy_until, busy_line = existing[next_existing][1], None
+            next_existing += 1
+        if busy_until > start or (next_existing < len(existing) and existing[next_existing][0] < end):
+            if busy_until > start and busy_line is not None:
+                result.reject(row[0], f"Overlaps row {busy_line} of this import.")
+            else:
+                result.reject(row[0], 'Overlaps an existing appointment.')
+            continue
+        accepted.append(row)
+        busy_until, busy_line = end, row[0]
+    return accepted
+
+
+def _insert(rows, result):
+    appointments = [
+        Appointment(
+            user_id=user_id, doctor_id=doctor_id, appointment_type_id=type_id,
+            appointment_date=day, appointment_time=start, end_time=end, status=status,
+        )
+        for _, user_id, doctor_id, type_id, day, start, end, status in rows
+    ]
+    try:
+        with transaction.atomic():
+            Appointment.objects.bulk_create(appointments)
+            SlotReservation.objects.bulk_create([
+                SlotReservation(doctor_id=a.doctor_id, appointment=a, date=a.appointment_date, unit=unit)
+                for a in appointments
+                if a.status != 'canceled'
+                for unit in a.slot_units()
+            ])
+            rollup.apply(rollup.deltas_for(appointments))
+        result.imported += len(appointments)
+    except IntegrityError:
+        # a concurrent booking took one of these slots meanwhile; retry row by row
+        for row, appointment in zip(rows, appointments):
+            appointment.pk = None
+            try:
+                with transaction.atomic():
+                    Appointment.objects.bulk_create([appointment])
+                    appointment.reserve_slots()
+                    rollup.record_change(None, appointment)
+                result.imported += 1
+            except IntegrityError:
+                result.reject(row[0], 'Overlaps an appointment booked during the import.')
+
+
+def import_appointments(stream, fmt, allow_past=False):
+    """Import a CSV/NDJSON stream of appointments and return an ImportResult."""
+    result = ImportResult()
+    rows = _parse(iter_records(stream, fmt), result)
+    user_ids, doctors, offered, durations = _load_lookups(rows)
+    today = timezone.now().date()
+    week = schedule.Schedule(doctors.values(), min(row[4] for row in rows), max(row[4] for row in rows)) if rows else None
+
+    groups = defaultdict(list)
+    cancelled = []
+    for line, username, doctor_id, type_id, day, start, status in rows:
+        if username not in user_ids:
+            result.reject(line, f"Unknown user '{username}'.")
+        elif doctor_id not in doctors:
+            result.reject(line, f"Unknown doctor {doctor_id}.")
+        elif type_id not in durations:
+            result.reject(line, f"Unknown appointment type {type_id}.")
+        elif (doctor_id, type_id) not in offered:
+            result.reject(line, "This doctor does not offer that appointment type.")
+        elif not allow_past and day < today:
+            result.reject(line, 'Appointment date is in the past.')
+        elif not any(open_time <= start <= close_time for open_time, close_time in week.hours(doctors[doctor_id], day)):
+            result.reject(line, 'Outside the doctor\'s working hours.')
+        else:
+            end = Appointment.compute_end_time(day, start, durations[type_id])
+            row = (line, user_ids[username], doctor_id, type_id, day, start, end, status)
+            if status == 'canceled':
+                # cancelled bookings hold no slot, so they cannot conflict
+                cancelled.append(row)
+                continue
+            unit_start, unit_end = _unit_span(start, end)
+            groups[(doctor_id, day)].append((unit_start, unit_end, row))
+
+    existing = _existing_intervals(groups)
+    pending = cancelled
+    for key, candidates in groups.items():
+        candidates.sort(key=lambda c: (c[0], c[2][0]))
+        pending.extend(_sweep(candidates, existing.get(key, []), result))
+        if len(pending) >= CHUNK_SIZE:
+            _insert(pending, result)
+            pending = []
+    if pending:
+        _insert(pending, result)
+
+    # bulk_create skips the post_save signals that normally drop cached availability
+    for doctor_id, day in groups:
+        availability_cache.invalidate_day(doctor_id, day)
+    return result
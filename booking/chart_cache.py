@@ -0,0 +1,129 @@
+"""
+Content-addressed cache of rendered report charts.
+
+A chart is keyed by the SHA-256 of its kind, data series and style, so the
+same counts drawn the same way are rasterized once. Entries live in a
+per-process LRU (BOOKING_CHART_CACHE_ENTRIES charts) backed by files under
+BOOKING_CHART_CACHE_DIR, which survive restarts and are shared by every
+process on the host. Files never change once written; prune() drops the
+ones not read for a while.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+MAX_ENTRIES = getattr(settings, "BOOKING_CHART_CACHE_ENTRIES", 256)
+CACHE_DIR = Path(getattr(settings, "BOOKING_CHART_CACHE_DIR", settings.BASE_DIR / "chart_cache"))
+MAX_AGE = getattr(settings, "BOOKING_CHART_CACHE_MAX_AGE", 30 * 24 * 3600)  # seconds since last use
+
+_memory = OrderedDict()  # key -> bytes, least recently used first
+_lock = threading.Lock()
+_stats = Counter()
+
+
+def chart_key(kind, series, style):
+    raw = json.dumps([kind, series, style], sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def _path(key, suffix):
+    return CACHE_DIR / key[:2] / f"{key}.{suffix}"
+
+
+def _remember(key, data):
+    with _lock:
+        _memory[key] = data
+        _memory.move_to_end(key)
+        while len(_memory) > MAX_ENTRIES:
+            _memory.popitem(last=False)
+            _stats['evictions'] += 1
+
+
+def get(key, suffix):
+    with _lock:
+        data = _memory.get(key)
+        if data is not None:
+            _memory.move_to_end(key)
+            _stats['memory_hits'] += 1
+            return data
+    path = _path(key, suffix)
+    try:
+        data = path.read_bytes()
+    except OSError:
+        with _lock:
+            _stats['misses'] += 1
+        return None
+    os.utime(path)  # keeps recently used files out of prune()
+    _remember(key, data)
+    with _lock:
+        _stats['disk_hits'] += 1
+    return data
+
+
+def put(key, suffix, data):
+    _remember(key, data)
+    path = _path(key, suffix)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+    except OSError:
+        logger.warning("Could not write chart cache file %s", path, exc_info=True)
+
+
+def get_or_render(kind, series, style, render, suffix='png'):
+    """
+    Bytes of the chart for (kind, series, style), calling render() only on
+    a miss in both tiers. render may be None when no renderer is available;
+    misses then return None.
+    """
+    key = chart_key(kind, series, style)
+    data = get(key, suffix)
+    if data is None and render is not None:
+        data = render()
+        put(key, suffix, data)
+    return data
+
+
+def prune(max_age=MAX_AGE):
+    """Delete chart files not used for `max_age` seconds; returns how many were removed."""
+    if not CACHE_DIR.exists():
+        return 0
+    cutoff = time.time() - max_age
+    removed = 0
+    for path in CACHE_DIR.glob('*/*.*'):
+        if path.stat().st_mtime < cutoff:
+            path.unlink(missing_ok=True)
+            removed += 1
+    return removed
+
+
+def clear():
+    with _lock:
+        _memory.clear()
+        _stats.clear()
+
+
+def stats():
+    with _lock:
+        hits = _stats['memory_hits'] + _stats['disk_hits']
+        lookups = hits + _stats['misses']
+        return {
+            'entries': len(_memory),
+            'max_entries': MAX_ENTRIES,
+            'memory_hits': _stats['memory_hits'],
+            'disk_hits': _stats['disk_hits'],
+            'misses': _stats['misses'],
+            'evictions': _stats['evictions'],
+            'hit_rate': round(hits / lookups, 3) if lookups else 0.0,
+        }
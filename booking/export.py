@@ -0,0 +1,82 @@
+"""
+Streaming appointment export (CSV or NDJSON).
+
+Rows are read with one joined query through .iterator(chunk_size=...) as
+plain tuples and encoded in batches, so an export of a million appointments
+holds one chunk in memory at a time. The columns are a superset of the
+bulk_import fields, so an export can be imported again.
+"""
+import csv
+import io
+import json
+
+from .models import Appointment
+
+CHUNK_SIZE = 2000
+COLUMNS = (
+    'id', 'username', 'doctor_id', 'doctor', 'appointment_type_id', 'appointment_type',
+    'appointment_date', 'appointment_time', 'end_time', 'status',
+)
+FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+_VALUES = (
+    'id', 'user__username', 'doctor_id', 'doctor__user__username', 'appointment_type_id', 'appointment_type__name',
+    'appointment_date', 'appointment_time', 'end_time', 'status',
+)
+
+
+def appointments(start=None, end=None, doctor_id=None):
+    """Export rows as tuples in COLUMNS order, by date and time."""
+    rows = Appointment.objects.all()
+    if start is not None:
+        rows = rows.filter(appointment_date__gte=start)
+    if end is not None:
+        rows = rows.filter(appointment_date__lte=end)
+    if doctor_id is not None:
+        rows = rows.filter(doctor_id=doctor_id)
+    return rows.order_by('appointment_date', 'appointment_time', 'id').values_list(*_VALUES).iterator(chunk_size=CHUNK_SIZE)
+
+
+def _plain(row):
+    (pk, username, doctor_id, doctor, type_id, type_name, day, start, end, status) = row
+    return (
+        pk, username, doctor_id, doctor, type_id, type_name, day.isoformat(), start.strftime('%H:%M'),
+        end.strftime('%H:%M') if end else '', status,
+    )
+
+
+def _batches(rows):
+    batch = []
+    for row in rows:
+        batch.append(_plain(row))
+        if len(batch) == CHUNK_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def csv_lines(rows):
+    """Yield CSV text, the header first, one string per batch of rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    yield buffer.getvalue()
+    for batch in _batches(rows):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(batch)
+        yield buffer.getvalue()
+
+
+def ndjson_lines(rows):
+    """Yield NDJSON text, one object per line and one string per batch of rows."""
+    for batch in _batches(rows):
+        yield ''.join(json.dumps(dict(zip(COLUMNS, row))) + '\n' for row in batch)
+
+
+def stream(fmt, rows):
+    if fmt == 'csv':
+        return csv_lines(rows)
+    if fmt == 'ndjson':
+        return ndjson_lines(rows)
+    raise ValueError(f"Unsupported export format: {fmt}")
@@ -1,8 +1,13 @@
 from django import forms
 from django.utils import timezone
-from datetime import timedelta, datetime
+from datetime import datetime
 from django.core.exceptions import ValidationError
-from .models import UserProfile, Doctor, AppointmentType, Appointment, HealthRecord, Notification, Payment
+from .models import (
+    UserProfile, Doctor, AppointmentType, Appointment, AppointmentSeries, HealthRecord, Notification, Payment, WaitlistEntry,
+)
+from .slots import has_overlap
+from .waitlist import WAITLIST_MAX_DAYS
+from . import recurrence, report_stats, schedule
 from django.contrib.auth.models import User
 
 class UserProfileForm(forms.ModelForm):
@@ -21,6 +26,12 @@ class DoctorForm(forms.ModelForm):
 
     available_time_start = forms.ChoiceField(choices=TIME_CHOICES, required=True, label='Available Time Start')
     available_time_end = forms.ChoiceField(choices=TIME_CHOICES, required=True, label='Available Time End')
+    working_days = forms.MultipleChoiceField(
+        choices=[(str(i), name) for i, name in enumerate(schedule.WEEKDAY_NAMES)],
+        widget=forms.CheckboxSelectMultiple,
+        required=True,
+        label='Working Days',
+    )
 
     class Meta:
         model = Doctor
@@ -30,12 +41,24 @@ class DoctorForm(forms.ModelForm):
             'qualifications',
             'experience_years',
             'languages_spoken',
-            'available_days',
             'available_time_start',
             'available_time_end',
             'appointment_types'
         ]
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk:
+            self.fields['working_days'].initial = [str(i) for i in range(7) if self.instance.working_weekdays & (1 << i)]
+
+    def save(self, commit=True):
+        mask = 0
+        for day in self.cleaned_data['working_days']:
+            mask |= 1 << int(day)
+        self.instance.working_weekdays = mask
+        self.instance.available_days = schedule.format_weekdays(mask)
+        return super().save(commit=commit)
+
 class AppointmentTypeForm(forms.ModelForm):
     class Meta:
         model = AppointmentType
@@ -72,27 +95,97 @@ class AppointmentForm(forms.ModelForm):
             if appointment_date < timezone.now().date():
                 raise ValidationError("You cannot book an appointment for a past date.")
 
-            if not (doctor.available_time_start <= appointment_time <= doctor.available_time_end):
-                raise ValidationError(f"Doctor is only available between {doctor.available_time_start.strftime('%I:%M %p')} and {doctor.available_time_end.strftime('%I:%M %p')}.")
+            hours = schedule.hours_on(doctor, appointment_date)
+            if not hours:
+                raise ValidationError("Doctor does not work on this date.")
+            if not any(start <= appointment_time <= end for start, end in hours):
+                raise ValidationError(f"Doctor is only available {schedule.describe(hours)} on this date.")
 
-            if appointment_type not in doctor.appointment_types.all():
+            if not doctor.appointment_types.filter(pk=appointment_type.pk).exists():
                 raise ValidationError(f"This doctor does not offer '{appointment_type.name}' appointments.")
 
-            proposed_start_datetime = datetime.combine(appointment_date, appointment_time)
-            proposed_end_datetime = proposed_start_datetime + timedelta(minutes=appointment_type.duration)
+            # a series occurrence being rescheduled must not collide with its own original slot
+            own_series = self.instance.series_id if self.instance.occurrence_date == appointment_date else None
+            if has_overlap(doctor, appointment_date, appointment_time, appointment_type.duration,
+                           exclude_pk=self.instance.pk, exclude_series=own_series):
+                raise ValidationError("This doctor is already booked at this time or there is an overlap with another appointment.")
+
+        return cleaned_data
+
+class AppointmentSeriesForm(forms.ModelForm):
+    """Admin form for recurring bookings; occurrences have no slot reservations, so overlaps are checked here."""
+    class Meta:
+        model = AppointmentSeries
+        fields = ['user', 'doctor', 'appointment_type', 'appointment_time', 'start_date', 'end_date', 'interval_weeks']
 
-            existing_appointments = Appointment.objects.filter(
-                doctor=doctor,
-                appointment_date=appointment_date
+    def clean(self):
+        cleaned_data = super().clean()
+        doctor = cleaned_data.get('doctor')
+        appointment_type = cleaned_data.get('appointment_type')
+        appointment_time = cleaned_data.get('appointment_time')
+        start_date = cleaned_data.get('start_date')
+        end_date = cleaned_data.get('end_date')
+        interval_weeks = cleaned_data.get('interval_weeks')
+
+        if interval_weeks is not None and interval_weeks < 1:
+            raise ValidationError("A series repeats at least every week.")
+        if start_date and end_date and end_date < start_date:
+            raise ValidationError("The series cannot end before it starts.")
+
+        if doctor and appointment_type and appointment_time and start_date and end_date and interval_weeks:
+            series = AppointmentSeries(start_date=start_date, end_date=end_date, interval_weeks=interval_weeks)
+            dates = series.dates_between(max(start_date, timezone.now().date()), end_date)
+            if self.instance.pk:
+                # rescheduled or cancelled occurrences are Appointment rows of their own
+                overridden = set(Appointment.objects.filter(series=self.instance).values_list('occurrence_date', flat=True))
+                dates = [day for day in dates if day not in overridden]
+            clashes = recurrence.conflicting_dates(
+                doctor, dates, appointment_time, appointment_type.duration, exclude_series=self.instance.pk,
             )
+            if clashes:
+                shown = ', '.join(day.strftime('%d %b %Y') for day in clashes[:5])
+                more = f" and {len(clashes) - 5} more" if len(clashes) > 5 else ""
+                raise ValidationError(f"This series overlaps other bookings of the doctor on {shown}{more}.")
+
+        return cleaned_data
 
-            for existing_appt in existing_appointments:
-                existing_start_datetime = datetime.combine(existing_appt.appointment_date, existing_appt.appointment_time)
-                existing_end_datetime = existing_start_datetime + timedelta(minutes=existing_appt.appointment_type.duration)
+class WaitlistForm(forms.ModelForm):
+    class Meta:
+        model = WaitlistEntry
+        fields = ['doctor', 'specialty', 'appointment_type', 'earliest_date', 'latest_date']
+        widgets = {
+            'earliest_date': forms.DateInput(attrs={'type': 'date'}),
+            'latest_date': forms.DateInput(attrs={'type': 'date'}),
+        }
+        help_texts = {
+            'specialty': 'Leave the doctor empty to accept any doctor of this specialty.',
+        }
 
-                if (proposed_start_datetime < existing_end_datetime and proposed_end_datetime > existing_start_datetime):
-                    raise ValidationError("This doctor is already booked at this time or there is an overlap with another appointment.")
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for field in self.fields.values():
+            field.widget.attrs.update({'class': 'form-control'})
 
+    def clean(self):
+        cleaned_data = super().clean()
+        doctor = cleaned_data.get('doctor')
+        specialty = (cleaned_data.get('specialty') or '').strip()
+        appointment_type = cleaned_data.get('appointment_type')
+        earliest_date = cleaned_data.get('earliest_date')
+        latest_date = cleaned_data.get('latest_date')
+
+        if not doctor and not specialty:
+            raise ValidationError("Choose a doctor or a specialty.")
+        if doctor and appointment_type and not doctor.appointment_types.filter(pk=appointment_type.pk).exists():
+            raise ValidationError(f"This doctor does not offer '{appointment_type.name}' appointments.")
+        if earliest_date and latest_date:
+            if latest_date < timezone.now().date():
+                raise ValidationError("The date window is already over.")
+            if latest_date < earliest_date:
+                raise ValidationError("The latest date must not be before the earliest date.")
+            if (latest_date - max(earliest_date, timezone.now().date())).days >= WAITLIST_MAX_DAYS:
+                raise ValidationError(f"The date window can span at most {WAITLIST_MAX_DAYS} days.")
+        cleaned_data['specialty'] = specialty
         return cleaned_data
 
 class HealthRecordForm(forms.ModelForm):
@@ -118,3 +211,27 @@ class ReportForm(forms.Form):
         ('yearly', 'Yearly Report'),
     ]
     report_type = forms.ChoiceField(choices=REPORT_CHOICES, label="Select Report Type")
+
+class ReportFilterForm(forms.Form):
+    """Ad-hoc report criteria; every field is optional."""
+    start = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    end = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    doctor = forms.ModelChoiceField(queryset=Doctor.objects.select_related('user'), required=False)
+    appointment_type = forms.ModelChoiceField(queryset=AppointmentType.objects.all(), required=False)
+    status = forms.ChoiceField(choices=[('', 'Any status')] + Appointment._meta.get_field('status').choices, required=False)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start, end = cleaned_data.get('start'), cleaned_data.get('end')
+        if start and end and start > end:
+            raise ValidationError("The start date must not be after the end date.")
+        return cleaned_data
+
+    def filters(self):
+        data = self.cleaned_data
+        return report_stats.ReportFilters(
+            start=data.get('start'), end=data.get('end'),
+            doctor_id=data['doctor'].pk if data.get('doctor') else None,
+            appointment_type_id=data['appointment_type'].pk if data.get('appointment_type') else None,
+            status=data.get('status'),
+        )
@@ -0,0 +1,125 @@
+"""
+Short-lived slot holds taken while a patient completes checkout.
+
+Every hold is a SlotHold row, which is what booking decisions check. Reads
+for availability go through a per-(doctor, date) cache entry listing the
+day's holds as minute intervals with their expiry, so excluding held slots
+costs one cache get. Expired holds are filtered out on read and removed by
+sweep(), a single bulk DELETE on the expires_at index, instead of being
+checked one by one.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Appointment, SlotHold
+from . import slots
+
+HOLD_SECONDS = getattr(settings, "BOOKING_SLOT_HOLD_SECONDS", 300)
+SWEEP_INTERVAL = getattr(settings, "BOOKING_SLOT_HOLD_SWEEP_INTERVAL", 60)  # seconds between opportunistic sweeps
+
+_PREFIX = "booking:holds"
+
+
+def _day_key(doctor_id, day):
+    return f"{_PREFIX}:{doctor_id}:{day}"
+
+
+def invalidate_day(doctor_id, day):
+    cache.delete(_day_key(doctor_id, day))
+
+
+def _active(doctor_id, day):
+    """[(user_id, start_minute, end_minute, expires_ts)] of the unexpired holds on a doctor/day."""
+    key = _day_key(doctor_id, day)
+    holds = cache.get(key)
+    if holds is None:
+        rows = SlotHold.objects.filter(doctor_id=doctor_id, date=day, expires_at__gt=timezone.now()).values_list(
+            'user_id', 'start_time', 'end_time', 'expires_at'
+        )
+        holds = [(user_id, *slots._interval(start, end), expires.timestamp()) for user_id, start, end, expires in rows]
+        cache.set(key, holds, HOLD_SECONDS)
+    now = time.time()
+    return [hold for hold in holds if hold[3] > now]
+
+
+def held_intervals(doctor_id, day, exclude_user=None):
+    """(start_minute, end_minute) of the holds on a doctor/day, except those of `exclude_user`."""
+    return [(start, end) for user_id, start, end, _ in _active(doctor_id, day) if user_id != exclude_user]
+
+
+def exclude_held(times, duration, intervals):
+    """Drop the start times whose `duration`-minute slot overlaps one of `intervals`."""
+    if not intervals:
+        return times
+    free = []
+    for t in times:
+        start = slots.to_minutes(t)
+        if not any(s < start + duration and e > start for s, e in intervals):
+            free.append(t)
+    return free
+
+
+def _overlapping(doctor, day, start_time, end_time):
+    return SlotHold.objects.filter(
+        doctor=doctor, date=day, expires_at__gt=timezone.now(), start_time__lt=end_time, end_time__gt=start_time,
+    )
+
+
+def held_by_other(user, doctor, day, start_time, duration):
+    """True when someone other than `user` holds part of the slot. Checks the table, not the cache."""
+    end_time = Appointment.compute_end_time(day, start_time, duration)
+    return _overlapping(doctor, day, start_time, end_time).exclude(user=user).exists()
+
+
+def place(user, doctor, day, start_time, duration, seconds=HOLD_SECONDS, replace=True):
+    """
+    Hold the slot for `user` for `seconds`. With `replace`, any hold they had
+    is dropped, but only once the new one is granted. Returns the SlotHold,
+    or None when the slot is booked or held by someone else.
+    """
+    maybe_sweep()
+    end_time = Appointment.compute_end_time(day, start_time, duration)
+    previous = []
+    with transaction.atomic():
+        if _overlapping(doctor, day, start_time, end_time).exclude(user=user).exists() or slots.has_overlap(doctor, day, start_time, duration):
+            return None
+        if replace:
+            previous = list(SlotHold.objects.filter(user=user).values_list('doctor_id', 'date'))
+            SlotHold.objects.filter(user=user).delete()
+        hold = SlotHold.objects.create(
+            user=user, doctor=doctor, date=day, start_time=start_time, end_time=end_time,
+            expires_at=timezone.now() + timedelta(seconds=seconds),
+        )
+    for doctor_id, held_day in {*previous, (doctor.pk, day)}:
+        invalidate_day(doctor_id, held_day)
+    return hold
+
+
+def release(user):
+    """Drop the holds of `user`, e.g. once their booking went through."""
+    previous = list(SlotHold.objects.filter(user=user).values_list('doctor_id', 'date'))
+    if previous:
+        SlotHold.objects.filter(user=user).delete()
+        for doctor_id, day in set(previous):
+            invalidate_day(doctor_id, day)
+
+
+def sweep():
+    """Delete every expired hold in one statement and return how many were removed."""
+    deleted, _ = SlotHold.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
+
+
+def maybe_sweep():
+    # cache.add only succeeds for the first caller in each SWEEP_INTERVAL window
+    if cache.add(f"{_PREFIX}:swept", 1, SWEEP_INTERVAL):
+        from . import waitlist  # waitlist places its offers through this module
+
+        waitlist.expire_offers()
+        return sweep()
+    return 0
@@ -0,0 +1,31 @@
+"""
+On-demand imports of heavy optional dependencies.
+
+WeasyPrint (and matplotlib, used only by benchmarks) cost seconds of import
+time and tens of MB per process, but only report rendering needs them. Code
+calls load() at the point of use instead of importing at module level, so
+web workers, management commands and tests boot without them. bench_startup
+checks that none of HEAVY_MODULES is imported by a plain boot.
+"""
+import importlib
+import importlib.util
+import threading
+
+HEAVY_MODULES = ('weasyprint', 'matplotlib')
+
+_lock = threading.Lock()
+
+
+def load(name):
+    """Import `name` on first use; later calls return the cached module."""
+    with _lock:
+        return importlib.import_module(name)
+
+
+def available(name):
+    """Whether `name` could be imported, without importing it."""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except ImportError:
+        # a parent package is missing
+        return False
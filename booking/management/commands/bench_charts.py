@@ -0,0 +1,94 @@
+import base64
+import io
+import time as timer
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from booking import lazy, pdf_renderer, report_pdf, report_stats, svg_charts
+
+
+def legacy_png_charts(context):
+    """The previous matplotlib path: 120 dpi PNGs inlined as base64 data URLs."""
+    lazy.load('matplotlib').use('Agg')
+    plt = lazy.load('matplotlib.pyplot')
+
+    def dataurl(fig):
+        buf = io.BytesIO()
+        fig.savefig(buf, format='png', bbox_inches='tight', dpi=120)
+        plt.close(fig)
+        return 'data:image/png;base64,' + base64.b64encode(buf.getvalue()).decode('ascii')
+
+    fig, ax = plt.subplots(figsize=(7, 2.6))
+    ax.plot(context['timeline_labels'], context['timeline_data'], marker='o', color='#367fd8')
+    fig.autofmt_xdate(rotation=25)
+    timeline = dataurl(fig)
+    types = context['type_counts'] or [{'type': 'No data', 'count': 0}]
+    fig, ax = plt.subplots(figsize=(5, 3))
+    ax.bar([r['type'] for r in types], [r['count'] for r in types], color='#8e5ea2')
+    by_type = dataurl(fig)
+    statuses = context['status_counts'] or [{'status': 'none', 'count': 1}]
+    fig, ax = plt.subplots(figsize=(4, 3))
+    ax.pie([r['count'] for r in statuses], labels=[r['status'] for r in statuses], autopct='%1.0f%%')
+    by_status = dataurl(fig)
+    return {
+        'timeline': f'<img src="{timeline}">',
+        'type': f'<img src="{by_type}">',
+        'status': f'<img src="{by_status}">',
+    }
+
+
+def svg_charts_uncached(context):
+    types = context['type_counts'] or [{'type': 'No data', 'count': 0}]
+    statuses = context['status_counts'] or [{'status': 'none', 'count': 1}]
+    return {
+        'timeline': svg_charts.line_chart(context['timeline_labels'], context['timeline_data'], **report_pdf.TIMELINE_STYLE),
+        'type': svg_charts.bar_chart([r['type'] for r in types], [r['count'] for r in types], **report_pdf.TYPE_STYLE),
+        'status': svg_charts.pie_chart([r['status'] for r in statuses], [r['count'] for r in statuses], **report_pdf.STATUS_STYLE),
+    }
+
+
+class Command(BaseCommand):
+    help = "Compare the SVG chart pipeline with the legacy matplotlib PNGs: chart time, memory, HTML and PDF size."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per report type and pipeline (default 5).')
+
+    def handle(self, *args, **options):
+        if lazy.available('matplotlib'):
+            pipelines = [('png', legacy_png_charts), ('svg', svg_charts_uncached)]
+        else:
+            self.stdout.write("matplotlib is not installed; measuring the SVG pipeline only.")
+            pipelines = [('svg', svg_charts_uncached)]
+
+        for report_type in report_stats.REPORT_TYPES:
+            context = report_stats.report_context(report_type)
+            context['appointments'] = list(context['appointments'])
+            for label, build in pipelines:
+                charts, chart_ms, chart_peak = self._measure(lambda: build(context), options['repeat'])
+                html = render_to_string('reports/report_pdf.html', {
+                    **context,
+                    'chart_timeline': charts['timeline'], 'chart_type': charts['type'], 'chart_status': charts['status'],
+                    'start_date': report_stats.report_start(report_type), 'generated_at': timezone.now(),
+                })
+                pdf, pdf_ms, pdf_peak = self._measure(lambda: pdf_renderer._render(html)[0], options['repeat'])
+                self.stdout.write(
+                    f"{report_type:8} {label}  charts {chart_ms:7.2f} ms {chart_peak / 1024:8.1f} KiB peak  "
+                    f"html {len(html) / 1024:7.1f} KiB  pdf {len(pdf) / 1024:7.1f} KiB in {pdf_ms:7.1f} ms "
+                    f"({pdf_peak / 1024:8.1f} KiB peak)"
+                )
+
+    @staticmethod
+    def _measure(func, repeat):
+        """(result, average ms, peak traced bytes) of `repeat` calls."""
+        result = func()  # warm-up, e.g. imports
+        tracemalloc.start()
+        started = timer.perf_counter()
+        for _ in range(repeat):
+            result = func()
+        elapsed = (timer.perf_counter() - started) / repeat * 1000
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return result, elapsed, peak
@@ -0,0 +1,58 @@
+import time as timer
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from booking import lazy, pdf_renderer, report_pdf, report_stats
+
+
+def cold_render(html):
+    """The original path: a fresh HTML, FontConfiguration and stylesheet parse for every PDF."""
+    weasyprint = lazy.load('weasyprint')
+    font_config = lazy.load('weasyprint.text.fonts').FontConfiguration()
+    stylesheets = [weasyprint.CSS(filename=path, font_config=font_config) for path in pdf_renderer.STYLESHEETS]
+    return weasyprint.HTML(string=html).write_pdf(stylesheets=stylesheets, font_config=font_config)
+
+
+class Command(BaseCommand):
+    help = "Benchmark cold (per-call WeasyPrint setup) against warm pooled PDF renders of the report templates."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5, help='Renders per report type and mode (default 5).')
+        parser.add_argument('--types', nargs='+', default=list(report_stats.REPORT_TYPES), choices=report_stats.REPORT_TYPES)
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        pages = {report_type: report_pdf.render_html(report_type) for report_type in options['types']}
+
+        started = timer.perf_counter()
+        pdf_renderer.render(next(iter(pages.values())))
+        self.stdout.write(f"pool start + warm-up: {(timer.perf_counter() - started) * 1000:.0f} ms ({pdf_renderer.WORKERS} worker(s))")
+
+        try:
+            for report_type, html in pages.items():
+                cold = self._time(lambda: cold_render(html), repeat)
+                warm = self._time(lambda: pdf_renderer.render(html), repeat)
+                self.stdout.write(
+                    f"{report_type:8} html {len(html) / 1024:7.1f} KiB  cold {cold * 1000:8.1f} ms  "
+                    f"warm {warm * 1000:8.1f} ms  speedup {cold / warm if warm else 0:5.2f}x"
+                )
+
+            if pdf_renderer.WORKERS > 1:
+                batch = [html for html in pages.values() for _ in range(repeat)]
+                started = timer.perf_counter()
+                with ThreadPoolExecutor(max_workers=pdf_renderer.WORKERS) as callers:
+                    list(callers.map(pdf_renderer.render, batch))
+                elapsed = timer.perf_counter() - started
+                self.stdout.write(f"parallel: {len(batch)} renders in {elapsed:.2f}s = {len(batch) / elapsed:.1f} renders/s")
+
+            self.stdout.write(f"renderer stats: {pdf_renderer.stats()}")
+        finally:
+            pdf_renderer.shutdown()
+
+    @staticmethod
+    def _time(func, repeat):
+        started = timer.perf_counter()
+        for _ in range(repeat):
+            func()
+        return (timer.perf_counter() - started) / repeat
@@ -0,0 +1,137 @@
+import time as timer
+from datetime import date, time, timedelta, datetime
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from booking.models import Doctor, AppointmentType, Appointment
+from booking.slots import available_times, earliest_slots
+
+
+def legacy_available_times(doctor, day, duration):
+    """The original per-slot rescan, kept here as the baseline to compare against."""
+    booked = Appointment.objects.filter(doctor=doctor, appointment_date=day).order_by('appointment_time')
+    times = []
+    current = datetime.combine(day, doctor.available_time_start)
+    end = datetime.combine(day, doctor.available_time_end)
+    length = timedelta(minutes=duration)
+    while current + length <= end:
+        free = True
+        for appt in booked:
+            appt_start = datetime.combine(appt.appointment_date, appt.appointment_time)
+            appt_end = appt_start + timedelta(minutes=appt.appointment_type.duration)
+            if current < appt_end and current + length > appt_start:
+                free = False
+                break
+        if free:
+            times.append(current.time())
+        current += timedelta(minutes=15)
+    return times
+
+
+class Command(BaseCommand):
+    help = "Benchmark the slot engine against the legacy per-slot scan for busy doctors."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bookings', type=int, default=60, help='Bookings per doctor/day (default 60).')
+        parser.add_argument('--repeat', type=int, default=20, help='Lookups per implementation.')
+        parser.add_argument('--doctors', type=int, default=200, help='Doctors for the earliest-slot search (default 200).')
+        parser.add_argument('--days', type=int, default=14, help='Search window in days (default 14).')
+
+    def handle(self, *args, **options):
+        bookings = options['bookings']
+        repeat = options['repeat']
+
+        with transaction.atomic():
+            doctor, day, appt_type = self._seed(bookings)
+            results = {}
+            for label, func in (('legacy', legacy_available_times), ('slot engine', available_times)):
+                with CaptureQueriesContext(connection) as queries:
+                    started = timer.perf_counter()
+                    for _ in range(repeat):
+                        result = func(doctor, day, appt_type.duration)
+                    elapsed = (timer.perf_counter() - started) / repeat
+                self.stdout.write(
+                    f"{label:12} {elapsed * 1000:8.2f} ms/lookup  "
+                    f"{len(queries) / repeat:6.1f} queries/lookup  {len(result)} free slots"
+                )
+                results[label] = result
+            if results['legacy'] != results['slot engine']:
+                self.stderr.write("Slot engine and legacy scan disagree on free slots!")
+            transaction.set_rollback(True)
+
+        scenarios = (
+            ('half-booked days', 0),
+            ('all but the last day full', options['days'] - 1),
+        )
+        for label, full_days in scenarios:
+            with transaction.atomic():
+                doctors, start, probe = self._seed_search(options['doctors'], options['days'], full_days)
+                end = start + timedelta(days=options['days'] - 1)
+                with CaptureQueriesContext(connection) as queries:
+                    started = timer.perf_counter()
+                    for _ in range(repeat):
+                        found = earliest_slots(doctors, probe.duration, start, end, limit=50)
+                    elapsed = (timer.perf_counter() - started) / repeat
+                self.stdout.write(
+                    f"earliest     {elapsed * 1000:8.2f} ms/search  "
+                    f"{len(queries) / repeat:6.1f} queries/search  {len(found)} slots "
+                    f"({options['doctors']} doctors x {options['days']} days, {label})"
+                )
+                transaction.set_rollback(True)
+
+    def _seed(self, bookings):
+        user = User.objects.create(username='bench-slots-user')
+        doctor = Doctor.objects.create(
+            user=User.objects.create(username='bench-slots-doctor'),
+            specialty='General', qualifications='MBChB', experience_years=5,
+            available_days='Mon-Sun', available_time_start=time(0, 0), available_time_end=time(23, 45),
+        )
+        short = AppointmentType.objects.create(name='Bench short', duration=10)
+        probe = AppointmentType.objects.create(name='Bench probe', duration=30)
+        doctor.appointment_types.add(short, probe)
+
+        day = date.today() + timedelta(days=1)
+        # spread the bookings over the day, leaving gaps so some slots stay free
+        step = max(15, (23 * 60) // max(bookings, 1))
+        starts = [time((i * step) // 60 % 24, (i * step) % 60) for i in range(bookings)]
+        # bulk_create skips Appointment.save(), so end_time is filled in here
+        Appointment.objects.bulk_create([
+            Appointment(
+                user=user, doctor=doctor, appointment_type=short, appointment_date=day,
+                appointment_time=start, end_time=Appointment.compute_end_time(day, start, short.duration),
+                status='scheduled',
+            )
+            for start in starts
+        ])
+        return doctor, day, probe
+
+    def _seed_search(self, doctor_count, days, full_days):
+        user = User.objects.create(username='bench-search-user')
+        probe = AppointmentType.objects.create(name='Bench probe', duration=30)
+        doctors = []
+        for i in range(doctor_count):
+            doctor = Doctor.objects.create(
+                user=User.objects.create(username=f'bench-search-doctor-{i}'),
+                specialty='General', qualifications='MBChB', experience_years=5,
+                available_days='Mon-Fri', available_time_start=time(9, 0), available_time_end=time(17, 0),
+            )
+            doctor.appointment_types.add(probe)
+            doctors.append(doctor)
+
+        start = date.today() + timedelta(days=1)
+        # the first `full_days` days are fully booked, the rest have every other slot taken
+        Appointment.objects.bulk_create([
+            Appointment(
+                user=user, doctor=doctor, appointment_type=probe, appointment_date=start + timedelta(days=d),
+                appointment_time=time(9 + slot // 2, 30 * (slot % 2)), status='scheduled',
+                end_time=time(9 + (slot + 1) // 2, 30 * ((slot + 1) % 2)),
+            )
+            for doctor in doctors
+            for d in range(days)
+            for slot in range(16)
+            if d < full_days or slot % 2 == 0
+        ], batch_size=1000)
+        return doctors, start, probe
@@ -0,0 +1,92 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time as timer
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from booking.lazy import HEAVY_MODULES
+
+# run in a fresh interpreter: boot Django, serve one request, report timings and memory
+PROBE = """
+import json, os, resource, sys, time
+started = time.perf_counter()
+import django
+django.setup()
+from django.test import Client
+from django.test.utils import setup_test_environment
+setup_test_environment()
+booted = time.perf_counter()
+status = Client().get(sys.argv[1]).status_code
+served = time.perf_counter()
+print(json.dumps({
+    'boot_ms': (booted - started) * 1000,
+    'first_request_ms': (served - booted) * 1000,
+    'status': status,
+    'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'heavy_modules': sorted(m for m in json.loads(sys.argv[2]) if m in sys.modules),
+}))
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure cold start: Django boot, time to first request and peak RSS of a fresh process, "
+        "and whether heavy optional dependencies were imported. Fails on --max-* regressions."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help='Fresh processes to start (default 5).')
+        parser.add_argument('--path', default='/', help='URL of the first request (default /).')
+        parser.add_argument('--max-ms', type=float, help='Fail when the median time to first response exceeds this.')
+        parser.add_argument('--max-rss', type=float, help='Fail when the median peak RSS exceeds this many MB.')
+        parser.add_argument('--json', action='store_true', help='Print the summary as JSON.')
+
+    def handle(self, *args, **options):
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', settings.SETTINGS_MODULE)}
+        runs = []
+        for _ in range(options['runs']):
+            started = timer.perf_counter()
+            out = subprocess.run(
+                [sys.executable, '-c', PROBE, options['path'], json.dumps(HEAVY_MODULES)],
+                env=env, cwd=settings.BASE_DIR, capture_output=True, text=True,
+            )
+            if out.returncode:
+                raise CommandError(f"Probe process failed:\n{out.stderr}")
+            run = json.loads(out.stdout.strip().splitlines()[-1])
+            run['process_ms'] = (timer.perf_counter() - started) * 1000
+            runs.append(run)
+
+        summary = {
+            'runs': len(runs),
+            'path': options['path'],
+            'status': runs[-1]['status'],
+            'boot_ms': round(statistics.median(r['boot_ms'] for r in runs), 1),
+            'first_request_ms': round(statistics.median(r['first_request_ms'] for r in runs), 1),
+            'time_to_first_response_ms': round(statistics.median(r['process_ms'] for r in runs), 1),
+            'max_rss_mb': round(statistics.median(r['max_rss_mb'] for r in runs), 1),
+            'heavy_modules': sorted({m for r in runs for m in r['heavy_modules']}),
+        }
+        if options['json']:
+            self.stdout.write(json.dumps(summary))
+        else:
+            self.stdout.write(
+                f"{summary['runs']} run(s) of GET {summary['path']} ({summary['status']}): "
+                f"boot {summary['boot_ms']} ms, first request {summary['first_request_ms']} ms, "
+                f"process start to response {summary['time_to_first_response_ms']} ms, peak RSS {summary['max_rss_mb']} MB"
+            )
+            if summary['heavy_modules']:
+                self.stdout.write(f"Heavy modules imported at startup: {', '.join(summary['heavy_modules'])}")
+
+        problems = []
+        if summary['heavy_modules']:
+            problems.append(f"imported {', '.join(summary['heavy_modules'])} at startup")
+        if options['max_ms'] is not None and summary['time_to_first_response_ms'] > options['max_ms']:
+            problems.append(f"time to first response {summary['time_to_first_response_ms']} ms > {options['max_ms']} ms")
+        if options['max_rss'] is not None and summary['max_rss_mb'] > options['max_rss']:
+            problems.append(f"peak RSS {summary['max_rss_mb']} MB > {options['max_rss']} MB")
+        if problems:
+            raise CommandError("Startup regression: " + '; '.join(problems))
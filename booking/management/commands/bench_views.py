@@ -0,0 +1,163 @@
+import json
+import platform
+import statistics
+import time as timer
+import tracemalloc
+from datetime import timedelta
+
+import django
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment
+from django.urls import reverse
+from django.utils import timezone
+
+from booking import synthetic
+from booking.models import Appointment, Doctor
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the hot views (reports, staff dashboard, available times, report data) against the "
+        "synthetic dataset (see seed_synthetic): latency percentiles, queries per request and peak memory, "
+        "cold and warm. Results are written as JSON and can be compared with an earlier run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=20, help='Warm requests per view (default 20).')
+        parser.add_argument('--views', nargs='*', help='Only benchmark these views.')
+        parser.add_argument('--output', help='Write the results to this JSON file.')
+        parser.add_argument('--compare', help='Earlier results file to compare against.')
+        parser.add_argument('--max-regression', type=float,
+                            help='With --compare, fail when a warm p95 grew by more than this percentage.')
+
+    def cases(self):
+        """{name: (user, method, url, data)} of the requests to time."""
+        staff = User.objects.filter(is_staff=True).order_by('pk').first()
+        patient = User.objects.filter(username__startswith=f"{synthetic.PREFIX}patient-").order_by('pk').first()
+        if staff is None or patient is None:
+            raise CommandError("Needs a staff user and synthetic patients; run createsuperuser and seed_synthetic first.")
+        today = timezone.now().date()
+        # the first synthetic doctor gets the most bookings; use their next working day
+        doctor = Doctor.objects.filter(user__username__startswith=synthetic.PREFIX).order_by('pk').first()
+        if doctor is None:
+            raise CommandError("No synthetic doctors; run seed_synthetic first.")
+        day = next(today + timedelta(days=n) for n in range(1, 15) if doctor.works_on(today + timedelta(days=n)))
+        appointment_type = doctor.appointment_types.order_by('pk').first()
+        return {
+            'reports_weekly': (patient, 'post', reverse('booking:reports-view'), {'report_type': 'weekly'}),
+            'reports_yearly': (patient, 'post', reverse('booking:reports-view'), {'report_type': 'yearly'}),
+            'staff_view': (staff, 'get', reverse('staff_home'), {}),
+            'available_times': (patient, 'get', reverse('booking:get_available_times', args=[doctor.pk]), {
+                'appointment_date': day.isoformat(), 'appointment_type_id': appointment_type.pk,
+            }),
+            'report_data': (staff, 'get', reverse('report_data'), {
+                'start': (today - timedelta(days=90)).isoformat(), 'end': today.isoformat(),
+            }),
+            'report_data_doctor': (staff, 'get', reverse('report_data'), {'doctor': doctor.pk, 'page': 2}),
+        }
+
+    def handle(self, *args, **options):
+        setup_test_environment()  # lets Client keep rendered responses without DEBUG
+        cases = self.cases()
+        if options['views']:
+            unknown = set(options['views']) - set(cases)
+            if unknown:
+                raise CommandError(f"Unknown view(s): {', '.join(sorted(unknown))}. Choose from {', '.join(cases)}.")
+            cases = {name: case for name, case in cases.items() if name in options['views']}
+
+        results = {}
+        for name, (user, method, url, data) in cases.items():
+            client = Client()
+            client.force_login(user)
+            request = lambda: getattr(client, method)(url, data)
+            results[name] = self._bench(request, options['requests'])
+            r = results[name]
+            self.stdout.write(
+                f"{name:20} cold {r['cold_ms']:8.1f} ms {r['cold_queries']:4} q   "
+                f"warm p50 {r['p50_ms']:7.1f} p95 {r['p95_ms']:7.1f} mean {r['mean_ms']:7.1f} ms "
+                f"{r['queries']:4} q   peak {r['peak_kib']:9.1f} KiB"
+            )
+
+        report = {
+            'meta': {
+                'created': timezone.now().isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'requests': options['requests'],
+                'appointments': Appointment.objects.count(),
+                'doctors': Doctor.objects.count(),
+                'users': User.objects.count(),
+            },
+            'views': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Wrote {options['output']}")
+        if options['compare']:
+            self._compare(report, options['compare'], options['max_regression'])
+
+    @staticmethod
+    def _bench(request, repeat):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            started = timer.perf_counter()
+            response = request()
+            cold_ms = (timer.perf_counter() - started) * 1000
+        if response.status_code != 200:
+            raise CommandError(f"{response.request['PATH_INFO']} answered {response.status_code}")
+        cold_queries = len(queries)
+
+        timings, counts = [], []
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as queries:
+                started = timer.perf_counter()
+                request()
+                timings.append((timer.perf_counter() - started) * 1000)
+            counts.append(len(queries))
+
+        # separate pass: tracing slows everything down and would skew the timings
+        tracemalloc.start()
+        request()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return {
+            'status': response.status_code,
+            'cold_ms': round(cold_ms, 2),
+            'cold_queries': cold_queries,
+            'p50_ms': round(statistics.median(timings), 2),
+            'p95_ms': round(_percentile(timings, 95), 2),
+            'mean_ms': round(statistics.mean(timings), 2),
+            'queries': max(counts),
+            'peak_kib': round(peak / 1024, 1),
+        }
+
+    def _compare(self, report, path, max_regression):
+        with open(path) as f:
+            baseline = json.load(f)
+        self.stdout.write(f"Compared with {path} ({baseline['meta']['created']}):")
+        regressions = []
+        for name, current in report['views'].items():
+            before = baseline['views'].get(name)
+            if before is None:
+                continue
+            change = (current['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100 if before['p95_ms'] else 0.0
+            self.stdout.write(
+                f"{name:20} p95 {before['p95_ms']:7.1f} -> {current['p95_ms']:7.1f} ms ({change:+.0f}%)  "
+                f"queries {before['queries']} -> {current['queries']}  "
+                f"peak {before['peak_kib']:.0f} -> {current['peak_kib']:.0f} KiB"
+            )
+            if max_regression is not None and change > max_regression:
+                regressions.append(f"{name} p95 {change:+.0f}%")
+        if regressions:
+            raise CommandError("Regression: " + '; '.join(regressions))
@@ -0,0 +1,41 @@
+import csv
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from booking.bulk_import import import_appointments
+
+
+class Command(BaseCommand):
+    help = (
+        "Import a partner clinic batch of appointments from CSV or NDJSON. Columns: "
+        "username, doctor_id, appointment_type_id, appointment_date (YYYY-MM-DD), "
+        "appointment_time (HH:MM) and optional status."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import, or '-' for stdin.")
+        parser.add_argument('--format', choices=['csv', 'ndjson'], help='Defaults to the file extension.')
+        parser.add_argument('--report', help='Write rejected rows (line, reason) to this CSV file.')
+        parser.add_argument('--allow-past', action='store_true', help='Accept appointments dated before today.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv')
+
+        try:
+            if path == '-':
+                result = import_appointments(sys.stdin.buffer, fmt, allow_past=options['allow_past'])
+            else:
+                with open(path, 'rb') as stream:
+                    result = import_appointments(stream, fmt, allow_past=options['allow_past'])
+        except OSError as e:
+            raise CommandError(f"Could not read {path}: {e}")
+
+        if options['report']:
+            with open(options['report'], 'w', newline='') as out:
+                writer = csv.writer(out)
+                writer.writerow(['line', 'reason'])
+                writer.writerows(sorted(result.rejects))
+
+        self.stdout.write(f"imported={result.imported} rejected={len(result.rejects)}")
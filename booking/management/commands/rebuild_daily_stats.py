@@ -0,0 +1,22 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from booking import rollup
+
+
+class Command(BaseCommand):
+    help = "Recompute the AppointmentDailyStats rollup from Appointment rows, for backfills or after bulk edits."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='First date to rebuild (YYYY-MM-DD). Defaults to the earliest appointment.')
+        parser.add_argument('--end', help='Last date to rebuild (YYYY-MM-DD). Defaults to the latest appointment.')
+
+    def handle(self, *args, **options):
+        try:
+            start = datetime.strptime(options['start'], '%Y-%m-%d').date() if options['start'] else None
+            end = datetime.strptime(options['end'], '%Y-%m-%d').date() if options['end'] else None
+        except ValueError:
+            raise CommandError("Dates must be given as YYYY-MM-DD.")
+        rows = rollup.rebuild(start, end)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} daily stats row(s)."))
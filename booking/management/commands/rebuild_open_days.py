@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from booking.models import Doctor
+from booking import schedule
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the open days index of every doctor from today on. Run it daily from "
+        "cron so the index keeps BOOKING_OPEN_DAYS_HORIZON days ahead (searches compute "
+        "dates past it from the schedule, which is slower), and after changing that "
+        "setting or editing schedules outside the admin."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=schedule.OPEN_DAYS_HORIZON, help='How many days ahead to index.')
+
+    def handle(self, *args, **options):
+        doctors = list(Doctor.objects.all())
+        rows = 0
+        for i in range(0, len(doctors), 200):
+            rows += schedule.rebuild_open_days(doctors[i:i + 200], days=options['days'])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {rows} open day(s) for {len(doctors)} doctor(s)."))
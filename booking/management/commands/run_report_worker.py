@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from booking import chart_cache, pdf_renderer, report_jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Render queued report PDFs into the report file cache. Runs until stopped; "
+        "start one or more alongside the web server."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit when the queue is empty instead of waiting for jobs.')
+        parser.add_argument('--sleep', type=float, default=2.0, help='Seconds to wait between polls of an empty queue.')
+        parser.add_argument('--max-jobs', type=int, default=0, help='Exit after this many jobs (0 = no limit).')
+
+    def handle(self, *args, **options):
+        try:
+            self._work(options)
+        finally:
+            pdf_renderer.shutdown()
+        self.stdout.write(f"Renderer: {pdf_renderer.stats()}")
+
+    def _work(self, options):
+        done = 0
+        last_prune = 0.0
+        while not options['max_jobs'] or done < options['max_jobs']:
+            job = report_jobs.claim_next()
+            if job is None:
+                if options['once']:
+                    break
+                if time.monotonic() - last_prune > 3600:
+                    report_jobs.prune()
+                    chart_cache.prune()
+                    last_prune = time.monotonic()
+                report_jobs.requeue_stale()
+                time.sleep(options['sleep'])
+                continue
+            started = time.monotonic()
+            job = report_jobs.run(job)
+            done += 1
+            self.stdout.write(f"Job {job.pk} ({job.cache_key}): {job.status} in {time.monotonic() - started:.2f}s")
+            if done % 50 == 0:
+                self.stdout.write(f"Renderer: {pdf_renderer.stats()}")
+        self.stdout.write(self.style.SUCCESS(f"Processed {done} report job(s)."))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+
+from booking import synthetic
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed synthetic patients, doctors, appointment types, appointments, notifications and chat logs "
+        f"(usernames start with '{synthetic.PREFIX}') for load tests and benchmarks."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--patients', type=int, default=1000)
+        parser.add_argument('--doctors', type=int, default=50)
+        parser.add_argument('--types', type=int, default=8, help='Appointment types.')
+        parser.add_argument('--appointments', type=int, default=20000)
+        parser.add_argument('--notifications', type=int, default=5000)
+        parser.add_argument('--chat-logs', type=int, default=2000)
+        parser.add_argument('--days-back', type=int, default=365, help='Spread appointments this many days into the past.')
+        parser.add_argument('--days-ahead', type=int, default=60, help='... and this many days ahead.')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed, for reproducible datasets.')
+        parser.add_argument('--clear', action='store_true', help='Remove earlier synthetic data first.')
+        parser.add_argument('--clear-only', action='store_true', help='Remove synthetic data and exit.')
+
+    def handle(self, *args, **options):
+        if options['clear'] or options['clear_only']:
+            removed = synthetic.remove()
+            self.stdout.write(f"Removed {removed} synthetic user(s) and their data.")
+            if options['clear_only']:
+                return
+        if User.objects.filter(username__startswith=synthetic.PREFIX).exists():
+            raise CommandError("Synthetic data already exists; pass --clear to replace it.")
+        counts = synthetic.generate(
+            patients=options['patients'], doctors=options['doctors'], types=options['types'],
+            appointments=options['appointments'], notifications=options['notifications'],
+            chat_logs=options['chat_logs'], days_back=options['days_back'], days_ahead=options['days_ahead'],
+            seed=options['seed'],
+        )
+        self.stdout.write(self.style.SUCCESS("Created " + ", ".join(f"{n} {name.replace('_', ' ')}" for name, n in counts.items()) + "."))
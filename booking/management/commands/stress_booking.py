@@ -0,0 +1,118 @@
+import os
+import random
+import tempfile
+import threading
+from collections import Counter
+from datetime import date, time, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import IntegrityError, OperationalError, connection
+
+from booking.forms import AppointmentForm
+from booking.models import Doctor, AppointmentType, Appointment
+
+
+class Command(BaseCommand):
+    help = (
+        "Hammer one doctor's day with concurrent bookings from many threads and "
+        "verify that no two stored appointments overlap. Runs against a throwaway "
+        "test database, never the configured one."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--attempts', type=int, default=20, help='Booking attempts per thread.')
+        parser.add_argument(
+            '--skip-validation', action='store_true',
+            help='Save without AppointmentForm.clean so only the reservation constraint guards the slots.',
+        )
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as tmp:
+            if connection.vendor == 'sqlite':
+                # a file, not the in-memory default: threads need their own connections to it
+                connection.settings_dict['TEST'] = {**connection.settings_dict.get('TEST', {}), 'NAME': os.path.join(tmp, 'stress.sqlite3')}
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                self._stress(options)
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def _stress(self, options):
+        doctor, appt_type, users, day = self._seed(options['threads'])
+        outcomes = Counter()
+        lock = threading.Lock()
+        barrier = threading.Barrier(options['threads'])
+        # 30-minute bookings on a 15-minute grid, so neighbouring starts overlap too
+        starts = [time(9 + m // 60, m % 60) for m in range(0, 4 * 60, 15)]
+
+        def worker(user):
+            local = Counter()
+            try:
+                barrier.wait()
+                for _ in range(options['attempts']):
+                    local[self._book(user, doctor, appt_type, day, random.choice(starts), options['skip_validation'])] += 1
+            finally:
+                connection.close()
+                with lock:
+                    outcomes.update(local)
+
+        threads = [threading.Thread(target=worker, args=(user,)) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        overlaps = self._count_overlaps(doctor, day)
+        stored = Appointment.objects.filter(doctor=doctor, appointment_date=day).count()
+        self.stdout.write(
+            f"booked={outcomes['booked']} rejected_by_form={outcomes['invalid']} "
+            f"rejected_by_constraint={outcomes['conflict']} locked={outcomes['locked']} "
+            f"stored={stored} double_bookings={overlaps}"
+        )
+        if overlaps:
+            self.stderr.write("Double bookings detected!")
+
+    def _book(self, user, doctor, appt_type, day, start, skip_validation):
+        if skip_validation:
+            appointment = Appointment(doctor=doctor, appointment_type=appt_type, appointment_date=day, appointment_time=start)
+        else:
+            form = AppointmentForm({
+                'doctor': doctor.pk, 'appointment_type': appt_type.pk,
+                'appointment_date': day.isoformat(), 'appointment_time': start.strftime('%H:%M'),
+            })
+            if not form.is_valid():
+                return 'invalid'
+            appointment = form.save(commit=False)
+        appointment.user = user
+        appointment.status = 'scheduled'
+        try:
+            appointment.save()
+        except IntegrityError:
+            return 'conflict'
+        except OperationalError:
+            return 'locked'
+        return 'booked'
+
+    def _count_overlaps(self, doctor, day):
+        rows = sorted(Appointment.objects.filter(doctor=doctor, appointment_date=day).values_list('appointment_time', 'end_time'))
+        overlaps = 0
+        latest_end = None
+        for start, end in rows:
+            if latest_end is not None and start < latest_end:
+                overlaps += 1
+            latest_end = end if latest_end is None else max(latest_end, end)
+        return overlaps
+
+    def _seed(self, thread_count):
+        tag = random.randrange(10 ** 8)
+        appt_type = AppointmentType.objects.create(name=f'Stress {tag}', duration=30)
+        doctor = Doctor.objects.create(
+            user=User.objects.create(username=f'stress-doctor-{tag}'),
+            specialty='General', qualifications='MBChB', experience_years=5,
+            available_days='Mon-Fri', available_time_start=time(9, 0), available_time_end=time(17, 0),
+        )
+        doctor.appointment_types.add(appt_type)
+        users = [User.objects.create(username=f'stress-patient-{tag}-{i}') for i in range(thread_count)]
+        return doctor, appt_type, users, date.today() + timedelta(days=1)
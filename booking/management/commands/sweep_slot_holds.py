@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from booking import holds, waitlist
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired checkout slot holds in bulk and put waitlist entries whose offer expired back on the "
+        "waitlist. Safe to run from cron at any interval."
+    )
+
+    def handle(self, *args, **options):
+        expired = waitlist.expire_offers()
+        deleted = holds.sweep()
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {deleted} expired slot hold(s); requeued {expired} expired waitlist offer(s)."
+        ))
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.1 on 2026-10-18 17:04
+
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_end_time(apps, schema_editor):
+    Appointment = apps.get_model('booking', 'Appointment')
+    appointments = Appointment.objects.select_related('appointment_type').only(
+        'appointment_date', 'appointment_time', 'appointment_type__duration'
+    )
+    batch = []
+    for appointment in appointments.iterator(chunk_size=1000):
+        start = datetime.combine(appointment.appointment_date, appointment.appointment_time)
+        end = start + timedelta(minutes=appointment.appointment_type.duration)
+        appointment.end_time = end.time() if end.date() == start.date() else time.max
+        batch.append(appointment)
+        if len(batch) >= 1000:
+            Appointment.objects.bulk_update(batch, ['end_time'])
+            batch = []
+    if batch:
+        Appointment.objects.bulk_update(batch, ['end_time'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0004_alter_notification_options_remove_notification_user_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='end_time',
+            field=models.TimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['doctor', 'appointment_date', 'appointment_time'], name='booking_app_doctor__c4da0c_idx'),
+        ),
+        migrations.RunPython(backfill_end_time, migrations.RunPython.noop),
+    ]
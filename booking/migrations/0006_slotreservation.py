@@ -0,0 +1,57 @@
+# Generated by Django 5.1.1 on 2026-10-18 17:05
+
+from datetime import time
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+SLOT_UNIT_MINUTES = 5
+
+
+def backfill_reservations(apps, schema_editor):
+    Appointment = apps.get_model('booking', 'Appointment')
+    SlotReservation = apps.get_model('booking', 'SlotReservation')
+    batch = []
+    # canceled appointments hold no slots; left in, they could take units from a live rebooking
+    for appointment in Appointment.objects.exclude(end_time=None).exclude(status='canceled').iterator(chunk_size=1000):
+        start = appointment.appointment_time.hour * 60 + appointment.appointment_time.minute
+        end_time = appointment.end_time
+        if end_time == time.max:
+            end = 24 * 60
+        else:
+            end = end_time.hour * 60 + end_time.minute + (1 if end_time.second or end_time.microsecond else 0)
+        for unit in range(start // SLOT_UNIT_MINUTES, -(-end // SLOT_UNIT_MINUTES)):
+            batch.append(SlotReservation(
+                doctor_id=appointment.doctor_id, appointment_id=appointment.pk,
+                date=appointment.appointment_date, unit=unit,
+            ))
+        if len(batch) >= 1000:
+            # pre-existing overlaps keep whichever booking claimed the unit first
+            SlotReservation.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        SlotReservation.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0005_appointment_end_time'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlotReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('unit', models.PositiveSmallIntegerField()),
+                ('appointment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slot_reservations', to='booking.appointment')),
+                ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slot_reservations', to='booking.doctor')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('doctor', 'date', 'unit'), name='unique_doctor_slot_unit')],
+            },
+        ),
+        migrations.RunPython(backfill_reservations, migrations.RunPython.noop),
+    ]
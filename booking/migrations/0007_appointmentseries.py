@@ -0,0 +1,92 @@
+# Generated by Django 5.1.1 on 2026-10-18 17:09
+
+from datetime import time
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+SLOT_UNIT_MINUTES = 5
+
+
+def _units(appointment):
+    start = appointment.appointment_time.hour * 60 + appointment.appointment_time.minute
+    end_time = appointment.end_time
+    if end_time == time.max:
+        end = 24 * 60
+    else:
+        end = end_time.hour * 60 + end_time.minute + (1 if end_time.second or end_time.microsecond else 0)
+    return range(start // SLOT_UNIT_MINUTES, -(-end // SLOT_UNIT_MINUTES))
+
+
+def release_canceled_reservations(apps, schema_editor):
+    """
+    Canceled appointments no longer hold their slots. An older 0006 reserved
+    them too, so a live booking at a canceled one's time may have had units
+    skipped as conflicts; the live bookings on those doctor/days reserve
+    their units again once the canceled rows are gone.
+    """
+    Appointment = apps.get_model('booking', 'Appointment')
+    SlotReservation = apps.get_model('booking', 'SlotReservation')
+    canceled = SlotReservation.objects.filter(appointment__status='canceled')
+    days = set(canceled.values_list('doctor_id', 'date').distinct())
+    canceled.delete()
+    batch = []
+    live = Appointment.objects.exclude(end_time=None).exclude(status='canceled')
+    for appointment in live.filter(doctor_id__in={doctor_id for doctor_id, _ in days}).iterator(chunk_size=1000):
+        if (appointment.doctor_id, appointment.appointment_date) not in days:
+            continue
+        batch.extend(
+            SlotReservation(doctor_id=appointment.doctor_id, appointment_id=appointment.pk, date=appointment.appointment_date, unit=unit)
+            for unit in _units(appointment)
+        )
+        if len(batch) >= 1000:
+            # units the booking still holds, or another live booking took first, are skipped
+            SlotReservation.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        SlotReservation.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0006_slotreservation'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='occurrence_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='AppointmentSeries',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('appointment_time', models.TimeField()),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('interval_weeks', models.PositiveSmallIntegerField(default=1)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('appointment_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='booking.appointmenttype')),
+                ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='appointment_series', to='booking.doctor')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='appointment_series', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='appointment',
+            name='series',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='overrides', to='booking.appointmentseries'),
+        ),
+        migrations.AddConstraint(
+            model_name='appointment',
+            constraint=models.UniqueConstraint(fields=('series', 'occurrence_date'), name='unique_series_occurrence'),
+        ),
+        migrations.AddIndex(
+            model_name='appointmentseries',
+            index=models.Index(fields=['doctor', 'start_date', 'end_date'], name='booking_app_doctor__2d3f8a_idx'),
+        ),
+        migrations.RunPython(release_canceled_reservations, migrations.RunPython.noop),
+    ]
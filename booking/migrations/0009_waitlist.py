@@ -0,0 +1,46 @@
+# Generated by Django 5.1.1 on 2026-10-18 17:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0008_slothold'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WaitlistEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('specialty', models.CharField(blank=True, max_length=100)),
+                ('earliest_date', models.DateField()),
+                ('latest_date', models.DateField()),
+                ('status', models.CharField(choices=[('waiting', 'Waiting'), ('offered', 'Offered'), ('withdrawn', 'Withdrawn')], default='waiting', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('offered_date', models.DateField(blank=True, null=True)),
+                ('offered_time', models.TimeField(blank=True, null=True)),
+                ('appointment_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='booking.appointmenttype')),
+                ('doctor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to='booking.doctor')),
+                ('offered_doctor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='booking.doctor')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='WaitlistSlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('created_at', models.DateTimeField()),
+                ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='booking.doctor')),
+                ('entry', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slots', to='booking.waitlistentry')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['doctor', 'date', 'created_at'], name='booking_wai_doctor__0064cd_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,136 @@
+# Generated by Django 5.1.1 on 2026-10-18 17:16
+
+import re
+from datetime import date, timedelta
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+OPEN_DAYS_HORIZON = 365
+
+# copies of booking.schedule as of this migration, so later changes there do not change what it does
+ALL_WEEKDAYS = 0b1111111
+WEEKDAY_NAMES = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+
+_ALIASES = {name.lower(): i for i, name in enumerate(WEEKDAY_NAMES)}
+_ALIASES.update({
+    'monday': 0, 'tues': 1, 'tuesday': 1, 'wednesday': 2, 'thur': 3, 'thurs': 3, 'thursday': 3,
+    'friday': 4, 'saturday': 5, 'sunday': 6,
+})
+
+
+def parse_weekdays(text):
+    text = (text or '').strip().lower()
+    if text in ('daily', 'everyday', 'every day', 'all', 'all days'):
+        return ALL_WEEKDAYS
+    if text in ('weekdays',):
+        return 0b0011111
+    mask = 0
+    text = re.sub(r'\s*(?:-|–|\bto\b)\s*', '-', text)
+    for part in re.split(r'(?:[,;/&\s]|\band\b)+', text):
+        part = part.strip('.')
+        if not part:
+            continue
+        bounds = part.split('-')
+        if len(bounds) == 1 and bounds[0] in _ALIASES:
+            mask |= 1 << _ALIASES[bounds[0]]
+        elif len(bounds) == 2 and bounds[0] in _ALIASES and bounds[1] in _ALIASES:
+            first, last = _ALIASES[bounds[0]], _ALIASES[bounds[1]]
+            day = first
+            while True:
+                mask |= 1 << day
+                if day == last:
+                    break
+                day = (day + 1) % 7
+        else:
+            return None
+    return mask or None
+
+
+def format_weekdays(mask):
+    days = [i for i in range(7) if mask & (1 << i)]
+    parts = []
+    i = 0
+    while i < len(days):
+        j = i
+        while j + 1 < len(days) and days[j + 1] == days[j] + 1:
+            j += 1
+        if j - i >= 2:
+            parts.append(f"{WEEKDAY_NAMES[days[i]]}-{WEEKDAY_NAMES[days[j]]}")
+        else:
+            parts.extend(WEEKDAY_NAMES[d] for d in days[i:j + 1])
+        i = j + 1
+    return ', '.join(parts)
+
+
+def convert_available_days(apps, schema_editor):
+    """Parse the free-text available_days into the bitmask and build the open days index."""
+    Doctor = apps.get_model('booking', 'Doctor')
+    DoctorOpenDay = apps.get_model('booking', 'DoctorOpenDay')
+    today = date.today()
+    dates = [today + timedelta(days=n) for n in range(OPEN_DAYS_HORIZON)]
+    for doctor in Doctor.objects.all():
+        # unreadable text keeps the old behaviour of bookable every day
+        mask = parse_weekdays(doctor.available_days) or ALL_WEEKDAYS
+        doctor.working_weekdays = mask
+        doctor.available_days = format_weekdays(mask)
+        doctor.save(update_fields=['working_weekdays', 'available_days'])
+        DoctorOpenDay.objects.bulk_create(
+            [DoctorOpenDay(doctor_id=doctor.pk, date=day) for day in dates if mask & (1 << day.weekday())],
+            batch_size=2000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0009_waitlist'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='doctor',
+            name='working_weekdays',
+            field=models.PositiveSmallIntegerField(default=127),
+        ),
+        migrations.CreateModel(
+            name='DoctorOpenDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='open_days', to='booking.doctor')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('date', 'doctor'), name='unique_doctor_open_day')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ScheduleException',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('start_time', models.TimeField(blank=True, null=True)),
+                ('end_time', models.TimeField(blank=True, null=True)),
+                ('reason', models.CharField(blank=True, max_length=100)),
+                ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='schedule_exceptions', to='booking.doctor')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['doctor', 'date'], name='booking_sch_doctor__c30742_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='WorkingHours',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.PositiveSmallIntegerField(choices=[(0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'), (4, 'Friday'), (5, 'Saturday'), (6, 'Sunday')])),
+                ('start_time', models.TimeField()),
+                ('end_time', models.TimeField()),
+                ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='working_hours', to='booking.doctor')),
+            ],
+            options={
+                'ordering': ['weekday', 'start_time'],
+                'indexes': [models.Index(fields=['doctor', 'weekday'], name='booking_wor_doctor__89c269_idx')],
+            },
+        ),
+        migrations.RunPython(convert_available_days, migrations.RunPython.noop),
+    ]
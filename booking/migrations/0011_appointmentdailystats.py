@@ -0,0 +1,46 @@
+# Generated by Django 5.1.1 on 2026-10-18 17:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_daily_stats(apps, schema_editor):
+    Appointment = apps.get_model('booking', 'Appointment')
+    AppointmentDailyStats = apps.get_model('booking', 'AppointmentDailyStats')
+    rows = Appointment.objects.values('appointment_date', 'doctor_id', 'appointment_type_id', 'status').annotate(n=Count('id')).order_by()
+    AppointmentDailyStats.objects.bulk_create(
+        [
+            AppointmentDailyStats(
+                date=row['appointment_date'], doctor_id=row['doctor_id'],
+                appointment_type_id=row['appointment_type_id'], status=row['status'], count=row['n'],
+            )
+            for row in rows
+        ],
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0010_doctor_schedule'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AppointmentDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('status', models.CharField(max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('appointment_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='booking.appointmenttype')),
+                ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='booking.doctor')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('date', 'doctor', 'appointment_type', 'status'), name='unique_daily_stats_key')],
+            },
+        ),
+        migrations.RunPython(backfill_daily_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.1 on 2026-10-18 19:02
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0012_reportjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointmentdailystats',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
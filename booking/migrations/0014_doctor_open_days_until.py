@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-18 18:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0013_appointmentdailystats_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='doctor',
+            name='open_days_until',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+    ]
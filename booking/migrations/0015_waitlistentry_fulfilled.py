@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-18 18:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0014_doctor_open_days_until'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='waitlistentry',
+            name='status',
+            field=models.CharField(choices=[('waiting', 'Waiting'), ('offered', 'Offered'), ('fulfilled', 'Booked'), ('withdrawn', 'Withdrawn')], default='waiting', max_length=20),
+        ),
+    ]
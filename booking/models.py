@@ -1,6 +1,6 @@
 from django.contrib.auth.models import User
-from django.db import models
-from datetime import datetime, timedelta
+from django.db import models, transaction
+from datetime import datetime, time, timedelta
 
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
@@ -13,6 +13,8 @@ class UserProfile(models.Model):
     def __str__(self):
         return f"{self.user.username}'s Profile"
 
+ALL_WEEKDAYS = 0b1111111
+
 class Doctor(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     specialty = models.CharField(max_length=100)
@@ -20,14 +22,72 @@ class Doctor(models.Model):
     experience_years = models.PositiveIntegerField()
     languages_spoken = models.CharField(max_length=100, blank=True)
     rating = models.FloatField(default=0.0)
-    available_days = models.CharField(max_length=100)
+    available_days = models.CharField(max_length=100)  # display text, derived from working_weekdays
+    # bit n set = works on weekday n (Monday is 0, as in date.weekday())
+    working_weekdays = models.PositiveSmallIntegerField(default=ALL_WEEKDAYS)
+    # default daily hours; WorkingHours rows override them per weekday
     available_time_start = models.TimeField()
     available_time_end = models.TimeField()
+    # last date the DoctorOpenDay index is built to; None when unknown
+    open_days_until = models.DateField(null=True, blank=True, editable=False)
     appointment_types = models.ManyToManyField('AppointmentType', related_name='doctors')
 
     def __str__(self):
         return f"{self.user.username} - {self.specialty}"
 
+    def works_on(self, day):
+        return bool(self.working_weekdays & (1 << day.weekday()))
+
+class WorkingHours(models.Model):
+    """Working interval of a doctor on one weekday; several rows make a split shift."""
+    WEEKDAY_CHOICES = [(0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'), (4, 'Friday'), (5, 'Saturday'), (6, 'Sunday')]
+
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='working_hours')
+    weekday = models.PositiveSmallIntegerField(choices=WEEKDAY_CHOICES)
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+
+    class Meta:
+        ordering = ['weekday', 'start_time']
+        indexes = [
+            models.Index(fields=['doctor', 'weekday']),
+        ]
+
+class ScheduleException(models.Model):
+    """
+    A date on which a doctor's weekly schedule does not apply. A row without
+    times closes the whole day (leave, holiday); rows with times replace that
+    day's hours.
+    """
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='schedule_exceptions')
+    date = models.DateField()
+    start_time = models.TimeField(null=True, blank=True)
+    end_time = models.TimeField(null=True, blank=True)
+    reason = models.CharField(max_length=100, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['doctor', 'date']),
+        ]
+
+class DoctorOpenDay(models.Model):
+    """
+    Precomputed index of the dates a doctor works, maintained by
+    booking.schedule. Searches over a date range read it with one query on
+    (date, doctor) and skip closed days without loading any schedule.
+    """
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='open_days')
+    date = models.DateField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'doctor'], name='unique_doctor_open_day'),
+        ]
+
+# granularity of SlotReservation rows; durations that are not a multiple of
+# this are rounded outward to whole units
+SLOT_UNIT_MINUTES = 5
+
 class AppointmentType(models.Model):
     name = models.CharField(max_length=100)
     duration = models.PositiveIntegerField()
@@ -35,6 +95,56 @@ class AppointmentType(models.Model):
     def __str__(self):
         return self.name
 
+class AppointmentSeries(models.Model):
+    """
+    A recurring booking (every `interval_weeks` weeks from start_date until
+    end_date). Occurrences are not stored; they are expanded on demand for a
+    date window by booking.recurrence. An occurrence becomes a real
+    Appointment row (with `series` and `occurrence_date` set) only once it is
+    rescheduled or cancelled.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='appointment_series')
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='appointment_series')
+    appointment_type = models.ForeignKey(AppointmentType, on_delete=models.CASCADE)
+    appointment_time = models.TimeField()
+    start_date = models.DateField()
+    end_date = models.DateField()
+    interval_weeks = models.PositiveSmallIntegerField(default=1)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['doctor', 'start_date', 'end_date']),
+        ]
+
+    def __str__(self):
+        return f"Every {self.interval_weeks} week(s) with {self.doctor.user.username} at {self.appointment_time} from {self.start_date} to {self.end_date}"
+
+    def dates_between(self, start, end):
+        """Occurrence dates falling within [start, end]."""
+        step = 7 * self.interval_weeks
+        first = max(start, self.start_date)
+        offset = (first - self.start_date).days
+        day = self.start_date + timedelta(days=-(-offset // step) * step)
+        last = min(end, self.end_date)
+        dates = []
+        while day <= last:
+            dates.append(day)
+            day += timedelta(days=step)
+        return dates
+
+    def occurs_on(self, day):
+        return self.start_date <= day <= self.end_date and (day - self.start_date).days % (7 * self.interval_weeks) == 0
+
+    def occurrence(self, day):
+        """An unsaved Appointment standing in for the occurrence on `day`."""
+        return Appointment(
+            user=self.user, doctor=self.doctor, appointment_type=self.appointment_type,
+            appointment_date=day, appointment_time=self.appointment_time,
+            end_time=Appointment.compute_end_time(day, self.appointment_time, self.appointment_type.duration),
+            status='scheduled', series=self, occurrence_date=day,
+        )
+
 class Appointment(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='appointments')
     doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='appointments')
@@ -42,22 +152,200 @@ class Appointment(models.Model):
     appointment_date = models.DateField()
     appointment_time = models.TimeField()
     status = models.CharField(max_length=20, choices=[('scheduled', 'Scheduled'), ('completed', 'Completed'), ('canceled', 'Canceled')])
+    # denormalized from appointment_type.duration so overlap checks are a single range query
+    end_time = models.TimeField(null=True, blank=True, editable=False)
+    # set when this row overrides (reschedules or cancels) one occurrence of a series
+    series = models.ForeignKey(AppointmentSeries, on_delete=models.CASCADE, null=True, blank=True, related_name='overrides')
+    occurrence_date = models.DateField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         indexes = [
-            models.Index(fields=['appointment_date']),
+            models.Index(fields=['appointment_date', 'updated_at']),
+            models.Index(fields=['doctor', 'appointment_date', 'appointment_time']),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['series', 'occurrence_date'], name='unique_series_occurrence'),
         ]
 
     def __str__(self):
         return f"Appointment with {self.doctor.user.username} on {self.appointment_date} at {self.appointment_time}"
 
+    @staticmethod
+    def compute_end_time(appointment_date, appointment_time, duration):
+        """End time for a start and duration, capped at midnight so ranges never wrap."""
+        start_datetime = datetime.combine(appointment_date, appointment_time)
+        end_datetime = start_datetime + timedelta(minutes=duration)
+        if end_datetime.date() != start_datetime.date():
+            return time.max
+        return end_datetime.time()
+
     def get_end_time(self):
         """Calculate the end time of the appointment based on its type duration."""
-        start_datetime = datetime.combine(self.appointment_date, self.appointment_time)
-        end_datetime = start_datetime + timedelta(minutes=self.appointment_type.duration)
-        return end_datetime.time()
+        return self.compute_end_time(self.appointment_date, self.appointment_time, self.appointment_type.duration)
+
+    @property
+    def is_occurrence(self):
+        """True for a not-yet-materialized occurrence of a series."""
+        return self.pk is None and self.series_id is not None
+
+    # fields whose change moves or releases the appointment's slot reservations
+    SLOT_FIELDS = {'doctor', 'appointment_type', 'appointment_date', 'appointment_time', 'status'}
+
+    def slot_units(self):
+        """Indexes of the SLOT_UNIT_MINUTES blocks of the day this appointment occupies."""
+        start = self.appointment_time.hour * 60 + self.appointment_time.minute
+        if self.end_time == time.max:
+            end = 24 * 60
+        else:
+            end = self.end_time.hour * 60 + self.end_time.minute + (1 if self.end_time.second or self.end_time.microsecond else 0)
+        return range(start // SLOT_UNIT_MINUTES, -(-end // SLOT_UNIT_MINUTES))
+
+    def save(self, *args, **kwargs):
+        self.end_time = self.get_end_time()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'end_time' not in update_fields:
+            kwargs['update_fields'] = [*update_fields, 'end_time']
+        # the appointment and its slot reservations commit together; a clash on
+        # SlotReservation's unique constraint raises IntegrityError and rolls both back
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if update_fields is None or set(update_fields) & self.SLOT_FIELDS:
+                self.reserve_slots()
+
+    def reserve_slots(self):
+        SlotReservation.objects.filter(appointment=self).delete()
+        if self.status == 'canceled':
+            return
+        SlotReservation.objects.bulk_create([
+            SlotReservation(doctor_id=self.doctor_id, appointment=self, date=self.appointment_date, unit=unit)
+            for unit in self.slot_units()
+        ])
+
+class SlotReservation(models.Model):
+    """
+    One row per SLOT_UNIT_MINUTES block held by an appointment. The unique
+    constraint makes the database reject double bookings: concurrent bookers
+    of different slots never touch the same rows, while conflicting ones fail
+    fast on insert.
+    """
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='slot_reservations')
+    appointment = models.ForeignKey(Appointment, on_delete=models.CASCADE, related_name='slot_reservations')
+    date = models.DateField()
+    unit = models.PositiveSmallIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['doctor', 'date', 'unit'], name='unique_doctor_slot_unit'),
+        ]
+
+class SlotHold(models.Model):
+    """
+    A short-lived claim on a slot while its user goes through checkout. Rows
+    are the fallback behind the per-day cache in booking.holds; expired rows
+    are ignored by readers and deleted in bulk by booking.holds.sweep.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='slot_holds')
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='slot_holds')
+    date = models.DateField()
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['doctor', 'date', 'expires_at']),
+        ]
+
+class AppointmentDailyStats(models.Model):
+    """
+    Number of appointments per (date, doctor, appointment type, status),
+    kept up to date by booking.rollup so reports aggregate these rows
+    instead of every appointment.
+    """
+    date = models.DateField()
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='+')
+    appointment_type = models.ForeignKey(AppointmentType, on_delete=models.CASCADE, related_name='+')
+    status = models.CharField(max_length=20)
+    count = models.IntegerField(default=0)
+    # set on every change to an appointment counted here; report data versions are read from it
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'doctor', 'appointment_type', 'status'], name='unique_daily_stats_key'),
+        ]
+
+class WaitlistEntry(models.Model):
+    """
+    A patient waiting for a slot with a given doctor (or any doctor of a
+    specialty) between earliest_date and latest_date. While waiting, the entry
+    is indexed by WaitlistSlot rows, one per (doctor, date) it would accept.
+    """
+    STATUS_CHOICES = [('waiting', 'Waiting'), ('offered', 'Offered'), ('fulfilled', 'Booked'), ('withdrawn', 'Withdrawn')]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='waitlist_entries')
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, null=True, blank=True, related_name='waitlist_entries')
+    specialty = models.CharField(max_length=100, blank=True)
+    appointment_type = models.ForeignKey(AppointmentType, on_delete=models.CASCADE)
+    earliest_date = models.DateField()
+    latest_date = models.DateField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='waiting')
+    created_at = models.DateTimeField(auto_now_add=True)
+    # the slot held for this patient once a cancellation was offered to them
+    offered_doctor = models.ForeignKey(Doctor, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    offered_date = models.DateField(null=True, blank=True)
+    offered_time = models.TimeField(null=True, blank=True)
+
+    def __str__(self):
+        target = self.doctor.user.username if self.doctor_id else self.specialty
+        return f"{self.user.username} waiting for {target} ({self.earliest_date} - {self.latest_date})"
+
+class WaitlistSlot(models.Model):
+    """
+    Index row: `entry` accepts a slot with `doctor` on `date`. The matcher
+    finds the longest-waiting entry for a freed doctor/date with one seek on
+    (doctor, date, created_at) instead of scanning the waitlist.
+    """
+    entry = models.ForeignKey(WaitlistEntry, on_delete=models.CASCADE, related_name='slots')
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='+')
+    date = models.DateField()
+    created_at = models.DateTimeField()  # copied from the entry so ordering stays inside the index
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['doctor', 'date', 'created_at']),
+        ]
+
+class ReportJob(models.Model):
+    """
+    A report PDF to render in the background (see booking.report_jobs). Jobs
+    for the same cache_key share one rendered file, and the run_report_worker
+    command claims queued jobs oldest first.
+    """
+    STATUS_CHOICES = [('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')]
+
+    report_type = models.CharField(max_length=10)
+    start_date = models.DateField()
+    end_date = models.DateField()
+    data_version = models.CharField(max_length=40)
+    cache_key = models.CharField(max_length=100, db_index=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='report_jobs')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.report_type} report {self.start_date} - {self.end_date} ({self.status})"
 
 class HealthRecord(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -0,0 +1,123 @@
+"""
+PDF rendering service for report HTML.
+
+WeasyPrint runs in a persistent process pool (BOOKING_PDF_WORKERS processes,
+0 renders in the calling process). Each worker is warmed once: it builds a
+shared FontConfiguration, parses the report stylesheets and lays out a small
+document, so later renders skip font discovery and CSS parsing and do not
+hold the caller's GIL. Workers are started with "spawn" so they never
+inherit the caller's database connections or threads. WeasyPrint itself is
+imported on first use through booking.lazy.
+
+stats() reports render counts, timings and throughput for this process.
+"""
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from django.conf import settings
+
+from . import lazy
+
+logger = logging.getLogger(__name__)
+
+WORKERS = getattr(settings, "BOOKING_PDF_WORKERS", 2)
+STYLESHEETS = [str(Path(__file__).resolve().parent / 'static' / 'css' / 'report_pdf.css')]
+
+_WARMUP_HTML = '<h1>Report</h1><table><tr><th>Warm</th><td>up</td></tr></table>'
+
+# per-process WeasyPrint state, filled by _warm()
+_state = {}
+
+_pool = None
+_lock = threading.Lock()
+_metrics = {'renders': 0, 'failures': 0, 'render_seconds': 0.0, 'wall_seconds': 0.0, 'bytes': 0, 'pool_starts': 0}
+
+
+def _warm(stylesheets=STYLESHEETS):
+    weasyprint = lazy.load('weasyprint')
+    font_config = lazy.load('weasyprint.text.fonts').FontConfiguration()
+    _state['font_config'] = font_config
+    _state['stylesheets'] = [weasyprint.CSS(filename=path, font_config=font_config) for path in stylesheets]
+    weasyprint.HTML(string=_WARMUP_HTML).write_pdf(stylesheets=_state['stylesheets'], font_config=font_config)
+
+
+def _render(html):
+    """(pdf bytes, seconds spent in WeasyPrint) using this process's warm state."""
+    if not _state:
+        _warm()
+    started = time.perf_counter()
+    pdf = lazy.load('weasyprint').HTML(string=html).write_pdf(stylesheets=_state['stylesheets'], font_config=_state['font_config'])
+    return pdf, time.perf_counter() - started
+
+
+def get_pool():
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=WORKERS, mp_context=multiprocessing.get_context('spawn'),
+                initializer=_warm, initargs=(STYLESHEETS,),
+            )
+            _metrics['pool_starts'] += 1
+        return _pool
+
+
+def shutdown():
+    global _pool
+    with _lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True)
+
+
+def _record(wall, render_seconds=0.0, size=0, failed=False):
+    with _lock:
+        if failed:
+            _metrics['failures'] += 1
+            return
+        _metrics['renders'] += 1
+        _metrics['render_seconds'] += render_seconds
+        _metrics['wall_seconds'] += wall
+        _metrics['bytes'] += size
+
+
+def render(html):
+    """PDF bytes for an HTML string, rendered by a warm worker."""
+    started = time.perf_counter()
+    try:
+        if WORKERS > 0:
+            try:
+                pdf, seconds = get_pool().submit(_render, html).result()
+            except BrokenProcessPool:
+                # a worker died (e.g. killed for memory); start a fresh pool and retry once
+                logger.warning("PDF worker pool broke; restarting it")
+                shutdown()
+                pdf, seconds = get_pool().submit(_render, html).result()
+        else:
+            pdf, seconds = _render(html)
+    except Exception:
+        _record(time.perf_counter() - started, failed=True)
+        raise
+    _record(time.perf_counter() - started, seconds, len(pdf))
+    return pdf
+
+
+def stats():
+    with _lock:
+        m = dict(_metrics)
+    renders = m['renders']
+    return {
+        'workers': WORKERS,
+        'renders': renders,
+        'failures': m['failures'],
+        'pool_starts': m['pool_starts'],
+        'avg_render_ms': round(m['render_seconds'] / renders * 1000, 2) if renders else 0.0,
+        'avg_wall_ms': round(m['wall_seconds'] / renders * 1000, 2) if renders else 0.0,
+        'renders_per_second': round(renders / m['wall_seconds'], 2) if m['wall_seconds'] else 0.0,
+        'avg_pdf_bytes': m['bytes'] // renders if renders else 0,
+    }
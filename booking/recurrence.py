@@ -0,0 +1,131 @@
+"""
+Lazy expansion of AppointmentSeries into occurrences.
+
+Occurrences are never stored up front. Callers ask for the ones inside a date
+window (list views) or on a single day for a set of doctors (slot engine), and
+get unsaved Appointment instances or plain intervals back. Occurrences that
+were already materialized as Appointment rows (rescheduled or cancelled) are
+skipped, since those rows speak for themselves.
+"""
+from collections import defaultdict
+
+from .models import AppointmentSeries, Appointment
+
+
+def expand(series_qs, start, end):
+    """Unsaved occurrence Appointments of `series_qs` within [start, end], ordered by date and time."""
+    series_list = list(
+        series_qs.filter(start_date__lte=end, end_date__gte=start).select_related('user', 'doctor__user', 'appointment_type')
+    )
+    if not series_list:
+        return []
+    overridden = set(
+        Appointment.objects.filter(series__in=series_list, occurrence_date__range=(start, end)).values_list('series_id', 'occurrence_date')
+    )
+    occurrences = [
+        series.occurrence(day)
+        for series in series_list
+        for day in series.dates_between(start, end)
+        if (series.pk, day) not in overridden
+    ]
+    occurrences.sort(key=lambda a: (a.appointment_date, a.appointment_time))
+    return occurrences
+
+
+def occurrence_times(doctor_ids, day, exclude_series=None):
+    """
+    {doctor_id: [(start_time, end_time), ...]} for the unmaterialized series
+    occurrences on `day`. `exclude_series` skips one series, which is how an
+    occurrence being materialized avoids colliding with itself.
+    """
+    candidates = AppointmentSeries.objects.filter(
+        doctor_id__in=doctor_ids, start_date__lte=day, end_date__gte=day, start_date__iso_week_day=day.isoweekday(),
+    )
+    if exclude_series is not None:
+        candidates = candidates.exclude(pk=exclude_series)
+    rows = []
+    for pk, doctor_id, start, duration, start_date, interval_weeks in candidates.values_list(
+        'pk', 'doctor_id', 'appointment_time', 'appointment_type__duration', 'start_date', 'interval_weeks'
+    ):
+        if (day - start_date).days % (7 * interval_weeks) == 0:
+            rows.append((pk, doctor_id, (start, Appointment.compute_end_time(day, start, duration))))
+    if not rows:
+        return {}
+    overridden = set(
+        Appointment.objects.filter(series_id__in=[pk for pk, _, _ in rows], occurrence_date=day).values_list('series_id', flat=True)
+    )
+    times = defaultdict(list)
+    for pk, doctor_id, span in rows:
+        if pk not in overridden:
+            times[doctor_id].append(span)
+    return times
+
+
+def occurrence_times_between(doctor_ids, start, end):
+    """
+    {(date, doctor_id): [(start_time, end_time), ...]} for the unmaterialized
+    series occurrences within [start, end]: one query for the series and one
+    for their overrides, whatever the number of days.
+    """
+    candidates = list(
+        AppointmentSeries.objects.filter(doctor_id__in=doctor_ids, start_date__lte=end, end_date__gte=start)
+        .select_related('appointment_type')
+    )
+    if not candidates:
+        return {}
+    overridden = set(
+        Appointment.objects.filter(series__in=candidates, occurrence_date__range=(start, end)).values_list('series_id', 'occurrence_date')
+    )
+    times = defaultdict(list)
+    for series in candidates:
+        for day in series.dates_between(start, end):
+            if (series.pk, day) not in overridden:
+                times[(day, series.doctor_id)].append(
+                    (series.appointment_time, Appointment.compute_end_time(day, series.appointment_time, series.appointment_type.duration))
+                )
+    return times
+
+
+def conflicting_dates(doctor, dates, start_time, duration, exclude_series=None):
+    """
+    Dates from `dates` on which a booking of `duration` minutes at start_time
+    would overlap an appointment or another series occurrence. Uses one query
+    for appointments and one for series, whatever the number of dates.
+    """
+    dates = sorted(set(dates))
+    if not dates:
+        return []
+    ends = {day: Appointment.compute_end_time(day, start_time, duration) for day in dates}
+    clashes = set()
+
+    booked = Appointment.objects.filter(
+        doctor=doctor, appointment_date__in=dates, appointment_time__lt=max(ends.values()), end_time__gt=start_time,
+    ).exclude(status='canceled')
+    for day, other_start, other_end in booked.values_list('appointment_date', 'appointment_time', 'end_time'):
+        if other_start < ends[day] and other_end > start_time:
+            clashes.add(day)
+
+    others = AppointmentSeries.objects.filter(doctor=doctor, start_date__lte=dates[-1], end_date__gte=dates[0]).select_related('appointment_type')
+    if exclude_series is not None:
+        others = others.exclude(pk=exclude_series)
+    others = list(others)
+    overridden = set(
+        Appointment.objects.filter(series__in=others, occurrence_date__in=dates).values_list('series_id', 'occurrence_date')
+    ) if others else set()
+    for series in others:
+        for day in dates:
+            if day in clashes or not series.occurs_on(day) or (series.pk, day) in overridden:
+                continue
+            other_end = Appointment.compute_end_time(day, series.appointment_time, series.appointment_type.duration)
+            if series.appointment_time < ends[day] and other_end > start_time:
+                clashes.add(day)
+    return sorted(clashes)
+
+
+def materialize(series, day, **changes):
+    """Turn the occurrence on `day` into a real Appointment row, applying `changes`."""
+    appointment = series.occurrence(day)
+    for field, value in changes.items():
+        setattr(appointment, field, value)
+    appointment.save()
+    return appointment
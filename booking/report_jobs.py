@@ -0,0 +1,157 @@
+"""
+Background rendering of report PDFs.
+
+Requests enqueue a ReportJob instead of rendering inline; the
+run_report_worker management command claims queued jobs and writes the PDFs
+into a file cache. Files are named after their cache key: report type, date
+range and the report's data version (see booking.report_stats), so a
+report is rendered once per change to its data and every later request for
+it is served straight from disk.
+"""
+import logging
+import os
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import report_pdf, report_stats
+from .models import ReportJob
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = Path(getattr(settings, "BOOKING_REPORT_CACHE_DIR", settings.BASE_DIR / "report_cache"))
+CACHE_MAX_AGE = getattr(settings, "BOOKING_REPORT_CACHE_MAX_AGE", 7 * 24 * 3600)  # seconds a rendered file is kept
+MAX_ATTEMPTS = getattr(settings, "BOOKING_REPORT_JOB_ATTEMPTS", 3)
+# a job running longer than this is assumed to belong to a dead worker and is queued again
+JOB_TIMEOUT = getattr(settings, "BOOKING_REPORT_JOB_TIMEOUT", 300)
+POLL_INTERVAL = 0.5
+
+PENDING = ('queued', 'running')
+
+
+def report_key(report_type, today=None):
+    """(start, end, version, cache_key) of a report as of `today`."""
+    today = today or timezone.now().date()
+    start = report_stats.report_start(report_type, today)
+    version = report_stats.data_version(report_stats.report_filters(report_type, today))
+    return start, today, version, f"{report_type}_{start:%Y%m%d}_{today:%Y%m%d}_{version}"
+
+
+def cache_path(cache_key):
+    return CACHE_DIR / f"{cache_key}.pdf"
+
+
+def is_ready(job):
+    return job.status == 'done' and cache_path(job.cache_key).exists()
+
+
+def request(report_type, user=None, today=None):
+    """
+    `user`'s job for the current version of a report: a finished one when
+    its file is cached, else their pending job for the same key, else a new
+    job. Each requester gets their own job, so status and file URLs only
+    work for them; the file itself is rendered once per key.
+    """
+    start, end, version, key = report_key(report_type, today)
+    requested_by = user if user is not None and user.is_authenticated else None
+    if cache_path(key).exists():
+        job = ReportJob.objects.filter(cache_key=key, status='done', requested_by=requested_by).order_by('-finished_at').first()
+        if job is None:
+            # rendered for someone else, or by a job since deleted; record the hit
+            now = timezone.now()
+            job = ReportJob.objects.create(
+                report_type=report_type, start_date=start, end_date=end, data_version=version, cache_key=key,
+                status='done', requested_by=requested_by, started_at=now, finished_at=now,
+            )
+        return job
+    job = ReportJob.objects.filter(cache_key=key, status__in=PENDING, requested_by=requested_by).order_by('created_at').first()
+    if job is None:
+        job = ReportJob.objects.create(
+            report_type=report_type, start_date=start, end_date=end, data_version=version, cache_key=key,
+            requested_by=requested_by,
+        )
+    return job
+
+
+def wait(job, timeout):
+    """Poll until `job` finishes or `timeout` seconds pass; returns the refreshed job."""
+    deadline = time.monotonic() + timeout
+    while job.status in PENDING and time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        job.refresh_from_db()
+    return job
+
+
+def requeue_stale(now=None):
+    now = now or timezone.now()
+    stale = ReportJob.objects.filter(status='running', started_at__lt=now - timedelta(seconds=JOB_TIMEOUT))
+    requeued = stale.filter(attempts__lt=MAX_ATTEMPTS).update(status='queued')
+    stale.update(status='failed', error='Worker timed out', finished_at=now)
+    return requeued
+
+
+def claim_next():
+    """Atomically mark the oldest queued job running and return it; None when the queue is empty."""
+    while True:
+        pk = ReportJob.objects.filter(status='queued').order_by('created_at').values_list('pk', flat=True).first()
+        if pk is None:
+            return None
+        claimed = ReportJob.objects.filter(pk=pk, status='queued').update(
+            status='running', started_at=timezone.now(), attempts=F('attempts') + 1
+        )
+        if claimed:
+            return ReportJob.objects.get(pk=pk)
+        # another worker took it first
+
+
+def _write(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def _drop_superseded(job):
+    """Delete earlier versions of the same report and date range."""
+    prefix = f"{job.report_type}_{job.start_date:%Y%m%d}_{job.end_date:%Y%m%d}_"
+    for path in CACHE_DIR.glob(f"{prefix}*.pdf"):
+        if path.stem != job.cache_key:
+            path.unlink(missing_ok=True)
+
+
+def run(job):
+    """Render `job` into the file cache unless another job already did."""
+    path = cache_path(job.cache_key)
+    try:
+        if not path.exists():
+            _write(path, report_pdf.render_pdf(job.report_type, today=job.end_date))
+            _drop_superseded(job)
+    except Exception as e:
+        logger.exception("Rendering report job %s failed", job.pk)
+        status = 'queued' if job.attempts < MAX_ATTEMPTS else 'failed'
+        ReportJob.objects.filter(pk=job.pk).update(status=status, error=str(e)[:1000], finished_at=timezone.now())
+        job.refresh_from_db()
+        return job
+    # other requesters' jobs still queued for the same file are done too
+    ReportJob.objects.filter(Q(pk=job.pk) | Q(cache_key=job.cache_key, status='queued')).update(
+        status='done', error='', finished_at=timezone.now()
+    )
+    job.refresh_from_db()
+    return job
+
+
+def prune(max_age=CACHE_MAX_AGE):
+    """Delete cached files older than `max_age` seconds; returns how many were removed."""
+    if not CACHE_DIR.exists():
+        return 0
+    cutoff = time.time() - max_age
+    removed = 0
+    for path in CACHE_DIR.glob('*.pdf'):
+        if path.stat().st_mtime < cutoff:
+            path.unlink(missing_ok=True)
+            removed += 1
+    return removed
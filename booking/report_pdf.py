@@ -0,0 +1,63 @@
+"""
+Renders the weekly, monthly and yearly report PDFs.
+
+Charts are drawn server-side as inline SVG by booking.svg_charts (the PDF is
+rendered without JavaScript, so the Chart.js canvases of the report pages
+cannot be used) and kept in booking.chart_cache, so unchanged figures are
+never redrawn. The HTML is turned into a PDF by the warm worker pool in
+booking.pdf_renderer.
+"""
+import logging
+
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from . import chart_cache, pdf_renderer, report_stats, svg_charts
+
+logger = logging.getLogger(__name__)
+
+TIMELINE_STYLE = {'width': 700, 'height': 260, 'color': '#367fd8'}
+TYPE_STYLE = {'width': 500, 'height': 300, 'color': '#8e5ea2'}
+STATUS_STYLE = {'width': 400, 'height': 300, 'colors': ('#4CAF50', '#2196F3', '#F44336')}
+
+
+def _chart(kind, draw, labels, counts, style):
+    """SVG markup from the chart cache, drawn only on a miss."""
+    svg = chart_cache.get_or_render(
+        kind, {'labels': labels, 'counts': counts}, {**style, 'format': 'svg'},
+        lambda: draw(labels, counts, **style).encode('utf-8'), suffix='svg',
+    )
+    return svg.decode('utf-8')
+
+
+def chart_images(context):
+    """{'timeline', 'type', 'status'} inline SVG charts for a report_context(); empty if drawing fails."""
+    types = context['type_counts'] or [{'type': 'No data', 'count': 0}]
+    statuses = context['status_counts'] or [{'status': 'none', 'count': 1}]
+    try:
+        return {
+            'timeline': _chart('timeline', svg_charts.line_chart, context['timeline_labels'], context['timeline_data'], TIMELINE_STYLE),
+            'type': _chart('type', svg_charts.bar_chart, [row['type'] for row in types], [row['count'] for row in types], TYPE_STYLE),
+            'status': _chart('status', svg_charts.pie_chart, [row['status'] for row in statuses], [row['count'] for row in statuses], STATUS_STYLE),
+        }
+    except Exception:
+        logger.exception("Server-side chart generation failed")
+        return {}
+
+
+def render_html(report_type, today=None):
+    context = report_stats.report_context(report_type, today)
+    charts = chart_images(context)
+    context.update({
+        'chart_timeline': charts.get('timeline', ''),
+        'chart_type': charts.get('type', ''),
+        'chart_status': charts.get('status', ''),
+        'start_date': report_stats.report_start(report_type, today),
+        'generated_at': timezone.now(),
+    })
+    return render_to_string('reports/report_pdf.html', context)
+
+
+def render_pdf(report_type, today=None):
+    """PDF bytes of one report as of `today` (default: today)."""
+    return pdf_renderer.render(render_html(report_type, today))
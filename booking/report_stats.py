@@ -0,0 +1,202 @@
+"""
+Report engine behind the weekly, monthly and yearly appointment reports and
+ad-hoc staff reports.
+
+A report is described by ReportFilters: a date range (either end optional)
+plus optional doctor, appointment type and status. Figures are read from the
+AppointmentDailyStats rollup (see booking.rollup) rather than from
+Appointment rows, so a yearly report sums at most 365 x (doctors x types x
+statuses) rows however many appointments there were. Each figure is a
+single grouped query: the timeline groups by day (TruncDay) or, for ranges
+over REPORT_DAILY_LIMIT days, by month (TruncMonth); the breakdowns group by
+appointment type and by status. Buckets without appointments are
+zero-filled in Python.
+
+Aggregates are cached per (filters, data version). The version is the
+number of matching rollup rows, their total count and their latest
+updated_at, which booking.rollup sets on every appointment change, so any
+change to the underlying appointments yields a new key without reading them,
+and several people viewing the same report cost one computation. Appointment rows are returned as a lazy queryset for
+paging.
+"""
+import hashlib
+import json
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max, Sum
+from django.db.models.functions import TruncDay, TruncMonth
+from django.utils import timezone
+
+from .models import Appointment, AppointmentDailyStats
+
+REPORT_TYPES = ('weekly', 'monthly', 'yearly')
+REPORT_CACHE_TIMEOUT = getattr(settings, "BOOKING_REPORT_CACHE_TIMEOUT", 600)  # seconds
+REPORT_DAILY_LIMIT = 62  # longer timelines are bucketed by month
+TIMELINE_DEFAULT_DAYS = 30  # timeline length when no start date is given
+DAY_LABEL = '%d %b'
+# day label per report type; the weekly timeline names its days
+DAY_LABELS = {'weekly': '%a %d'}
+
+_PREFIX = "booking:report"
+
+
+class ReportFilters:
+    """What a report covers; every criterion is optional."""
+
+    def __init__(self, start=None, end=None, doctor_id=None, appointment_type_id=None, status=None):
+        self.start = start
+        self.end = end
+        self.doctor_id = doctor_id
+        self.appointment_type_id = appointment_type_id
+        self.status = status or None
+
+    def key(self):
+        return (self.start, self.end, self.doctor_id, self.appointment_type_id, self.status)
+
+    def __repr__(self):
+        return f"ReportFilters{self.key()!r}"
+
+    def _apply(self, rows, date_field):
+        if self.start is not None:
+            rows = rows.filter(**{f'{date_field}__gte': self.start})
+        if self.end is not None:
+            rows = rows.filter(**{f'{date_field}__lte': self.end})
+        if self.doctor_id is not None:
+            rows = rows.filter(doctor_id=self.doctor_id)
+        if self.appointment_type_id is not None:
+            rows = rows.filter(appointment_type_id=self.appointment_type_id)
+        if self.status:
+            rows = rows.filter(status=self.status)
+        return rows
+
+    def stats(self):
+        return self._apply(AppointmentDailyStats.objects.all(), 'date')
+
+    def appointments(self):
+        """Matching appointments by date and time, with their related rows, unevaluated."""
+        return self._apply(Appointment.objects.all(), 'appointment_date').select_related(
+            'appointment_type', 'doctor__user', 'user'
+        ).order_by('appointment_date', 'appointment_time', 'id')
+
+
+def report_start(report_type, today=None):
+    """First date covered by a report: the last 7 days, this month or this year."""
+    today = today or timezone.now().date()
+    if report_type == 'weekly':
+        return today - timedelta(days=6)
+    if report_type == 'monthly':
+        return today.replace(day=1)
+    if report_type == 'yearly':
+        return today.replace(month=1, day=1)
+    raise ValueError(f"Unknown report type: {report_type}")
+
+
+def report_filters(report_type, today=None):
+    """A report type lists everything from its start date on."""
+    return ReportFilters(start=report_start(report_type, today))
+
+
+def timeline_end(report_type, today=None):
+    """Last day on a report type's timeline: today, or the end of the year for yearly."""
+    today = today or timezone.now().date()
+    return date(today.year, 12, 31) if report_type == 'yearly' else today
+
+
+def data_version(filters):
+    row = filters.stats().aggregate(rows=Count('id'), n=Sum('count'), changed=Max('updated_at'))
+    raw = f"{row['rows']}:{row['n']}:{row['changed'].isoformat() if row['changed'] else ''}"
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]
+
+
+def _buckets(start, end, day_label=DAY_LABEL):
+    """(bucket dates, Trunc function, label format) for a timeline from start to end."""
+    if (end - start).days >= REPORT_DAILY_LIMIT:
+        buckets = []
+        month = start.replace(day=1)
+        while month <= end:
+            buckets.append(month)
+            month = (month + timedelta(days=32)).replace(day=1)
+        return buckets, TruncMonth, '%b' if start.year == end.year else '%b %Y'
+    buckets = [start + timedelta(days=n) for n in range((end - start).days + 1)]
+    return buckets, TruncDay, day_label
+
+
+def timeline(filters, end=None, day_label=DAY_LABEL):
+    """
+    (labels, counts) per day, or per month for long ranges, from filters.start
+    (default: TIMELINE_DEFAULT_DAYS before the end) to `end` (default
+    filters.end, else today), from one grouped query. Days are labelled with
+    the strftime format `day_label`.
+    """
+    end = end or filters.end or timezone.now().date()
+    start = filters.start or end - timedelta(days=TIMELINE_DEFAULT_DAYS - 1)
+    buckets, trunc, label = _buckets(start, end, day_label)
+    rows = (
+        ReportFilters(start, end, filters.doctor_id, filters.appointment_type_id, filters.status).stats()
+        .annotate(bucket=trunc('date'))
+        .values('bucket')
+        .annotate(total=Sum('count'))
+        .order_by()
+        .values_list('bucket', 'total')
+    )
+    counts = dict(rows)
+    return [b.strftime(label) for b in buckets], [counts.get(b) or 0 for b in buckets]
+
+
+def type_counts(filters):
+    rows = filters.stats().values('appointment_type__name').annotate(total=Sum('count')).filter(total__gt=0).order_by('-total')
+    return [{'type': row['appointment_type__name'] or 'Unknown', 'count': row['total']} for row in rows]
+
+
+def status_counts(filters):
+    rows = filters.stats().values('status').annotate(total=Sum('count')).filter(total__gt=0).order_by('-total')
+    return [{'status': row['status'], 'count': row['total']} for row in rows]
+
+
+def aggregates(filters, end=None, day_label=DAY_LABEL):
+    """
+    {'type_counts', 'status_counts', 'timeline_labels', 'timeline_data',
+    'total'} for `filters`, computed once per data version. `end` extends the
+    timeline past filters.end (see timeline()).
+    """
+    end = end or filters.end or timezone.now().date()
+    digest = hashlib.sha1(repr((filters.key(), end, day_label, data_version(filters))).encode('utf-8')).hexdigest()
+    key = f"{_PREFIX}:{digest}"
+    result = cache.get(key)
+    if result is None:
+        types = type_counts(filters)
+        labels, data = timeline(filters, end, day_label)
+        result = {
+            'type_counts': types,
+            'status_counts': status_counts(filters),
+            'timeline_labels': labels,
+            'timeline_data': data,
+            'total': sum(row['count'] for row in types),
+        }
+        cache.set(key, result, REPORT_CACHE_TIMEOUT)
+    return result
+
+
+def context_for(filters, end=None, day_label=DAY_LABEL):
+    """Template context of a report: its aggregates, the lazy appointment rows and the chart payload."""
+    figures = aggregates(filters, end, day_label)
+    return {
+        'appointments': filters.appointments(),
+        **figures,
+        'chart_payload_json': json.dumps({
+            'type_counts': figures['type_counts'],
+            'status_counts': figures['status_counts'],
+            'timeline': {'labels': figures['timeline_labels'], 'data': figures['timeline_data']},
+        }),
+    }
+
+
+def report_context(report_type, today=None):
+    """Template context shared by the report pages and PDF downloads."""
+    context = context_for(
+        report_filters(report_type, today), timeline_end(report_type, today), DAY_LABELS.get(report_type, DAY_LABEL),
+    )
+    context['report_type'] = report_type
+    return context
@@ -0,0 +1,98 @@
+"""
+Incremental daily appointment rollup (AppointmentDailyStats).
+
+The signal handlers in booking.signals turn every Appointment save, delete
+or status change into +1/-1 deltas on (date, doctor, appointment type,
+status) keys. Code that writes appointments without signals (bulk_create)
+applies the deltas itself. rebuild() recomputes a date range from scratch
+for backfills or after drift.
+
+Every row touched also gets a new updated_at, including the row of an
+appointment that changed without moving to another key (say, a new time),
+so a report's data version can be read from the matching rollup rows
+alone.
+"""
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import Appointment, AppointmentDailyStats
+
+
+def key_of(appointment):
+    return (appointment.appointment_date, appointment.doctor_id, appointment.appointment_type_id, appointment.status)
+
+
+def _bump(key, delta):
+    day, doctor_id, type_id, status = key
+    rows = AppointmentDailyStats.objects.filter(date=day, doctor_id=doctor_id, appointment_type_id=type_id, status=status)
+    if rows.update(count=F('count') + delta, updated_at=timezone.now()) or delta < 0:
+        return
+    try:
+        with transaction.atomic():
+            AppointmentDailyStats.objects.create(date=day, doctor_id=doctor_id, appointment_type_id=type_id, status=status, count=delta)
+    except IntegrityError:
+        # created concurrently between our update and insert
+        rows.update(count=F('count') + delta, updated_at=timezone.now())
+
+
+def touch(keys):
+    """Mark the rows of `keys` changed without changing their counts."""
+    for day, doctor_id, type_id, status in set(keys):
+        AppointmentDailyStats.objects.filter(
+            date=day, doctor_id=doctor_id, appointment_type_id=type_id, status=status,
+        ).update(updated_at=timezone.now())
+
+
+def apply(deltas):
+    """Apply a {key: delta} mapping, e.g. a Counter of key_of() for bulk-created appointments."""
+    for key, delta in deltas.items():
+        if delta:
+            _bump(key, delta)
+
+
+def record_change(previous_key, appointment):
+    """Move one appointment from `previous_key` (None when new) to its current key."""
+    current = key_of(appointment)
+    if previous_key == current:
+        touch([current])
+        return
+    if previous_key is not None:
+        _bump(previous_key, -1)
+    _bump(current, 1)
+
+
+def record_delete(appointment):
+    _bump(key_of(appointment), -1)
+
+
+def rebuild(start=None, end=None):
+    """Recompute the rollup for [start, end] (either bound optional) from Appointment rows."""
+    appointments = Appointment.objects.all()
+    stats = AppointmentDailyStats.objects.all()
+    if start is not None:
+        appointments = appointments.filter(appointment_date__gte=start)
+        stats = stats.filter(date__gte=start)
+    if end is not None:
+        appointments = appointments.filter(appointment_date__lte=end)
+        stats = stats.filter(date__lte=end)
+    rows = appointments.values('appointment_date', 'doctor_id', 'appointment_type_id', 'status').annotate(n=Count('id')).order_by()
+    with transaction.atomic():
+        stats.delete()
+        AppointmentDailyStats.objects.bulk_create(
+            (
+                AppointmentDailyStats(
+                    date=row['appointment_date'], doctor_id=row['doctor_id'],
+                    appointment_type_id=row['appointment_type_id'], status=row['status'], count=row['n'],
+                )
+                for row in rows.iterator()
+            ),
+            batch_size=2000,
+        )
+    return stats.count()
+
+
+def deltas_for(appointments):
+    return Counter(key_of(a) for a in appointments)
@@ -0,0 +1,201 @@
+"""
+Structured doctor working hours.
+
+A doctor's week is the working_weekdays bitmask plus optional WorkingHours
+rows per weekday (falling back to the default available_time_start/end
+pair). ScheduleException rows close or re-time single dates. The dates a
+doctor works are also precomputed into DoctorOpenDay rows, so range searches
+can drop closed days with one indexed query.
+"""
+import re
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ALL_WEEKDAYS, Doctor, DoctorOpenDay, ScheduleException, WorkingHours
+
+# DoctorOpenDay rows are written this far ahead by the rebuild_open_days
+# command (run daily) and on schedule changes; searches reaching past the last
+# date built for a doctor (Doctor.open_days_until) compute the rest in memory
+OPEN_DAYS_HORIZON = getattr(settings, "BOOKING_OPEN_DAYS_HORIZON", 365)
+
+WEEKDAY_NAMES = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+_CHUNK = 500
+
+_ALIASES = {name.lower(): i for i, name in enumerate(WEEKDAY_NAMES)}
+_ALIASES.update({
+    'monday': 0, 'tues': 1, 'tuesday': 1, 'wednesday': 2, 'thur': 3, 'thurs': 3, 'thursday': 3,
+    'friday': 4, 'saturday': 5, 'sunday': 6,
+})
+
+
+def parse_weekdays(text):
+    """
+    Bitmask for free text such as "Mon-Fri", "Mon, Wed, Fri" or "daily";
+    None when the text cannot be understood.
+    """
+    text = (text or '').strip().lower()
+    if text in ('daily', 'everyday', 'every day', 'all', 'all days'):
+        return ALL_WEEKDAYS
+    if text in ('weekdays',):
+        return 0b0011111
+    mask = 0
+    text = re.sub(r'\s*(?:-|–|\bto\b)\s*', '-', text)
+    for part in re.split(r'(?:[,;/&\s]|\band\b)+', text):
+        part = part.strip('.')
+        if not part:
+            continue
+        bounds = part.split('-')
+        if len(bounds) == 1 and bounds[0] in _ALIASES:
+            mask |= 1 << _ALIASES[bounds[0]]
+        elif len(bounds) == 2 and bounds[0] in _ALIASES and bounds[1] in _ALIASES:
+            first, last = _ALIASES[bounds[0]], _ALIASES[bounds[1]]
+            day = first
+            while True:
+                mask |= 1 << day
+                if day == last:
+                    break
+                day = (day + 1) % 7
+        else:
+            return None
+    return mask or None
+
+
+def format_weekdays(mask):
+    """Short text for a bitmask, collapsing runs: 0b0011111 -> "Mon-Fri"."""
+    days = [i for i in range(7) if mask & (1 << i)]
+    parts = []
+    i = 0
+    while i < len(days):
+        j = i
+        while j + 1 < len(days) and days[j + 1] == days[j] + 1:
+            j += 1
+        if j - i >= 2:
+            parts.append(f"{WEEKDAY_NAMES[days[i]]}-{WEEKDAY_NAMES[days[j]]}")
+        else:
+            parts.extend(WEEKDAY_NAMES[d] for d in days[i:j + 1])
+        i = j + 1
+    return ', '.join(parts)
+
+
+def _chunks(items, size=_CHUNK):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class Schedule:
+    """
+    Working hours of a set of doctors between two dates, loaded with one
+    query for weekly intervals and one for exceptions.
+    """
+
+    def __init__(self, doctors, start, end):
+        doctor_ids = [d.pk for d in doctors]
+        self.weekly = defaultdict(list)  # (doctor_id, weekday) -> [(start, end), ...]
+        self.exceptions = defaultdict(list)  # (doctor_id, date) -> [(start, end) or None, ...]
+        for chunk in _chunks(doctor_ids):
+            for doctor_id, weekday, s, e in WorkingHours.objects.filter(doctor_id__in=chunk).values_list(
+                'doctor_id', 'weekday', 'start_time', 'end_time'
+            ):
+                self.weekly[(doctor_id, weekday)].append((s, e))
+            for doctor_id, day, s, e in ScheduleException.objects.filter(doctor_id__in=chunk, date__range=(start, end)).values_list(
+                'doctor_id', 'date', 'start_time', 'end_time'
+            ):
+                self.exceptions[(doctor_id, day)].append((s, e) if s is not None and e is not None else None)
+        for intervals in (*self.weekly.values(), *self.exceptions.values()):
+            if None not in intervals:
+                intervals.sort()
+
+    def hours(self, doctor, day):
+        """Sorted (start_time, end_time) intervals `doctor` works on `day`; empty when closed."""
+        exception = self.exceptions.get((doctor.pk, day))
+        if exception is not None:
+            return [] if None in exception else exception
+        if not doctor.works_on(day):
+            return []
+        return self.weekly.get((doctor.pk, day.weekday())) or [(doctor.available_time_start, doctor.available_time_end)]
+
+
+def hours_on(doctor, day):
+    return Schedule([doctor], day, day).hours(doctor, day)
+
+
+def describe(hours):
+    return ' or '.join(f"between {s.strftime('%I:%M %p')} and {e.strftime('%I:%M %p')}" for s, e in hours)
+
+
+def rebuild_open_days(doctors, start=None, days=OPEN_DAYS_HORIZON):
+    """
+    Rewrite the DoctorOpenDay rows of `doctors` from `start` (default today)
+    for `days` days, and move their open_days_until up to the last one when
+    the rows now run on from today without a gap.
+    """
+    doctors = list(doctors)
+    today = timezone.now().date()
+    start = start or today
+    end = start + timedelta(days=days - 1)
+    schedule = Schedule(doctors, start, end)
+    dates = [start + timedelta(days=n) for n in range(days)]
+    rows = [
+        DoctorOpenDay(doctor=doctor, date=day)
+        for doctor in doctors
+        for day in dates
+        if schedule.hours(doctor, day)
+    ]
+    with transaction.atomic():
+        for chunk in _chunks([d.pk for d in doctors]):
+            DoctorOpenDay.objects.filter(doctor_id__in=chunk, date__range=(start, end)).delete()
+        DoctorOpenDay.objects.bulk_create(rows, batch_size=2000)
+        joined = Q() if start <= today else Q(open_days_until__gte=start - timedelta(days=1))
+        for chunk in _chunks([d.pk for d in doctors]):
+            Doctor.objects.filter(joined, Q(open_days_until__isnull=True) | Q(open_days_until__lt=end), pk__in=chunk).update(
+                open_days_until=end
+            )
+    return len(rows)
+
+
+def refresh_open_day(doctor_id, day):
+    """Recompute one doctor/date of the index, e.g. after a schedule exception changed."""
+    doctor = Doctor.objects.filter(pk=doctor_id).first()
+    if doctor is not None:
+        rebuild_open_days([doctor], start=day, days=1)
+
+
+def open_doctors_by_day(doctors, start, end):
+    """
+    {date: {doctor_id, ...}} of the doctors working each day in [start, end].
+    Dates up to a doctor's open_days_until come from the DoctorOpenDay index;
+    later ones are computed from the schedule in memory, so searches never
+    write. The rebuild_open_days command moves the index on.
+    """
+    doctors = list(doctors)
+    open_days = defaultdict(set)
+    built = {}
+    for chunk in _chunks([d.pk for d in doctors]):
+        built.update(Doctor.objects.filter(pk__in=chunk).values_list('pk', 'open_days_until'))
+        rows = DoctorOpenDay.objects.filter(doctor_id__in=chunk, date__range=(start, end)).values_list('date', 'doctor_id')
+        for day, doctor_id in rows:
+            last = built.get(doctor_id)
+            if last is not None and day <= last:
+                open_days[day].add(doctor_id)
+    unindexed = {}
+    for doctor in doctors:
+        last = built.get(doctor.pk)
+        first = start if last is None else max(start, last + timedelta(days=1))
+        if first <= end:
+            unindexed[doctor] = first
+    if unindexed:
+        first = min(unindexed.values())
+        schedule = Schedule(unindexed, first, end)
+        day = first
+        while day <= end:
+            for doctor, since in unindexed.items():
+                if day >= since and schedule.hours(doctor, day):
+                    open_days[day].add(doctor.pk)
+            day += timedelta(days=1)
+    return open_days
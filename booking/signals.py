@@ -0,0 +1,141 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Doctor, AppointmentType, Appointment, AppointmentSeries, SlotReservation, WorkingHours, ScheduleException
+from . import availability_cache, rollup, schedule, waitlist
+
+
+@receiver(pre_save, sender=Appointment)
+def remember_appointment_slot(sender, instance, **kwargs):
+    # keep the stored row so a moved appointment also frees its old day and
+    # leaves its old rollup bucket
+    instance._previous_slot = None
+    instance._previous_stats_key = None
+    if instance.pk:
+        previous = Appointment.objects.filter(pk=instance.pk).values_list(
+            'appointment_date', 'doctor_id', 'appointment_type_id', 'status'
+        ).first()
+        if previous:
+            instance._previous_slot = (previous[1], previous[0])
+            instance._previous_stats_key = previous
+
+
+def _invalidate_days(*days):
+    # after commit: invalidating earlier would let a concurrent reader cache
+    # the not-yet-committed state again until the entry times out
+    transaction.on_commit(lambda: [availability_cache.invalidate_day(doctor_id, day) for doctor_id, day in days])
+
+
+def _invalidate_doctors(doctor_ids):
+    doctor_ids = set(doctor_ids)
+    transaction.on_commit(lambda: [availability_cache.invalidate_doctor(doctor_id) for doctor_id in doctor_ids])
+
+
+@receiver(post_save, sender=Appointment)
+def appointment_saved(sender, instance, **kwargs):
+    days = {(instance.doctor_id, instance.appointment_date)}
+    previous = getattr(instance, '_previous_slot', None)
+    if previous:
+        days.add(previous)
+    _invalidate_days(*days)
+    if instance.status != 'canceled':
+        waitlist.fulfil_offer(instance)
+    rollup.record_change(getattr(instance, '_previous_stats_key', None), instance)
+
+
+@receiver(post_delete, sender=Appointment)
+def appointment_deleted(sender, instance, **kwargs):
+    _invalidate_days((instance.doctor_id, instance.appointment_date))
+    rollup.record_delete(instance)
+
+
+@receiver(post_save, sender=AppointmentSeries)
+@receiver(post_delete, sender=AppointmentSeries)
+def series_changed(sender, instance, **kwargs):
+    # a series touches many days of one doctor, so drop all of that doctor's cached days
+    _invalidate_doctors([instance.doctor_id])
+
+
+@receiver(pre_save, sender=Doctor)
+def remember_doctor_hours(sender, instance, **kwargs):
+    instance._previous_hours = None
+    if instance.pk:
+        instance._previous_hours = Doctor.objects.filter(pk=instance.pk).values_list(
+            'available_time_start', 'available_time_end', 'working_weekdays'
+        ).first()
+
+
+@receiver(post_save, sender=Doctor)
+def doctor_saved(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_hours', None)
+    if previous and previous != (instance.available_time_start, instance.available_time_end, instance.working_weekdays):
+        _invalidate_doctors([instance.pk])
+    if created or not previous or previous[2] != instance.working_weekdays:
+        schedule.rebuild_open_days([instance])
+
+
+@receiver(post_save, sender=WorkingHours)
+@receiver(post_delete, sender=WorkingHours)
+def working_hours_changed(sender, instance, **kwargs):
+    _invalidate_doctors([instance.doctor_id])
+
+
+@receiver(post_save, sender=ScheduleException)
+@receiver(post_delete, sender=ScheduleException)
+def schedule_exception_changed(sender, instance, **kwargs):
+    _invalidate_days((instance.doctor_id, instance.date))
+    # after commit, so a cascade delete of the doctor does not re-add its open days
+    doctor_id, day = instance.doctor_id, instance.date
+    transaction.on_commit(lambda: schedule.refresh_open_day(doctor_id, day))
+
+
+def sync_end_times(appointment_type, batch_size=1000):
+    """
+    Recompute the denormalized end_time of every appointment of this type,
+    and the slot reservations of those not canceled.
+    """
+    appointments = Appointment.objects.filter(appointment_type=appointment_type).only(
+        'pk', 'doctor_id', 'appointment_date', 'appointment_time', 'status'
+    )
+    batch = []
+    for appointment in appointments.iterator(chunk_size=batch_size):
+        appointment.end_time = Appointment.compute_end_time(appointment.appointment_date, appointment.appointment_time, appointment_type.duration)
+        batch.append(appointment)
+        if len(batch) >= batch_size:
+            _resync_batch(batch)
+            batch = []
+    if batch:
+        _resync_batch(batch)
+
+
+def _resync_batch(appointments):
+    Appointment.objects.bulk_update(appointments, ['end_time'])
+    SlotReservation.objects.filter(appointment__in=appointments).delete()
+    # existing bookings that now overlap cannot be rejected retroactively; the first one keeps the unit.
+    # canceled appointments hold no slots, as in Appointment.reserve_slots
+    SlotReservation.objects.bulk_create([
+        SlotReservation(doctor_id=a.doctor_id, appointment=a, date=a.appointment_date, unit=unit)
+        for a in appointments if a.status != 'canceled'
+        for unit in a.slot_units()
+    ], ignore_conflicts=True)
+
+
+@receiver(pre_save, sender=AppointmentType)
+def remember_type_duration(sender, instance, **kwargs):
+    instance._previous_duration = None
+    if instance.pk:
+        instance._previous_duration = AppointmentType.objects.filter(pk=instance.pk).values_list('duration', flat=True).first()
+
+
+@receiver(post_save, sender=AppointmentType)
+def appointment_type_saved(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_duration', None)
+    if previous is not None and previous != instance.duration:
+        with transaction.atomic():
+            sync_end_times(instance)
+        # series occurrences of this type change length too
+        _invalidate_doctors([
+            *Appointment.objects.filter(appointment_type=instance).values_list('doctor_id', flat=True).distinct(),
+            *AppointmentSeries.objects.filter(appointment_type=instance).values_list('doctor_id', flat=True).distinct(),
+        ])
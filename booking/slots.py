@@ -0,0 +1,218 @@
+"""
+Slot engine shared by the booking form and the availability endpoints.
+
+A doctor's day is turned into a minute-resolution occupancy bitmap built from
+one query over the denormalized start/end times (plus lazily expanded series
+occurrences). Free start times for
+a duration are then found in a single linear pass over the candidate slots,
+instead of rescanning every booking for every candidate slot.
+"""
+from collections import defaultdict
+from datetime import time, timedelta
+from heapq import merge
+from itertools import islice
+
+from .models import Appointment
+from . import recurrence, schedule
+
+SLOT_INTERVAL = 15  # minutes between candidate start times
+MINUTES_PER_DAY = 24 * 60
+
+
+def to_minutes(t):
+    return t.hour * 60 + t.minute
+
+
+def from_minutes(m):
+    return time(m // 60, m % 60)
+
+
+def _interval(start, end):
+    # round partial minutes outward so a booking is never under-counted
+    start_min = to_minutes(start)
+    end_min = MINUTES_PER_DAY if end == time.max else to_minutes(end) + (1 if end.second or end.microsecond else 0)
+    return start_min, end_min
+
+
+def booked_intervals(doctor, day, exclude_pk=None, exclude_series=None):
+    """
+    Return (start_minute, end_minute) pairs for the doctor's bookings on `day`:
+    one query on the (doctor, date, time) index plus the day's series
+    occurrences. Cancelled appointments do not hold their slot.
+    """
+    qs = Appointment.objects.filter(doctor=doctor, appointment_date=day).exclude(status='canceled')
+    if exclude_pk is not None:
+        qs = qs.exclude(pk=exclude_pk)
+    intervals = [_interval(start, end) for start, end in qs.values_list('appointment_time', 'end_time')]
+    occurrences = recurrence.occurrence_times([doctor.pk], day, exclude_series=exclude_series)
+    intervals.extend(_interval(start, end) for start, end in occurrences.get(doctor.pk, ()))
+    return intervals
+
+
+def booked_intervals_between(doctor_ids, start, end):
+    """
+    Like booked_intervals, for many doctors over [start, end] at once:
+    {(date, doctor_id): [(start, end), ...]} from one appointment query and
+    the window's series occurrences.
+    """
+    intervals = defaultdict(list)
+    rows = (
+        Appointment.objects.filter(doctor_id__in=doctor_ids, appointment_date__range=(start, end))
+        .exclude(status='canceled')
+        .values_list('appointment_date', 'doctor_id', 'appointment_time', 'end_time')
+    )
+    for day, doctor_id, start_time, end_time in rows:
+        intervals[(day, doctor_id)].append(_interval(start_time, end_time))
+    for key, times in recurrence.occurrence_times_between(doctor_ids, start, end).items():
+        intervals[key].extend(_interval(s, e) for s, e in times)
+    return intervals
+
+
+def has_overlap(doctor, day, start_time, duration, exclude_pk=None, exclude_series=None):
+    """
+    True when a booking of `duration` minutes at `start_time` would overlap an
+    existing appointment or series occurrence. Appointments are checked with a
+    single EXISTS range query.
+    """
+    end_time = Appointment.compute_end_time(day, start_time, duration)
+    qs = Appointment.objects.filter(
+        doctor=doctor,
+        appointment_date=day,
+        appointment_time__lt=end_time,
+        end_time__gt=start_time,
+    ).exclude(status='canceled')
+    if exclude_pk is not None:
+        qs = qs.exclude(pk=exclude_pk)
+    if qs.exists():
+        return True
+    occurrences = recurrence.occurrence_times([doctor.pk], day, exclude_series=exclude_series)
+    return any(start < end_time and end > start_time for start, end in occurrences.get(doctor.pk, ()))
+
+
+class DayOccupancy:
+    """
+    Busy minutes of a single doctor/day.
+
+    `bitmap[m]` is 1 when minute m of the day is booked. Range checks use
+    bytearray.find, so testing a candidate slot runs in C rather than Python.
+    """
+
+    def __init__(self, intervals=()):
+        self.bitmap = bytearray(MINUTES_PER_DAY)
+        for start, end in intervals:
+            start = max(0, start)
+            end = min(MINUTES_PER_DAY, end)
+            if start < end:
+                self.bitmap[start:end] = b'\x01' * (end - start)
+
+    @classmethod
+    def for_doctor(cls, doctor, day, exclude_pk=None):
+        return cls(booked_intervals(doctor, day, exclude_pk=exclude_pk))
+
+    def busy_minutes(self, start, end):
+        start = max(0, start)
+        end = min(MINUTES_PER_DAY, end)
+        if start >= end:
+            return 0
+        return self.bitmap.count(1, start, end)
+
+    def is_free(self, start_time, duration):
+        """True when [start_time, start_time + duration) overlaps no booking."""
+        start = to_minutes(start_time)
+        return self.bitmap.find(1, start, start + duration) == -1
+
+    def free_starts(self, open_time, close_time, duration, step=SLOT_INTERVAL, not_before=None):
+        """
+        Start times between open_time and close_time (on a `step` grid anchored
+        at open_time) where an appointment of `duration` minutes fits.
+        """
+        start = to_minutes(open_time)
+        close = min(to_minutes(close_time), MINUTES_PER_DAY)
+        if not_before is not None:
+            # skip grid points before not_before (a start equal to it is still allowed)
+            earliest = to_minutes(not_before) + (1 if not_before.second or not_before.microsecond else 0)
+            if earliest > start:
+                start += -(-(earliest - start) // step) * step
+        find = self.bitmap.find
+        times = []
+        while start + duration <= close:
+            if find(1, start, start + duration) == -1:
+                times.append(from_minutes(start))
+            start += step
+        return times
+
+
+# shared occupancy for doctor/days without any booking
+EMPTY_DAY = DayOccupancy()
+
+
+def _free_starts(occupancy, hours, duration, not_before=None):
+    times = []
+    for open_time, close_time in hours:
+        times.extend(occupancy.free_starts(open_time, close_time, duration, not_before=not_before))
+    return sorted(set(times)) if len(hours) > 1 else times
+
+
+def available_times(doctor, day, duration, not_before=None):
+    """Free start times for `doctor` on `day` for an appointment of `duration` minutes."""
+    hours = schedule.hours_on(doctor, day)
+    if not hours:
+        return []
+    occupancy = DayOccupancy.for_doctor(doctor, day)
+    return _free_starts(occupancy, hours, duration, not_before=not_before)
+
+
+def earliest_slots(doctors, duration, start_date, end_date, limit, after=None, now=None):
+    """
+    First `limit` free (date, time, doctor) slots across `doctors`, ordered by
+    date, time and doctor id, between start_date and end_date inclusive.
+
+    Days on which none of the doctors work are skipped using the open days
+    index. Bookings are loaded in windows of 1, 2, 4, ... days with one query
+    each (see booked_intervals_between), so a search that fills up on the
+    first day reads only that day while a fully booked fortnight costs four
+    queries; the walk stops as soon as `limit` slots have been found.
+    `after` is a (date, time, doctor_id) tuple; only slots strictly after it
+    are returned, which is what cursor pagination needs. `now` is a datetime
+    used to hide start times that already passed today.
+    """
+    doctors = sorted(doctors, key=lambda d: d.pk)
+    found = []
+    day = start_date
+    if after is not None and after[0] > day:
+        day = after[0]
+    if day > end_date:
+        return found
+    open_days = schedule.open_doctors_by_day(doctors, day, end_date)
+    week = schedule.Schedule(doctors, day, end_date)
+    doctor_ids = [d.pk for d in doctors]
+    loaded_until, window = day - timedelta(days=1), 1
+    intervals = {}
+
+    while day <= end_date and len(found) < limit:
+        open_ids = open_days.get(day)
+        if not open_ids:
+            day += timedelta(days=1)
+            continue
+        if day > loaded_until:
+            loaded_until = min(end_date, day + timedelta(days=window - 1))
+            intervals = booked_intervals_between(doctor_ids, day, loaded_until)
+            window *= 2
+        working = [d for d in doctors if d.pk in open_ids]
+        not_before = now.time() if now is not None and day == now.date() else None
+        per_doctor = []
+        for doctor in working:
+            booked = intervals.get((day, doctor.pk))
+            occupancy = DayOccupancy(booked) if booked else EMPTY_DAY
+            starts = _free_starts(occupancy, week.hours(doctor, day), duration, not_before=not_before)
+            per_doctor.append([(t, doctor.pk, doctor) for t in starts])
+
+        candidates = merge(*per_doctor, key=lambda slot: (slot[0], slot[1]))
+        if after is not None and day == after[0]:
+            candidates = (c for c in candidates if (c[0], c[1]) > (after[1], after[2]))
+        for t, _, doctor in islice(candidates, limit - len(found)):
+            found.append((day, t, doctor))
+        day += timedelta(days=1)
+
+    return found
+
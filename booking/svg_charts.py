@@ -0,0 +1,118 @@
+"""
+Minimal SVG charts for the report PDFs.
+
+The charts are built as SVG markup straight from the aggregated series, with
+no plotting library: a line chart for the timeline, a bar chart for the
+appointment types and a pie chart for the statuses. WeasyPrint draws inline
+<svg> elements natively as vectors, so the PDF stays small and sharp at any
+zoom. Coordinates are rounded to one decimal to keep the markup short.
+"""
+import math
+from xml.sax.saxutils import escape
+
+FONT = 'font-family="sans-serif" font-size="10" fill="#444"'
+MAX_X_LABELS = 16
+
+
+def _n(value):
+    return f"{value:.1f}".rstrip('0').rstrip('.')
+
+
+def _nice_max(value):
+    """Smallest 1, 2, 2.5 or 5 x 10^n at or above `value`."""
+    if value <= 0:
+        return 1
+    scale = 10 ** math.floor(math.log10(value))
+    for step in (1, 2, 2.5, 5, 10):
+        if value <= step * scale:
+            return step * scale
+    return 10 * scale
+
+
+def _svg(width, height, body):
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {width} {height}">{"".join(body)}</svg>'
+    )
+
+
+def _axes(body, left, top, plot_w, plot_h, top_value, ticks=4):
+    """Horizontal grid lines with their value labels."""
+    for i in range(ticks + 1):
+        value = top_value * i / ticks
+        y = top + plot_h - plot_h * i / ticks
+        body.append(f'<line x1="{left}" y1="{_n(y)}" x2="{left + plot_w}" y2="{_n(y)}" stroke="#ddd" stroke-dasharray="2,2"/>')
+        body.append(f'<text x="{left - 4}" y="{_n(y + 3)}" text-anchor="end" {FONT}>{value:g}</text>')
+
+
+def _x_labels(body, labels, xs, baseline):
+    every = max(1, math.ceil(len(labels) / MAX_X_LABELS))
+    for i in range(0, len(labels), every):
+        x = _n(xs[i])
+        body.append(
+            f'<text x="{x}" y="{baseline}" text-anchor="end" transform="rotate(-25 {x} {baseline})" {FONT}>'
+            f'{escape(str(labels[i]))}</text>'
+        )
+
+
+def line_chart(labels, data, width=700, height=260, color='#367fd8'):
+    left, top, right, bottom = 36, 10, 10, 46
+    plot_w, plot_h = width - left - right, height - top - bottom
+    top_value = _nice_max(max(data, default=0))
+    step = plot_w / max(len(data) - 1, 1)
+    xs = [left + i * step for i in range(len(data))]
+    ys = [top + plot_h - plot_h * value / top_value for value in data]
+
+    body = []
+    _axes(body, left, top, plot_w, plot_h, top_value)
+    if data:
+        points = ' '.join(f"{_n(x)},{_n(y)}" for x, y in zip(xs, ys))
+        body.append(f'<polyline points="{points}" fill="none" stroke="{color}" stroke-width="1.5"/>')
+        body.extend(f'<circle cx="{_n(x)}" cy="{_n(y)}" r="2.5" fill="{color}"/>' for x, y in zip(xs, ys))
+    _x_labels(body, labels, xs, top + plot_h + 14)
+    return _svg(width, height, body)
+
+
+def bar_chart(labels, counts, width=500, height=300, color='#8e5ea2'):
+    left, top, right, bottom = 36, 10, 10, 70
+    plot_w, plot_h = width - left - right, height - top - bottom
+    top_value = _nice_max(max(counts, default=0))
+    slot = plot_w / max(len(counts), 1)
+    bar_w = slot * 0.7
+
+    body = []
+    _axes(body, left, top, plot_w, plot_h, top_value)
+    xs = []
+    for i, value in enumerate(counts):
+        bar_h = plot_h * value / top_value
+        x = left + i * slot + (slot - bar_w) / 2
+        xs.append(x + bar_w / 2)
+        body.append(f'<rect x="{_n(x)}" y="{_n(top + plot_h - bar_h)}" width="{_n(bar_w)}" height="{_n(bar_h)}" fill="{color}"/>')
+    body.append(f'<text x="10" y="{_n(top + plot_h / 2)}" transform="rotate(-90 10 {_n(top + plot_h / 2)})" text-anchor="middle" {FONT}>Count</text>')
+    _x_labels(body, labels, xs, top + plot_h + 14)
+    return _svg(width, height, body)
+
+
+def pie_chart(labels, counts, width=400, height=300, colors=('#4CAF50', '#2196F3', '#F44336')):
+    cx, cy, r = 130, height / 2, min(120, height / 2 - 10)
+    total = sum(counts)
+    body = []
+    angle = -math.pi / 2
+    for i, (label, value) in enumerate(zip(labels, counts)):
+        color = colors[i % len(colors)]
+        share = value / total if total else 0
+        if share >= 1:
+            body.append(f'<circle cx="{_n(cx)}" cy="{_n(cy)}" r="{_n(r)}" fill="{color}"/>')
+        elif share > 0:
+            end = angle + 2 * math.pi * share
+            x1, y1 = cx + r * math.cos(angle), cy + r * math.sin(angle)
+            x2, y2 = cx + r * math.cos(end), cy + r * math.sin(end)
+            large = 1 if share > 0.5 else 0
+            body.append(
+                f'<path d="M{_n(cx)},{_n(cy)} L{_n(x1)},{_n(y1)} A{_n(r)},{_n(r)} 0 {large} 1 {_n(x2)},{_n(y2)} Z" fill="{color}"/>'
+            )
+            angle = end
+        y = 20 + i * 18
+        body.append(f'<rect x="{_n(cx + r + 20)}" y="{y - 9}" width="10" height="10" fill="{color}"/>')
+        body.append(f'<text x="{_n(cx + r + 36)}" y="{y}" {FONT}>{escape(str(label))} ({share:.0%})</text>')
+    return _svg(width, height, body)
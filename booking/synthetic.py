@@ -0,0 +1,192 @@
+"""
+Synthetic data for load testing and benchmarks.
+
+generate() seeds patients, doctors, appointment types, appointments,
+notifications and chat logs with skewed, clinic-like distributions: a few
+popular doctors and frequent patients take most bookings (Zipf-like
+weights), most doctors work weekdays only, short visit types are common,
+past appointments are mostly completed and future ones mostly scheduled.
+Everything is written with bulk_create in chunks, together with the slot
+reservations and open days that normal saves would maintain; the rollup
+is rebuilt over the generated range.
+Generated users are named with PREFIX so remove() can drop them (and their
+doctors, appointments and notifications) again.
+"""
+import hashlib
+import random
+from collections import defaultdict
+from datetime import time, timedelta
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from chatbot.models import ChatLog
+from .models import Appointment, AppointmentType, Doctor, Notification, SlotReservation, UserProfile
+from . import rollup, schedule
+
+PREFIX = 'synth-'
+CHUNK_SIZE = 2000
+
+SPECIALTIES = ('General Practice', 'Cardiology', 'Dermatology', 'Pediatrics', 'Orthopedics', 'Physiotherapy', 'Psychiatry')
+TYPE_DURATIONS = ((15, 30), (30, 35), (20, 15), (45, 10), (60, 6), (10, 4))  # (minutes, weight)
+CHAT_MESSAGES = (
+    'How do I book an appointment?', 'Can I reschedule my visit?', 'What are your opening hours?',
+    'How do I cancel an appointment?', 'Which doctors are available tomorrow?', 'Do you accept my insurance?',
+)
+
+
+def _zipf_weights(n, skew=1.1):
+    return [1 / (rank ** skew) for rank in range(1, n + 1)]
+
+
+def _chunks(items, size=CHUNK_SIZE):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _users(role, count, rng):
+    now = timezone.now()
+    users = [
+        User(username=f"{PREFIX}{role}-{i}", first_name=rng.choice(('Alex', 'Sam', 'Jo', 'Kim', 'Lee', 'Ana')),
+             last_name=f"{role.title()}{i}", email=f"{PREFIX}{role}-{i}@example.com", date_joined=now, password='!')
+        for i in range(count)
+    ]
+    User.objects.bulk_create(users, batch_size=CHUNK_SIZE)
+    # bulk_create only returns primary keys on some databases
+    return list(User.objects.filter(username__startswith=f"{PREFIX}{role}-").order_by('pk'))
+
+
+def _doctors(users, types, rng):
+    doctors = []
+    for user in users:
+        start_hour = rng.choice((8, 8, 9, 9, 10))
+        mask = 0b0011111 if rng.random() < 0.8 else 0b0111111
+        doctors.append(Doctor(
+            user=user, specialty=rng.choice(SPECIALTIES), qualifications='MBChB',
+            experience_years=rng.randint(1, 35), rating=round(min(5.0, max(1.0, rng.gauss(4.2, 0.5))), 1),
+            working_weekdays=mask, available_days=schedule.format_weekdays(mask),
+            available_time_start=time(start_hour), available_time_end=time(start_hour + 8),
+        ))
+    Doctor.objects.bulk_create(doctors, batch_size=CHUNK_SIZE)
+    doctors = list(Doctor.objects.filter(user__in=users).order_by('pk'))
+    Doctor.appointment_types.through.objects.bulk_create([
+        Doctor.appointment_types.through(doctor_id=doctor.pk, appointmenttype_id=t.pk)
+        for doctor in doctors
+        for t in rng.sample(types, rng.randint(2, min(5, len(types))))
+    ], batch_size=CHUNK_SIZE)
+    schedule.rebuild_open_days(doctors)
+    return doctors
+
+
+def _appointments(count, patients, doctors, types, days_back, days_ahead, rng):
+    """Non-overlapping appointments on the doctors' working days, 15-minute aligned."""
+    today = timezone.now().date()
+    offered = defaultdict(list)
+    for doctor_id, type_id in Doctor.appointment_types.through.objects.filter(doctor__in=doctors).values_list('doctor_id', 'appointmenttype_id'):
+        offered[doctor_id].append(type_id)
+    durations = {t.pk: t.duration for t in types}
+    patient_weights = _zipf_weights(len(patients), 0.8)
+    doctor_weights = _zipf_weights(len(doctors), 0.7)
+    busy = defaultdict(set)  # (doctor_id, date) -> taken 15-minute slots
+    rows = []
+    for _ in range(count * 2):
+        if len(rows) == count:
+            break
+        doctor = rng.choices(doctors, doctor_weights)[0]
+        day = today + timedelta(days=rng.randint(-days_back, days_ahead))
+        if not doctor.works_on(day) or not offered[doctor.pk]:
+            continue
+        type_id = rng.choice(offered[doctor.pk])
+        length = -(-durations[type_id] // 15)
+        open_slots = (doctor.available_time_end.hour - doctor.available_time_start.hour) * 4
+        first = rng.randrange(0, max(open_slots - length, 0) + 1)
+        slots = set(range(first, first + length))
+        if slots & busy[(doctor.pk, day)]:
+            continue
+        busy[(doctor.pk, day)] |= slots
+        minutes = doctor.available_time_start.hour * 60 + first * 15
+        start = time(minutes // 60, minutes % 60)
+        if day < today:
+            status = rng.choices(('completed', 'canceled', 'scheduled'), (80, 12, 8))[0]
+        else:
+            status = rng.choices(('scheduled', 'canceled'), (90, 10))[0]
+        rows.append(Appointment(
+            user=rng.choices(patients, patient_weights)[0], doctor=doctor, appointment_type_id=type_id,
+            appointment_date=day, appointment_time=start, status=status,
+            end_time=Appointment.compute_end_time(day, start, durations[type_id]),
+        ))
+    for chunk in _chunks(rows):
+        with transaction.atomic():
+            Appointment.objects.bulk_create(chunk)
+            SlotReservation.objects.bulk_create([
+                SlotReservation(doctor_id=a.doctor_id, appointment=a, date=a.appointment_date, unit=unit)
+                for a in chunk
+                if a.status != 'canceled'
+                for unit in a.slot_units()
+            ], batch_size=CHUNK_SIZE)
+    # one grouped recount is far cheaper than a delta per (date, doctor, type, status) key
+    rollup.rebuild(today - timedelta(days=days_back), today + timedelta(days=days_ahead))
+    return rows
+
+
+def _notifications(count, patients, appointments, rng):
+    kinds = (('appointment', 60), ('system', 25), ('message', 15))
+    rows = []
+    for _ in range(count):
+        kind = rng.choices([k for k, _ in kinds], [w for _, w in kinds])[0]
+        related = rng.choice(appointments) if kind == 'appointment' and appointments else None
+        rows.append(Notification(
+            sender=related.user if related else rng.choice(patients), notification_type=kind,
+            related_appointment=related, is_read=rng.random() < 0.6,
+            message=f"Reminder: your appointment on {related.appointment_date}" if related else 'Clinic update',
+        ))
+    Notification.objects.bulk_create(rows, batch_size=CHUNK_SIZE)
+
+
+def _chat_logs(count, patients, rng):
+    ChatLog.objects.bulk_create([
+        ChatLog(
+            patient_hash=hashlib.sha256(rng.choice(patients).username.encode('utf-8')).hexdigest(),
+            message=rng.choice(CHAT_MESSAGES), reply='Please use the booking page or call the front desk.',
+        )
+        for _ in range(count)
+    ], batch_size=CHUNK_SIZE)
+
+
+def generate(patients=1000, doctors=50, types=8, appointments=20000, notifications=5000, chat_logs=2000,
+             days_back=365, days_ahead=60, seed=0):
+    """Seed the database and return {model name: rows created}."""
+    rng = random.Random(seed)
+    patient_users = _users('patient', patients, rng)
+    UserProfile.objects.bulk_create([UserProfile(user=u) for u in patient_users], batch_size=CHUNK_SIZE)
+    weights = [w for _, w in TYPE_DURATIONS]
+    AppointmentType.objects.bulk_create([
+        AppointmentType(name=f"{PREFIX}visit-{i}", duration=rng.choices([d for d, _ in TYPE_DURATIONS], weights)[0])
+        for i in range(types)
+    ])
+    type_rows = list(AppointmentType.objects.filter(name__startswith=PREFIX).order_by('pk'))
+    doctor_rows = _doctors(_users('doctor', doctors, rng), type_rows, rng)
+    appointment_rows = _appointments(appointments, patient_users, doctor_rows, type_rows, days_back, days_ahead, rng)
+    _notifications(notifications, patient_users, appointment_rows, rng)
+    _chat_logs(chat_logs, patient_users, rng)
+    return {
+        'patients': len(patient_users),
+        'doctors': len(doctor_rows),
+        'appointment_types': len(type_rows),
+        'appointments': len(appointment_rows),
+        'notifications': notifications,
+        'chat_logs': chat_logs,
+    }
+
+
+def remove():
+    """Delete everything generate() created; returns the number of users removed."""
+    users = User.objects.filter(username__startswith=PREFIX)
+    patient_hashes = [hashlib.sha256(name.encode('utf-8')).hexdigest() for name in users.values_list('username', flat=True)]
+    for chunk in _chunks(patient_hashes):
+        ChatLog.objects.filter(patient_hash__in=chunk).delete()
+    count = users.count()
+    users.delete()
+    AppointmentType.objects.filter(name__startswith=PREFIX).delete()
+    return count
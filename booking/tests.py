@@ -1,3 +1,548 @@
-from django.test import TestCase
+import importlib
+import io
+import tempfile
+import threading
+import time as time_module
+from datetime import date, time, timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, OperationalError, connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .forms import AppointmentSeriesForm
+from .models import (
+    Doctor, AppointmentType, Appointment, AppointmentDailyStats, AppointmentSeries, DoctorOpenDay, ReportJob,
+    ScheduleException, SlotHold, SlotReservation, WaitlistEntry,
+)
+from . import availability_cache, bulk_import, holds, report_jobs, report_stats, rollup, schedule, slots, waitlist
+
+
+def make_doctor(username='doc', start=time(9, 0), end=time(17, 0), **kwargs):
+    kwargs.setdefault('specialty', 'General')
+    doctor = Doctor.objects.create(
+        user=User.objects.create(username=username), qualifications='MBChB', experience_years=5,
+        available_days='Mon-Sun', available_time_start=start, available_time_end=end, **kwargs,
+    )
+    return doctor
+
+
+def book(user, doctor, appointment_type, day, start, status='scheduled'):
+    return Appointment.objects.create(
+        user=user, doctor=doctor, appointment_type=appointment_type,
+        appointment_date=day, appointment_time=start, status=status,
+    )
+
+
+class BookingTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.doctor = make_doctor()
+        self.type = AppointmentType.objects.create(name='Consultation', duration=30)
+        self.doctor.appointment_types.add(self.type)
+        self.patient = User.objects.create(username='patient', email='patient@example.com')
+        self.day = date.today() + timedelta(days=2)
+
+
+class AppointmentTypeDurationTests(BookingTestCase):
+    def test_duration_change_moves_end_times_and_reservations(self):
+        appointment = book(self.patient, self.doctor, self.type, self.day, time(10, 0))
+        self.type.duration = 45
+        self.type.save()
+        appointment.refresh_from_db()
+        self.assertEqual(appointment.end_time, time(10, 45))
+        self.assertEqual(SlotReservation.objects.filter(appointment=appointment).count(), 9)
+
+    def test_duration_change_leaves_canceled_appointments_without_reservations(self):
+        canceled = book(self.patient, self.doctor, self.type, self.day, time(10, 0), status='canceled')
+        self.type.duration = 45
+        self.type.save()
+        canceled.refresh_from_db()
+        self.assertEqual(canceled.end_time, time(10, 45))
+        self.assertFalse(SlotReservation.objects.filter(appointment=canceled).exists())
+        # the freed slot can be booked again
+        book(self.patient, self.doctor, self.type, self.day, time(10, 0))
+
+
+class AvailabilityCacheTests(BookingTestCase):
+    def test_booking_invalidates_the_day_after_commit(self):
+        before = availability_cache.available_times(self.doctor, self.day, 30)
+        self.assertIn(time(10, 0), before)
+        with self.captureOnCommitCallbacks() as callbacks:
+            book(self.patient, self.doctor, self.type, self.day, time(10, 0))
+            # not yet committed: other requests still see (and may cache) the old state
+            self.assertIn(time(10, 0), availability_cache.available_times(self.doctor, self.day, 30))
+        for callback in callbacks:
+            callback()
+        self.assertNotIn(time(10, 0), availability_cache.available_times(self.doctor, self.day, 30))
+
+    def test_result_computed_before_an_invalidation_is_not_served_after_it(self):
+        compute = slots.available_times
+
+        def book_meanwhile(doctor, day, duration):
+            times = compute(doctor, day, duration)
+            # the booking commits and invalidates while this reader is still computing
+            with self.captureOnCommitCallbacks(execute=True):
+                book(self.patient, self.doctor, self.type, self.day, time(10, 0))
+            return times
+
+        with mock.patch.object(slots, 'available_times', side_effect=book_meanwhile):
+            self.assertIn(time(10, 0), availability_cache.available_times(self.doctor, self.day, 30))
+        self.assertNotIn(time(10, 0), availability_cache.available_times(self.doctor, self.day, 30))
+
+    def test_duration_change_invalidates_doctors_with_series_of_that_type(self):
+        AppointmentSeries.objects.create(
+            user=self.patient, doctor=self.doctor, appointment_type=self.type, appointment_time=time(10, 0),
+            start_date=self.day, end_date=self.day + timedelta(weeks=4),
+        )
+        self.assertIn(time(10, 30), availability_cache.available_times(self.doctor, self.day, 15))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.type.duration = 45
+            self.type.save()
+        self.assertNotIn(time(10, 30), availability_cache.available_times(self.doctor, self.day, 15))
+
+
+class SlotHoldTests(BookingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.other = User.objects.create(username='other')
+
+    def test_hold_blocks_other_users(self):
+        self.assertIsNotNone(holds.place(self.patient, self.doctor, self.day, time(10, 0), 30))
+        self.assertIsNone(holds.place(self.other, self.doctor, self.day, time(10, 15), 30))
+        self.assertTrue(holds.held_by_other(self.other, self.doctor, self.day, time(10, 0), 30))
+        self.assertFalse(holds.held_by_other(self.patient, self.doctor, self.day, time(10, 0), 30))
+        self.assertEqual(holds.held_intervals(self.doctor.pk, self.day, exclude_user=self.other.pk), [(600, 630)])
+
+    def test_new_hold_replaces_own_hold(self):
+        holds.place(self.patient, self.doctor, self.day, time(10, 0), 30)
+        holds.place(self.patient, self.doctor, self.day, time(11, 0), 30)
+        self.assertEqual(list(SlotHold.objects.filter(user=self.patient).values_list('start_time', flat=True)), [time(11, 0)])
+
+    def test_failed_hold_keeps_the_existing_one(self):
+        holds.place(self.patient, self.doctor, self.day, time(10, 0), 30)
+        holds.place(self.other, self.doctor, self.day, time(14, 0), 30)
+        self.assertIsNone(holds.place(self.patient, self.doctor, self.day, time(14, 0), 30))
+        self.assertTrue(SlotHold.objects.filter(user=self.patient, start_time=time(10, 0)).exists())
+
+    def test_booked_slot_cannot_be_held(self):
+        book(self.other, self.doctor, self.type, self.day, time(10, 0))
+        self.assertIsNone(holds.place(self.patient, self.doctor, self.day, time(10, 0), 30))
+
+    def test_sweep_deletes_expired_holds(self):
+        hold = holds.place(self.patient, self.doctor, self.day, time(10, 0), 30)
+        SlotHold.objects.filter(pk=hold.pk).update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(holds.sweep(), 1)
+        self.assertIsNotNone(holds.place(self.other, self.doctor, self.day, time(10, 0), 30))
+
+
+class WaitlistTests(BookingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.first = waitlist.join(self._entry('first'))
+        self.second = waitlist.join(self._entry('second'))
+
+    def _entry(self, username):
+        return WaitlistEntry(
+            user=User.objects.create(username=username), doctor=self.doctor, appointment_type=self.type,
+            earliest_date=self.day, latest_date=self.day + timedelta(days=7),
+        )
+
+    def test_join_indexes_open_days(self):
+        self.assertEqual(self.first.slots.count(), 8)
+
+    def test_freed_slot_goes_to_longest_waiting_entry(self):
+        entry = waitlist.offer_freed_slot(self.doctor, self.day, time(10, 0))
+        self.assertEqual(entry, self.first)
+        entry.refresh_from_db()
+        self.assertEqual((entry.status, entry.offered_time), ('offered', time(10, 0)))
+        self.assertFalse(entry.slots.exists())
+        self.assertTrue(holds.held_by_other(self.second.user, self.doctor, self.day, time(10, 0), 30))
+
+    def test_offer_keeps_the_waiters_own_checkout_hold(self):
+        own = holds.place(self.first.user, self.doctor, self.day, time(14, 0), 30)
+        waitlist.offer_freed_slot(self.doctor, self.day, time(10, 0))
+        self.assertTrue(SlotHold.objects.filter(pk=own.pk).exists())
+
+    def test_expired_offer_is_passed_on_and_requeued(self):
+        waitlist.offer_freed_slot(self.doctor, self.day, time(10, 0))
+        SlotHold.objects.filter(user=self.first.user).update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(waitlist.expire_offers(), 1)
+        self.first.refresh_from_db()
+        self.second.refresh_from_db()
+        self.assertEqual((self.first.status, self.first.offered_date), ('waiting', None))
+        self.assertEqual(self.first.slots.count(), 8)
+        self.assertEqual(self.second.status, 'offered')
+        self.assertEqual(waitlist.expire_offers(), 0)
+
+    def test_booked_offer_is_fulfilled_and_not_requeued(self):
+        waitlist.offer_freed_slot(self.doctor, self.day, time(10, 0))
+        book(self.first.user, self.doctor, self.type, self.day, time(10, 0))
+        holds.release(self.first.user)
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.status, 'fulfilled')
+        self.assertEqual(waitlist.expire_offers(), 0)
+
+    def test_opportunistic_sweep_expires_offers(self):
+        waitlist.offer_freed_slot(self.doctor, self.day, time(10, 0))
+        SlotHold.objects.filter(user=self.first.user).update(expires_at=timezone.now() - timedelta(seconds=1))
+        cache.delete(f"{holds._PREFIX}:swept")
+        holds.maybe_sweep()
+        self.first.refresh_from_db()
+        self.second.refresh_from_db()
+        self.assertEqual((self.first.status, self.second.status), ('waiting', 'offered'))
+
+
+class RollupTests(BookingTestCase):
+    def counts(self):
+        return {
+            (row.date, row.status): row.count
+            for row in AppointmentDailyStats.objects.filter(doctor=self.doctor).exclude(count=0)
+        }
+
+    def test_saves_and_deletes_apply_deltas(self):
+        first = book(self.patient, self.doctor, self.type, self.day, time(10, 0))
+        book(self.patient, self.doctor, self.type, self.day, time(11, 0))
+        self.assertEqual(self.counts(), {(self.day, 'scheduled'): 2})
+
+        first.status = 'canceled'
+        first.save()
+        self.assertEqual(self.counts(), {(self.day, 'scheduled'): 1, (self.day, 'canceled'): 1})
+
+        first.appointment_date = self.day + timedelta(days=1)
+        first.save()
+        self.assertEqual(self.counts(), {(self.day, 'scheduled'): 1, (self.day + timedelta(days=1), 'canceled'): 1})
+
+        first.delete()
+        self.assertEqual(self.counts(), {(self.day, 'scheduled'): 1})
+
+    def test_rebuild_matches_incremental_counts(self):
+        for hour in (9, 10, 11):
+            book(self.patient, self.doctor, self.type, self.day, time(hour, 0))
+        Appointment.objects.filter(appointment_time=time(9, 0)).first().delete()
+        incremental = self.counts()
+        rollup.rebuild()
+        self.assertEqual(self.counts(), incremental)
+
+
+class ReportDataVersionTests(BookingTestCase):
+    def test_version_follows_changes_without_reading_appointments(self):
+        appointment = book(self.patient, self.doctor, self.type, self.day, time(10, 0))
+        filters = report_stats.ReportFilters(start=self.day, end=self.day)
+        with CaptureQueriesContext(connection) as queries:
+            version = report_stats.data_version(filters)
+        self.assertFalse(any('booking_appointment"' in q['sql'] for q in queries.captured_queries))
+
+        appointment.appointment_time = time(11, 0)
+        appointment.save()
+        moved = report_stats.data_version(filters)
+        self.assertNotEqual(moved, version)
+        self.assertEqual(report_stats.data_version(filters), moved)
+
+        appointment.delete()
+        self.assertNotEqual(report_stats.data_version(filters), moved)
+
+    def test_aggregates(self):
+        book(self.patient, self.doctor, self.type, self.day, time(10, 0))
+        book(self.patient, self.doctor, self.type, self.day, time(11, 0), status='canceled')
+        figures = report_stats.aggregates(report_stats.ReportFilters(start=self.day, end=self.day + timedelta(days=1)))
+        self.assertEqual(figures['total'], 2)
+        self.assertEqual(figures['type_counts'], [{'type': 'Consultation', 'count': 2}])
+        self.assertEqual(figures['timeline_data'], [2, 0])
+
+    def test_timeline_labels_follow_the_report_type(self):
+        early_in_month = date(2026, 3, 3)
+        weekly = report_stats.report_context('weekly', early_in_month)['timeline_labels']
+        monthly = report_stats.report_context('monthly', early_in_month)['timeline_labels']
+        yearly = report_stats.report_context('yearly', early_in_month)['timeline_labels']
+        self.assertEqual(weekly[-1], 'Tue 03')
+        self.assertEqual(monthly, ['01 Mar', '02 Mar', '03 Mar'])
+        self.assertEqual((len(yearly), yearly[0]), (12, 'Jan'))
+
+
+class SlotEngineTests(BookingTestCase):
+    def test_day_occupancy(self):
+        occupancy = slots.DayOccupancy([(600, 630), (700, 720)])
+        self.assertEqual(occupancy.busy_minutes(590, 640), 30)
+        self.assertFalse(occupancy.is_free(time(10, 15), 30))
+        self.assertTrue(occupancy.is_free(time(10, 30), 30))
+        self.assertEqual(
+            occupancy.free_starts(time(9, 30), time(12, 30), 30),
+            [time(9, 30), time(10, 30), time(10, 45), time(11, 0), time(12, 0)],
+        )
+
+    def test_available_times_skip_bookings_series_and_canceled(self):
+        book(self.patient, self.doctor, self.type, self.day, time(9, 0))
+        book(self.patient, self.doctor, self.type, self.day, time(11, 0), status='canceled')
+        AppointmentSeries.objects.create(
+            user=self.patient, doctor=self.doctor, appointment_type=self.type, appointment_time=time(10, 0),
+            start_date=self.day, end_date=self.day + timedelta(weeks=2),
+        )
+        times = slots.available_times(self.doctor, self.day, 30)
+        self.assertEqual(times[:4], [time(9, 30), time(10, 30), time(10, 45), time(11, 0)])
+        self.assertEqual(times[-1], time(16, 30))
+        self.assertTrue(slots.has_overlap(self.doctor, self.day, time(9, 15), 30))
+        self.assertTrue(slots.has_overlap(self.doctor, self.day, time(10, 15), 30))
+        self.assertFalse(slots.has_overlap(self.doctor, self.day, time(11, 0), 30))
+
+    def test_earliest_slots_match_per_doctor_availability(self):
+        second = make_doctor('doc2', start=time(13, 0), end=time(15, 0))
+        doctors = [self.doctor, second]
+        for hour in range(9, 17):
+            book(self.patient, self.doctor, self.type, self.day, time(hour, 0))
+            book(self.patient, self.doctor, self.type, self.day, time(hour, 30))
+        book(self.patient, second, self.type, self.day + timedelta(days=1), time(13, 30))
+        AppointmentSeries.objects.create(
+            user=self.patient, doctor=second, appointment_type=self.type, appointment_time=time(14, 0),
+            start_date=self.day, end_date=self.day + timedelta(weeks=2),
+        )
+        end = self.day + timedelta(days=3)
+
+        expected = sorted(
+            (day, t, doctor.pk)
+            for day in (self.day + timedelta(days=n) for n in range(4))
+            for doctor in doctors
+            for t in slots.available_times(doctor, day, 30)
+        )
+        found = slots.earliest_slots(doctors, 30, self.day, end, limit=len(expected) + 1)
+        self.assertEqual([(day, t, doctor.pk) for day, t, doctor in found], expected)
+
+        page = slots.earliest_slots(doctors, 30, self.day, end, limit=5, after=expected[10])
+        self.assertEqual([(day, t, doctor.pk) for day, t, doctor in page], expected[11:16])
+
+
+class ReservationConstraintTests(BookingTestCase):
+    def test_overlapping_booking_is_rejected_with_its_appointment(self):
+        book(self.patient, self.doctor, self.type, self.day, time(10, 0))
+        with self.assertRaises(IntegrityError):
+            book(self.patient, self.doctor, self.type, self.day, time(10, 15))
+        self.assertEqual(Appointment.objects.filter(doctor=self.doctor, appointment_date=self.day).count(), 1)
+        book(self.patient, self.doctor, self.type, self.day, time(10, 30))
+
+    def test_cancelling_frees_the_slot(self):
+        appointment = book(self.patient, self.doctor, self.type, self.day, time(10, 0))
+        appointment.status = 'canceled'
+        appointment.save(update_fields=['status'])
+        self.assertFalse(SlotReservation.objects.filter(appointment=appointment).exists())
+        book(self.patient, self.doctor, self.type, self.day, time(10, 0))
+
+
+class ConcurrentBookingTests(TransactionTestCase):
+    def test_threads_never_double_book(self):
+        doctor = make_doctor()
+        appointment_type = AppointmentType.objects.create(name='Consultation', duration=30)
+        users = [User.objects.create(username=f'patient{i}') for i in range(6)]
+        day = date.today() + timedelta(days=1)
+        barrier = threading.Barrier(len(users))
+        outcomes = []
+
+        def worker(user, start):
+            try:
+                barrier.wait()
+                # the in-memory test database locks whole tables; retry those
+                # so every thread ends up booked or refused by the constraint
+                while True:
+                    try:
+                        book(user, doctor, appointment_type, day, start)
+                        outcomes.append('booked')
+                        break
+                    except IntegrityError:
+                        outcomes.append('rejected')
+                        break
+                    except OperationalError:
+                        time_module.sleep(0.01)
+            finally:
+                connection.close()
+
+        # every start overlaps its neighbours
+        threads = [
+            threading.Thread(target=worker, args=(user, time(10, 15 * (i % 3)))) for i, user in enumerate(users)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        stored = sorted(Appointment.objects.filter(doctor=doctor).values_list('appointment_time', 'end_time'))
+        self.assertEqual(len(outcomes), len(users))
+        self.assertEqual(len(stored), outcomes.count('booked'))
+        self.assertIn(len(stored), (1, 2))
+        for (_, end), (start, _) in zip(stored, stored[1:]):
+            self.assertLessEqual(end, start)
+
+
+class BulkImportTests(BookingTestCase):
+    def _import(self, rows):
+        lines = ['username,doctor_id,appointment_type_id,appointment_date,appointment_time,status']
+        lines += [
+            f'{username},{self.doctor.pk},{self.type.pk},{self.day.isoformat()},{start},{status}'
+            for username, start, status in rows
+        ]
+        return bulk_import.import_appointments(io.StringIO('\n'.join(lines) + '\n'), 'csv').as_dict()
+
+    def test_sweep_rejects_overlaps_within_the_batch_and_with_bookings(self):
+        book(self.patient, self.doctor, self.type, self.day, time(11, 0))
+        result = self._import([
+            ('patient', '10:00', 'scheduled'),
+            ('patient', '10:15', 'scheduled'),
+            ('patient', '11:15', 'scheduled'),
+            ('patient', '12:00', 'canceled'),
+            ('patient', '12:00', 'scheduled'),
+            ('patient', '12:30', 'scheduled'),
+            ('nobody', '14:00', 'scheduled'),
+            ('patient', '20:00', 'scheduled'),
+        ])
+        self.assertEqual(result['imported'], 4)
+        self.assertEqual(result['rejects'], [
+            {'line': 3, 'reason': 'Overlaps row 2 of this import.'},
+            {'line': 4, 'reason': 'Overlaps an existing appointment.'},
+            {'line': 8, 'reason': "Unknown user 'nobody'."},
+            {'line': 9, 'reason': "Outside the doctor's working hours."},
+        ])
+        self.assertEqual(
+            sorted(Appointment.objects.filter(doctor=self.doctor).values_list('appointment_time', 'status')),
+            [(time(10, 0), 'scheduled'), (time(11, 0), 'scheduled'), (time(12, 0), 'canceled'),
+             (time(12, 0), 'scheduled'), (time(12, 30), 'scheduled')],
+        )
+        self.assertEqual(SlotReservation.objects.filter(doctor=self.doctor).count(), 4 * 6)
+        stats = AppointmentDailyStats.objects.filter(date=self.day)
+        self.assertEqual(sum(stats.values_list('count', flat=True)), 5)
+
+
+class OpenDaysTests(BookingTestCase):
+    def test_migration_keeps_its_own_weekday_parser(self):
+        migration = importlib.import_module('booking.migrations.0010_doctor_schedule')
+        for text in ('Mon-Fri', 'mon, wed & fri', 'daily', 'Sat to Mon', 'Tuesday and Thursday', 'weekdays', 'soon'):
+            self.assertEqual(migration.parse_weekdays(text), schedule.parse_weekdays(text), text)
+        for mask in range(128):
+            self.assertEqual(migration.format_weekdays(mask), schedule.format_weekdays(mask))
+
+    def test_reads_past_the_index_compute_without_writing(self):
+        today = timezone.now().date()
+        self.doctor.refresh_from_db()
+        self.assertEqual(self.doctor.open_days_until, today + timedelta(days=schedule.OPEN_DAYS_HORIZON - 1))
+        last = self.doctor.open_days_until
+        ScheduleException.objects.create(doctor=self.doctor, date=last + timedelta(days=2))
+
+        with self.assertNumQueries(4):
+            open_days = schedule.open_doctors_by_day([self.doctor], last - timedelta(days=3), last + timedelta(days=3))
+        self.assertEqual(sorted(open_days), [last + timedelta(days=n) for n in (-3, -2, -1, 0, 1, 3)])
+        self.doctor.refresh_from_db()
+        self.assertEqual(self.doctor.open_days_until, last)
+        self.assertFalse(DoctorOpenDay.objects.filter(doctor=self.doctor, date__gt=last).exists())
+
+    def test_command_moves_the_index_on(self):
+        later = timezone.now() + timedelta(days=100)
+        with mock.patch('django.utils.timezone.now', return_value=later):
+            call_command('rebuild_open_days', stdout=io.StringIO())
+        last = later.date() + timedelta(days=schedule.OPEN_DAYS_HORIZON - 1)
+        self.doctor.refresh_from_db()
+        self.assertEqual(self.doctor.open_days_until, last)
+        self.assertTrue(DoctorOpenDay.objects.filter(doctor=self.doctor, date=last).exists())
+
+    def test_single_day_refresh_past_the_index_does_not_extend_it(self):
+        Doctor.objects.filter(pk=self.doctor.pk).update(open_days_until=self.day)
+        schedule.rebuild_open_days([self.doctor], start=self.day + timedelta(days=30), days=1)
+        self.doctor.refresh_from_db()
+        self.assertEqual(self.doctor.open_days_until, self.day)
+
+
+class AppointmentSeriesFormTests(BookingTestCase):
+    def _form(self, start, instance=None, **data):
+        data = {
+            'user': self.patient.pk, 'doctor': self.doctor.pk, 'appointment_type': self.type.pk,
+            'appointment_time': start, 'start_date': self.day, 'end_date': self.day + timedelta(weeks=4),
+            'interval_weeks': 1, **data,
+        }
+        return AppointmentSeriesForm(data, instance=instance)
+
+    def test_rejects_overlaps_with_bookings_and_other_series(self):
+        book(self.patient, self.doctor, self.type, self.day + timedelta(weeks=2), time(10, 15))
+        form = self._form('10:00')
+        self.assertFalse(form.is_valid())
+        self.assertIn((self.day + timedelta(weeks=2)).strftime('%d %b %Y'), str(form.errors))
+
+        series = self._form('11:00').save()
+        self.assertFalse(self._form('11:15', start_date=self.day + timedelta(weeks=1)).is_valid())
+        self.assertTrue(self._form('11:15', interval_weeks=2, start_date=self.day + timedelta(days=1)).is_valid())
+        # editing a series does not clash with its own occurrences
+        self.assertTrue(self._form('11:15', instance=series).is_valid())
+
+    def test_cancelled_occurrence_and_booking_do_not_clash(self):
+        book(self.patient, self.doctor, self.type, self.day, time(10, 0), status='canceled')
+        self.assertTrue(self._form('10:00').is_valid())
+        self.assertFalse(self._form('10:00', interval_weeks=0).is_valid())
+
+
+class ReportJobViewTests(BookingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache_dir = tempfile.TemporaryDirectory()
+        patcher = mock.patch.object(report_jobs, 'CACHE_DIR', Path(self.cache_dir.name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.cache_dir.cleanup)
+        self.client.force_login(self.patient)
+
+    def _rendered_job(self):
+        job = report_jobs.request('weekly', user=self.patient)
+        report_jobs.cache_path(job.cache_key).parent.mkdir(parents=True, exist_ok=True)
+        report_jobs.cache_path(job.cache_key).write_bytes(b'%PDF-1.4')
+        ReportJob.objects.filter(pk=job.pk).update(status='done')
+        job.refresh_from_db()
+        return job
+
+    def test_serves_the_cached_file(self):
+        job = self._rendered_job()
+        response = self.client.get(reverse('booking:report_job_file', args=[job.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF-1.4')
+
+    def test_file_removed_after_the_check_is_queued_again(self):
+        job = self._rendered_job()
+        with mock.patch.object(report_jobs, 'is_ready', return_value=True):
+            report_jobs.cache_path(job.cache_key).unlink()
+            response = self.client.get(reverse('booking:report_job_file', args=[job.pk]), HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()['status'], 'queued')
+        self.assertNotEqual(response.json()['id'], job.pk)
+
+    def test_pending_page_stops_refreshing_without_a_worker(self):
+        job = report_jobs.request('weekly', user=self.patient)
+        url = reverse('booking:report_job_file', args=[job.pk])
+        self.assertEqual(self.client.get(reverse('booking:download_report', args=['weekly'])).status_code, 202)
+        ReportJob.objects.filter(pk=job.pk).update(created_at=timezone.now() - timedelta(minutes=5))
+        response = self.client.get(reverse('booking:download_report', args=['weekly']))
+        self.assertContains(response, 'longer than expected', status_code=202)
+        self.assertNotContains(response, 'http-equiv="refresh"', status_code=202)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_jobs_are_visible_to_their_requester_and_staff_only(self):
+        job = self._rendered_job()
+        other = User.objects.create(username='other')
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(reverse('booking:report_job_status', args=[job.pk])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('booking:report_job_file', args=[job.pk])).status_code, 404)
+        # the same report requested by someone else is served from the same file under their own job
+        theirs = report_jobs.request('weekly', user=other)
+        self.assertNotEqual(theirs.pk, job.pk)
+        self.assertEqual(self.client.get(reverse('booking:report_job_file', args=[theirs.pk])).status_code, 200)
+        self.client.force_login(User.objects.create(username='staff', is_staff=True))
+        self.assertEqual(self.client.get(reverse('booking:report_job_status', args=[job.pk])).status_code, 200)
+
+    def test_one_render_finishes_every_queued_job_for_the_file(self):
+        first = report_jobs.request('weekly', user=self.patient)
+        second = report_jobs.request('weekly', user=User.objects.create(username='other'))
+        self.assertNotEqual(first.pk, second.pk)
+        with mock.patch('booking.report_pdf.render_pdf', return_value=b'%PDF-1.4') as render:
+            report_jobs.run(report_jobs.claim_next())
+            self.assertIsNone(report_jobs.claim_next())
+        render.assert_called_once()
+        second.refresh_from_db()
+        self.assertTrue(report_jobs.is_ready(second))
@@ -14,12 +14,20 @@ urlpatterns = [
     path('appointment/<pk>/', views.appointmentDetailView, name='appointments-detail'),
     path('appointment/<pk>/update/', views.appointmentUpdateView, name='appointment_update'),
     path('appointment/<pk>/delete/', views.appointmentDeleteView, name='appointment_delete'),
+    path('series/<int:series_pk>/<str:occurrence_date>/update/', views.occurrenceUpdateView, name='occurrence_update'),
+    path('series/<int:series_pk>/<str:occurrence_date>/cancel/', views.occurrenceCancelView, name='occurrence_cancel'),
+    path('waitlist/', views.waitlist_view, name='waitlist'),
+    path('waitlist/<int:pk>/withdraw/', views.waitlist_withdraw, name='waitlist_withdraw'),
     path('payment/', views.payment, name='payment'),
     path('reports/', views.reports_view, name='reports-view'),
     path('reports/download/<str:report_type>/', views.download_report, name='download_report'),
+    path('reports/jobs/<int:pk>/', views.report_job_status, name='report_job_status'),
+    path('reports/jobs/<int:pk>/file/', views.report_job_file, name='report_job_file'),
     path('doctors/', views.list_doctors, name='list_doctors'),
     path('notifications/', views.view_notifications, name='view_notifications'),
 
     path('get_available_doctors/<int:appointment_type_id>/', views.get_available_doctors, name='get_available_doctors'),
     path('get_available_times/<int:doctor_id>/', views.get_available_times, name='get_available_times'),
+    path('hold_slot/<int:doctor_id>/', views.hold_slot, name='hold_slot'),
+    path('get_earliest_slots/<int:appointment_type_id>/', views.get_earliest_slots, name='get_earliest_slots'),
 ]
\ No newline at end of file
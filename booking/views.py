@@ -1,38 +1,36 @@
-import json
 import base64
-import io
 import logging
 from datetime import datetime, timedelta
 
 from django.shortcuts import render, redirect, get_object_or_404
 from django.template.loader import render_to_string
-from django.http import HttpResponse, JsonResponse
+from django.http import FileResponse, HttpResponse, JsonResponse, Http404
 from django.utils import timezone
 from django.contrib.auth.decorators import login_required
-from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.core.mail import send_mail
 from django.conf import settings
 from django.contrib import messages
-from django.db.models import Q, Count
-from django.urls import NoReverseMatch
+from django.db import IntegrityError
+from django.urls import NoReverseMatch, reverse
 
-from .models import Doctor, Appointment, AppointmentType, Notification
-from .forms import AppointmentForm, ReportForm
-
-from weasyprint import HTML
+from .models import Doctor, Appointment, AppointmentSeries, AppointmentType, Notification, ReportJob, WaitlistEntry
+from .forms import AppointmentForm, ReportForm, WaitlistForm
+from . import slots, availability_cache, recurrence, holds, waitlist, report_stats, report_jobs
 
 logger = logging.getLogger(__name__)
 
-# optional server-side chart rendering
-try:
-    import matplotlib.pyplot as plt
-    MATPLOTLIB_AVAILABLE = True
-except Exception:
-    MATPLOTLIB_AVAILABLE = False
-
 current_date = datetime.now().date()
 
+SLOT_TAKEN_MESSAGE = "This time slot was just booked by someone else. Please choose another time."
+SLOT_HELD_MESSAGE = "Someone else is completing a booking for this time slot. Please choose another time."
+SERIES_LIST_DAYS = 90  # how far ahead recurring series are expanded in the appointment list
+REPORT_MAX_WAIT = 30  # seconds a report download may block on ?wait=
+REPORT_STALLED_AFTER = 120  # seconds a report may sit queued before the pending page stops waiting for a worker
+EARLIEST_SLOTS_MAX_DAYS = 31  # longest window an earliest-slot search may cover
+EARLIEST_SLOTS_MAX_LIMIT = 50  # most slots returned per page
+
 def index(request):
     return render(request, 'startup.html', {'title': 'Home'})
 
@@ -66,7 +64,26 @@ def appointmentBooking(request):
             if getattr(appointment, "doctor", None) in (None, "") and selected_doctor:
                 appointment.doctor = selected_doctor
 
-            appointment.save()
+            if holds.held_by_other(request.user, appointment.doctor, appointment.appointment_date,
+                                   appointment.appointment_time, appointment.appointment_type.duration):
+                form.add_error(None, SLOT_HELD_MESSAGE)
+                return render(request, 'appointment/appointment.html', {
+                    'form': form,
+                    'appointment_types': AppointmentType.objects.all(),
+                    'selected_doctor': selected_doctor,
+                })
+
+            try:
+                appointment.save()
+            except IntegrityError:
+                # another booking claimed an overlapping slot after validation
+                form.add_error(None, SLOT_TAKEN_MESSAGE)
+                return render(request, 'appointment/appointment.html', {
+                    'form': form,
+                    'appointment_types': AppointmentType.objects.all(),
+                    'selected_doctor': selected_doctor,
+                })
+            holds.release(request.user)
 
             # Send confirmation email (fail silently)
             try:
@@ -122,7 +139,11 @@ def payment(request):
 @login_required
 def appointmentListView(request):
     current_datetime = timezone.now()
-    bookings = Appointment.objects.filter(user=request.user).order_by('appointment_date', 'appointment_time')
+    bookings = list(Appointment.objects.filter(user=request.user).select_related('doctor__user', 'appointment_type'))
+    bookings.extend(recurrence.expand(
+        request.user.appointment_series.all(), current_datetime.date(), current_datetime.date() + timedelta(days=SERIES_LIST_DAYS)
+    ))
+    bookings.sort(key=lambda b: (b.appointment_date, b.appointment_time))
 
     past_bookings = []
     upcoming_bookings = []
@@ -177,15 +198,19 @@ def appointmentUpdateView(request, pk):
     if request.method == "POST":
         form = AppointmentForm(request.POST, instance=booking)
         if form.is_valid():
-            form.save()
-            # redirect to appointments list (namespaced), with fallbacks
             try:
-                return redirect("booking:appointment_list")
-            except NoReverseMatch:
+                form.save()
+            except IntegrityError:
+                form.add_error(None, SLOT_TAKEN_MESSAGE)
+            else:
+                # redirect to appointments list (namespaced), with fallbacks
                 try:
-                    return redirect("appointment_list")
+                    return redirect("booking:appointment_list")
                 except NoReverseMatch:
-                    return redirect("/appointments/")
+                    try:
+                        return redirect("appointment_list")
+                    except NoReverseMatch:
+                        return redirect("/appointments/")
     else:
         form = AppointmentForm(instance=booking)
     return render(request, "appointment/appointment_update.html", {
@@ -194,6 +219,13 @@ def appointmentUpdateView(request, pk):
         "booking": booking,
     })
 
+def _offer_to_waitlist(doctor, day, start_time):
+    # a failing match must never block the cancellation itself
+    try:
+        waitlist.offer_freed_slot(doctor, day, start_time)
+    except Exception:
+        logger.exception("Waitlist matching failed for doctor %s on %s at %s", doctor.pk, day, start_time)
+
 @login_required
 def appointmentDeleteView(request, pk):
     booking = get_object_or_404(Appointment, pk=pk)
@@ -211,7 +243,10 @@ def appointmentDeleteView(request, pk):
 
     if request.method == "POST":
         try:
+            held_slot = booking.status != 'canceled'
             booking.delete()
+            if held_slot:
+                _offer_to_waitlist(booking.doctor, booking.appointment_date, booking.appointment_time)
             try:
                 return redirect("booking:appointment_list")
             except NoReverseMatch:
@@ -230,6 +265,88 @@ def appointmentDeleteView(request, pk):
         "booking": booking
     })
 
+def _series_occurrence(request, series_pk, occurrence_date):
+    """The unmaterialized occurrence on `occurrence_date`, or None when the user may not touch it."""
+    series = get_object_or_404(AppointmentSeries.objects.select_related('doctor__user', 'appointment_type'), pk=series_pk)
+    try:
+        day = datetime.strptime(occurrence_date, '%Y-%m-%d').date()
+    except ValueError:
+        raise Http404("Invalid occurrence date.")
+    if not series.occurs_on(day) or series.overrides.filter(occurrence_date=day).exists():
+        raise Http404("No such occurrence.")
+    if series.user_id != request.user.pk and not request.user.is_staff:
+        messages.error(request, "You are not authorized to change this booking.")
+        return None
+    return series.occurrence(day)
+
+@login_required
+def occurrenceUpdateView(request, series_pk, occurrence_date):
+    booking = _series_occurrence(request, series_pk, occurrence_date)
+    if booking is None:
+        return redirect("booking:appointment_list")
+
+    if request.method == "POST":
+        # saving turns this single occurrence into a real appointment row
+        form = AppointmentForm(request.POST, instance=booking)
+        if form.is_valid():
+            try:
+                form.save()
+            except IntegrityError:
+                form.add_error(None, SLOT_TAKEN_MESSAGE)
+            else:
+                return redirect("booking:appointment_list")
+    else:
+        form = AppointmentForm(instance=booking)
+    return render(request, "appointment/appointment_update.html", {
+        "title": "Update Appointment",
+        "form": form,
+        "booking": booking,
+    })
+
+@login_required
+def occurrenceCancelView(request, series_pk, occurrence_date):
+    booking = _series_occurrence(request, series_pk, occurrence_date)
+    if booking is None:
+        return redirect("booking:appointment_list")
+
+    if request.method == "POST":
+        # the cancelled row masks the occurrence without holding its slot
+        recurrence.materialize(booking.series, booking.appointment_date, status='canceled')
+        _offer_to_waitlist(booking.doctor, booking.appointment_date, booking.appointment_time)
+        return redirect("booking:appointment_list")
+    return render(request, "appointment/appointment_delete.html", {
+        "title": "Cancel Appointment",
+        "booking": booking,
+    })
+
+@login_required
+def waitlist_view(request):
+    if request.method == "POST":
+        form = WaitlistForm(request.POST)
+        if form.is_valid():
+            entry = form.save(commit=False)
+            entry.user = request.user
+            waitlist.join(entry)
+            messages.success(request, "You are on the waitlist. We will hold the first matching slot that frees up for you.")
+            return redirect("booking:waitlist")
+    else:
+        form = WaitlistForm()
+    entries = WaitlistEntry.objects.filter(user=request.user).exclude(status='withdrawn').select_related(
+        'doctor__user', 'appointment_type', 'offered_doctor__user'
+    ).order_by('-created_at')
+    return render(request, "appointment/waitlist.html", {
+        "title": "Waitlist",
+        "form": form,
+        "entries": entries,
+    })
+
+@login_required
+@require_POST
+def waitlist_withdraw(request, pk):
+    entry = get_object_or_404(WaitlistEntry, pk=pk, user=request.user)
+    waitlist.withdraw(entry)
+    return redirect("booking:waitlist")
+
 def list_doctors(request):
     doctors = Doctor.objects.all()
     return render(request, 'doctors/doctors_list.html', {'doctors': doctors})
@@ -270,57 +387,7 @@ def reports_view(request):
         form = ReportForm(request.POST)
         if form.is_valid():
             report_type = form.cleaned_data['report_type']
-            appointments = get_appointments(report_type)
-
-            # Aggregate counts by appointment type and status
-            type_qs = appointments.values('appointment_type__name').annotate(count=Count('id')).order_by('-count')
-            type_counts = [{'type': item['appointment_type__name'] or 'Unknown', 'count': item['count']} for item in type_qs]
-
-            status_qs = appointments.values('status').annotate(count=Count('id')).order_by('-count')
-            status_counts = [{'status': item['status'], 'count': item['count']} for item in status_qs]
-
-            # Build timeline data
-            timeline_labels = []
-            timeline_data = []
-            now = timezone.now()
-
-            if report_type == 'weekly':
-                days = [(now.date() - timedelta(days=i)) for i in range(6, -1, -1)]
-                for d in days:
-                    timeline_labels.append(d.strftime('%a %d'))
-                    timeline_data.append(appointments.filter(appointment_date=d).count())
-            elif report_type == 'monthly':
-                month_start = now.replace(day=1).date()
-                today = now.date()
-                day = month_start
-                while day <= today:
-                    timeline_labels.append(day.strftime('%d %b'))
-                    timeline_data.append(appointments.filter(appointment_date=day).count())
-                    day += timedelta(days=1)
-            elif report_type == 'yearly':
-                for m in range(1, 13):
-                    label = datetime(now.year, m, 1).strftime('%b')
-                    timeline_labels.append(label)
-                    timeline_data.append(appointments.filter(appointment_date__month=m, appointment_date__year=now.year).count())
-
-            chart_payload = {
-                'type_counts': type_counts,
-                'status_counts': status_counts,
-                'timeline': {
-                    'labels': timeline_labels,
-                    'data': timeline_data
-                }
-            }
-
-            report_html = render_to_string(f'reports/{report_type}_report.html', {
-                'appointments': appointments,
-                'type_counts': type_counts,
-                'status_counts': status_counts,
-                'timeline_labels': timeline_labels,
-                'timeline_data': timeline_data,
-                'chart_payload_json': json.dumps(chart_payload),
-                'report_type': report_type,
-            })
+            report_html = render_to_string(f'reports/{report_type}_report.html', report_stats.report_context(report_type))
     else:
         form = ReportForm()
 
@@ -330,144 +397,92 @@ def reports_view(request):
         'report_type': report_type,
     })
 
-def get_appointments(report_type):
-    now = timezone.now()
-    if report_type == 'weekly':
-        week_start = (now - timedelta(days=6)).date()
-        return Appointment.objects.filter(appointment_date__gte=week_start).select_related('appointment_type', 'doctor', 'user')
-    elif report_type == 'monthly':
-        month_start = now.replace(day=1).date()
-        return Appointment.objects.filter(appointment_date__gte=month_start).select_related('appointment_type', 'doctor', 'user')
-    elif report_type == 'yearly':
-        year_start = now.replace(month=1, day=1).date()
-        return Appointment.objects.filter(appointment_date__gte=year_start).select_related('appointment_type', 'doctor', 'user')
-    return Appointment.objects.none()
-
-def generate_pdf_response(html_string, filename):
-    html = HTML(string=html_string, base_url=None)
-    pdf = html.write_pdf()
-    response = HttpResponse(pdf, content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    return response
 
-@login_required
-@csrf_exempt
-def download_report(request, report_type):
+def _wait_seconds(request):
+    try:
+        return min(float(request.GET.get('wait', 0)), REPORT_MAX_WAIT)
+    except ValueError:
+        return 0
+
+
+def _wants_json(request):
+    return 'application/json' in request.headers.get('Accept', '')
+
+
+def _report_file(job):
+    """The cached PDF of `job`; None when the file is gone (pruned or superseded since)."""
+    try:
+        pdf = open(report_jobs.cache_path(job.cache_key), 'rb')
+    except FileNotFoundError:
+        return None
+    return FileResponse(pdf, as_attachment=True, filename=f'{job.report_type}_report.pdf', content_type='application/pdf')
+
+
+def report_job_response(request, job):
     """
-    Enhanced download_report:
-      - GET: returns a PDF using server-side charts (matplotlib) if available.
-      - POST: accepts JSON with chart_images (data without the data:image/... prefix or full data URLs)
-              and embeds the provided images in the PDF. If images are missing and matplotlib is available,
-              server-side images will be generated.
+    Response for a report download backed by `job`: the cached PDF when it is
+    ready, else 202 with the job status (JSON for scripts, a self-refreshing
+    page for browsers). `?wait=N` blocks up to N seconds for the job first.
     """
-    if report_type not in ('weekly', 'monthly', 'yearly'):
+    timeout = _wait_seconds(request)
+    if timeout > 0:
+        job = report_jobs.wait(job, timeout)
+    if report_jobs.is_ready(job):
+        response = _report_file(job)
+        if response is not None:
+            return response
+        # removed since is_ready() looked; queue the current version again
+        job = report_jobs.request(job.report_type, user=request.user)
+    status = 500 if job.status == 'failed' else 202
+    if _wants_json(request):
+        return JsonResponse(_report_job_payload(job), status=status)
+    stalled = job.status == 'queued' and job.created_at < timezone.now() - timedelta(seconds=REPORT_STALLED_AFTER)
+    return render(request, 'reports/report_pending.html', {'job': job, 'stalled': stalled}, status=status)
+
+
+def _report_job_payload(job):
+    payload = {
+        'id': job.pk,
+        'report_type': job.report_type,
+        'status': job.status,
+        'status_url': reverse('booking:report_job_status', args=[job.pk]),
+    }
+    if job.status == 'done':
+        payload['file_url'] = reverse('booking:report_job_file', args=[job.pk])
+    if job.status == 'failed':
+        payload['error'] = job.error
+    return payload
+
+
+@login_required
+def download_report(request, report_type):
+    """Serve a report PDF from the file cache, queueing it for the worker when it is not rendered yet."""
+    if report_type not in report_stats.REPORT_TYPES:
         return HttpResponse('Invalid report type', status=400)
+    return report_job_response(request, report_jobs.request(report_type, user=request.user))
 
-    appointments = get_appointments(report_type)
 
-    chart_images = {}
-    if request.method == 'POST':
-        try:
-            payload = json.loads(request.body.decode('utf-8') or '{}')
-            chart_images = payload.get('chart_images', {}) or {}
-        except Exception as e:
-            logger.exception("Failed to parse JSON body for download_report: %s", e)
-            chart_images = {}
-
-    def normalize_img(val):
-        if not val:
-            return ''
-        if isinstance(val, str) and val.startswith('data:image'):
-            return val
-        # If contains base64 marker, use content after base64,
-        # otherwise assume raw base64 and wrap as png
-        if isinstance(val, str) and 'base64,' in val:
-            return 'data:image/png;base64,' + val.split('base64,', 1)[1]
-        return 'data:image/png;base64,' + val
-
-    img_timeline = normalize_img(chart_images.get('timeline'))
-    img_type = normalize_img(chart_images.get('type'))
-    img_status = normalize_img(chart_images.get('status'))
-
-    # If any chart missing, attempt server-side generation (matplotlib)
-    if (not img_timeline or not img_type or not img_status) and MATPLOTLIB_AVAILABLE:
-        try:
-            # Build aggregates
-            type_counts = {}
-            status_counts = {}
-            now = timezone.now()
-
-            for appt in appointments:
-                tname = appt.appointment_type.name if appt.appointment_type else 'Unknown'
-                type_counts[tname] = type_counts.get(tname, 0) + 1
-                status_counts[appt.status] = status_counts.get(appt.status, 0) + 1
-
-            timeline_labels = []
-            timeline_data = []
-            if report_type == 'weekly':
-                days = [(now.date() - timedelta(days=i)) for i in range(6, -1, -1)]
-                for d in days:
-                    timeline_labels.append(d.strftime('%a %d'))
-                    timeline_data.append(appointments.filter(appointment_date=d).count())
-            elif report_type == 'monthly':
-                month_start = now.replace(day=1).date()
-                day = month_start
-                today = now.date()
-                while day <= today:
-                    timeline_labels.append(day.strftime('%d %b'))
-                    timeline_data.append(appointments.filter(appointment_date=day).count())
-                    day += timedelta(days=1)
-            else:
-                for m in range(1, 13):
-                    timeline_labels.append(datetime(now.year, m, 1).strftime('%b'))
-                    timeline_data.append(appointments.filter(appointment_date__month=m, appointment_date__year=now.year).count())
-
-            def fig_to_dataurl(fig, fmt='png', dpi=120):
-                buf = io.BytesIO()
-                fig.savefig(buf, format=fmt, bbox_inches='tight', dpi=dpi)
-                plt.close(fig)
-                buf.seek(0)
-                return 'data:image/png;base64,' + base64.b64encode(buf.read()).decode('utf-8')
-
-            if not img_timeline:
-                fig, ax = plt.subplots(figsize=(7, 2.6))
-                ax.plot(timeline_labels, timeline_data, marker='o', color='#367fd8')
-                ax.grid(True, linestyle=':', linewidth=0.5)
-                fig.autofmt_xdate(rotation=25)
-                img_timeline = fig_to_dataurl(fig)
-
-            if not img_type:
-                fig, ax = plt.subplots(figsize=(5, 3))
-                types = list(type_counts.keys()) or ['No data']
-                counts = [type_counts.get(k, 0) for k in types]
-                ax.bar(types, counts, color='#8e5ea2')
-                ax.set_ylabel('Count')
-                fig.autofmt_xdate(rotation=25)
-                img_type = fig_to_dataurl(fig)
-
-            if not img_status:
-                fig, ax = plt.subplots(figsize=(4, 3))
-                statuses = list(status_counts.keys()) or ['none']
-                scounts = [status_counts.get(k, 0) for k in statuses]
-                colors = ['#4CAF50', '#2196F3', '#F44336'][:len(statuses)]
-                ax.pie(scounts, labels=statuses, autopct='%1.0f%%', colors=colors)
-                img_status = fig_to_dataurl(fig)
-        except Exception:
-            logger.exception("Server-side chart generation failed")
-            img_timeline = img_timeline or ''
-            img_type = img_type or ''
-            img_status = img_status or ''
-
-    # Render PDF-specific template; template should embed the three chart_* variables if present
-    html_string = render_to_string(f'reports/{report_type}_report_pdf.html', {
-        'appointments': appointments,
-        'chart_timeline': img_timeline,
-        'chart_type': img_type,
-        'chart_status': img_status,
-        'request': request,
-    })
+def _report_job(request, pk):
+    """The user's own report job (any job for staff); 404 otherwise."""
+    jobs = ReportJob.objects.all() if request.user.is_staff else ReportJob.objects.filter(requested_by=request.user)
+    return get_object_or_404(jobs, pk=pk)
+
+
+@login_required
+def report_job_status(request, pk):
+    job = _report_job(request, pk)
+    timeout = _wait_seconds(request)
+    if timeout > 0:
+        job = report_jobs.wait(job, timeout)
+    return JsonResponse(_report_job_payload(job))
+
 
-    return generate_pdf_response(html_string, f'{report_type}_report.pdf')
+@login_required
+def report_job_file(request, pk):
+    job = _report_job(request, pk)
+    if not report_jobs.is_ready(job):
+        raise Http404("Report is not ready")
+    return report_job_response(request, job)
 
 # AJAX: get doctors by appointment_type
 def get_available_doctors(request, appointment_type_id):
@@ -492,44 +507,97 @@ def get_available_times(request, doctor_id):
     except (ValueError, AppointmentType.DoesNotExist):
         return JsonResponse({'times': [], 'error': 'Invalid date or appointment type.'}, status=400)
 
-    if selected_date < timezone.now().date():
+    now = timezone.now()
+    if selected_date < now.date():
         return JsonResponse({'times': [], 'error': 'Cannot book appointments for past dates.'}, status=400)
 
-    start_time_doctor = doctor.available_time_start
-    end_time_doctor = doctor.available_time_end
-
-    booked_appointments = Appointment.objects.filter(
-        doctor=doctor,
-        appointment_date=selected_date
-    ).order_by('appointment_time')
+    not_before = now.time() if selected_date == now.date() else None
+    times = availability_cache.available_times(doctor, selected_date, appointment_type.duration, not_before=not_before)
+    # slots other patients are checking out stay hidden until their hold expires
+    held = holds.held_intervals(doctor.pk, selected_date, exclude_user=request.user.pk)
+    times = holds.exclude_held(times, appointment_type.duration, held)
+    available_times = [t.strftime('%H:%M') for t in times]
 
-    available_times = []
-    current_slot_datetime = datetime.combine(selected_date, start_time_doctor)
-    end_slot_datetime = datetime.combine(selected_date, end_time_doctor)
-    appointment_duration = timedelta(minutes=appointment_type.duration)
-    time_slot_interval = timedelta(minutes=15)
+    return JsonResponse({'times': available_times})
 
-    while current_slot_datetime + appointment_duration <= end_slot_datetime:
-        slot_start_time = current_slot_datetime.time()
-        slot_end_time = (current_slot_datetime + appointment_duration).time()
-
-        is_available = True
-        if selected_date == timezone.now().date() and slot_start_time < timezone.now().time():
-            is_available = False
-
-        if is_available:
-            for booked_appt in booked_appointments:
-                booked_start_datetime = datetime.combine(booked_appt.appointment_date, booked_appt.appointment_time)
-                booked_end_datetime = booked_start_datetime + timedelta(minutes=booked_appt.appointment_type.duration)
-                proposed_slot_start_datetime = datetime.combine(selected_date, slot_start_time)
-                proposed_slot_end_datetime = datetime.combine(selected_date, slot_end_time)
-                if (proposed_slot_start_datetime < booked_end_datetime and proposed_slot_end_datetime > booked_start_datetime):
-                    is_available = False
-                    break
-
-        if is_available:
-            available_times.append(slot_start_time.strftime('%H:%M'))
+@login_required
+@require_POST
+def hold_slot(request, doctor_id):
+    """Hold a slot for the current user while they finish booking and payment."""
+    doctor = get_object_or_404(Doctor, id=doctor_id)
+    try:
+        selected_date = datetime.strptime(request.POST.get('appointment_date', ''), '%Y-%m-%d').date()
+        selected_time = datetime.strptime(request.POST.get('appointment_time', ''), '%H:%M').time()
+        appointment_type = AppointmentType.objects.get(id=request.POST.get('appointment_type_id'))
+    except (ValueError, TypeError, AppointmentType.DoesNotExist):
+        return JsonResponse({'held': False, 'error': 'Invalid date, time or appointment type.'}, status=400)
 
-        current_slot_datetime += time_slot_interval
+    if selected_date < timezone.now().date():
+        return JsonResponse({'held': False, 'error': 'Cannot book appointments for past dates.'}, status=400)
+
+    hold = holds.place(request.user, doctor, selected_date, selected_time, appointment_type.duration)
+    if hold is None:
+        return JsonResponse({'held': False, 'error': 'This time slot is no longer available.'}, status=409)
+    return JsonResponse({'held': True, 'expires_at': hold.expires_at.isoformat()})
+
+def _encode_slot_cursor(day, slot_time, doctor_id):
+    raw = f"{day.isoformat()}|{slot_time.strftime('%H:%M')}|{doctor_id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def _decode_slot_cursor(cursor):
+    raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+    day_str, time_str, doctor_id = raw.split('|')
+    return (
+        datetime.strptime(day_str, '%Y-%m-%d').date(),
+        datetime.strptime(time_str, '%H:%M').time(),
+        int(doctor_id),
+    )
+
+# AJAX: earliest free slots across all doctors offering an appointment type
+def get_earliest_slots(request, appointment_type_id):
+    appointment_type = get_object_or_404(AppointmentType, id=appointment_type_id)
+    now = timezone.now()
 
-    return JsonResponse({'times': available_times})
\ No newline at end of file
+    try:
+        start_str = request.GET.get('start_date')
+        start_date = datetime.strptime(start_str, '%Y-%m-%d').date() if start_str else now.date()
+        days = min(int(request.GET.get('days', 14)), EARLIEST_SLOTS_MAX_DAYS)
+        limit = min(int(request.GET.get('limit', 10)), EARLIEST_SLOTS_MAX_LIMIT)
+        cursor = request.GET.get('cursor')
+        after = _decode_slot_cursor(cursor) if cursor else None
+    except (ValueError, TypeError, UnicodeDecodeError):
+        return JsonResponse({'slots': [], 'error': 'Invalid date window, limit or cursor.'}, status=400)
+
+    if days < 1 or limit < 1:
+        return JsonResponse({'slots': [], 'error': 'Days and limit must be positive.'}, status=400)
+
+    start_date = max(start_date, now.date())
+    end_date = start_date + timedelta(days=days - 1)
+
+    doctors = Doctor.objects.filter(appointment_types=appointment_type).select_related('user')
+    specialty = request.GET.get('specialty')
+    if specialty:
+        doctors = doctors.filter(specialty__iexact=specialty)
+    language = request.GET.get('language')
+    if language:
+        doctors = doctors.filter(languages_spoken__icontains=language)
+
+    found = slots.earliest_slots(doctors, appointment_type.duration, start_date, end_date, limit, after=after, now=now)
+
+    next_cursor = None
+    if len(found) == limit:
+        last_day, last_time, last_doctor = found[-1]
+        next_cursor = _encode_slot_cursor(last_day, last_time, last_doctor.pk)
+
+    return JsonResponse({
+        'slots': [
+            {
+                'doctor_id': doctor.pk,
+                'doctor': str(doctor),
+                'date': day.isoformat(),
+                'time': slot_time.strftime('%H:%M'),
+            }
+            for day, slot_time, doctor in found
+        ],
+        'next_cursor': next_cursor,
+    })
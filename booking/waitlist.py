@@ -0,0 +1,152 @@
+"""
+Waitlist matching on cancellation.
+
+A waiting entry is indexed by one WaitlistSlot row per (doctor, date) it
+would accept. When a booking is cancelled, the freed doctor/date is looked
+up on the (doctor, date, created_at) index, so finding the longest-waiting
+eligible patient is an index seek rather than a scan of the whole waitlist.
+The slot is then held for that patient (see booking.holds) and they are
+notified. Booking the offered slot marks the entry fulfilled. An offer
+whose hold expired unbooked is passed on to the next waiter by
+expire_offers(), and its entry goes back on the waitlist; holds.maybe_sweep
+runs it as bookings come in, and the sweep_slot_holds command covers quiet
+periods.
+"""
+import logging
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .models import Appointment, Doctor, Notification, SlotHold, WaitlistEntry, WaitlistSlot
+from . import holds, schedule
+
+logger = logging.getLogger(__name__)
+
+WAITLIST_MAX_DAYS = getattr(settings, "BOOKING_WAITLIST_MAX_DAYS", 60)
+OFFER_SECONDS = getattr(settings, "BOOKING_WAITLIST_OFFER_SECONDS", 30 * 60)
+MATCH_CANDIDATES = 20  # waiters tried for one freed slot before giving up
+
+
+def eligible_doctors(entry):
+    """Doctors that satisfy the entry: the chosen doctor, or any doctor of the specialty offering its type."""
+    doctors = Doctor.objects.filter(appointment_types=entry.appointment_type_id)
+    if entry.doctor_id:
+        return doctors.filter(pk=entry.doctor_id)
+    return doctors.filter(specialty__iexact=entry.specialty)
+
+
+def _index(entry):
+    first = max(entry.earliest_date, timezone.now().date())
+    open_days = schedule.open_doctors_by_day(eligible_doctors(entry), first, entry.latest_date)
+    WaitlistSlot.objects.bulk_create([
+        WaitlistSlot(entry=entry, doctor_id=doctor_id, date=day, created_at=entry.created_at)
+        for day, doctor_ids in open_days.items()
+        for doctor_id in doctor_ids
+    ])
+
+
+def join(entry):
+    """Save a new waiting entry and index it under every open doctor/date it accepts."""
+    with transaction.atomic():
+        entry.status = 'waiting'
+        entry.save()
+        _index(entry)
+    return entry
+
+
+def withdraw(entry):
+    with transaction.atomic():
+        entry.status = 'withdrawn'
+        entry.save(update_fields=['status'])
+        entry.slots.all().delete()
+
+
+def offer_freed_slot(doctor, day, start_time):
+    """
+    Offer the slot freed by a cancellation to the longest-waiting patient
+    whose appointment fits there. Returns the matched entry, or None.
+    """
+    if day < timezone.now().date():
+        return None
+    candidates = (
+        WaitlistSlot.objects.filter(doctor=doctor, date=day)
+        .order_by('created_at')
+        .select_related('entry__user', 'entry__appointment_type')[:MATCH_CANDIDATES]
+    )
+    for slot in candidates:
+        entry = slot.entry
+        # fails when this waiter's appointment type is too long for the gap; leaves
+        # any hold the waiter has on a slot they are checking out themselves
+        hold = holds.place(
+            entry.user, doctor, day, start_time, entry.appointment_type.duration, seconds=OFFER_SECONDS, replace=False,
+        )
+        if hold is None:
+            continue
+        message = (
+            f"A {entry.appointment_type.name} slot with Dr. {doctor.user.username} opened up on "
+            f"{day:%B %d, %Y} at {start_time:%I:%M %p}. It is held for you for {OFFER_SECONDS // 60} minutes."
+        )
+        with transaction.atomic():
+            entry.status = 'offered'
+            entry.offered_doctor = doctor
+            entry.offered_date = day
+            entry.offered_time = start_time
+            entry.save(update_fields=['status', 'offered_doctor', 'offered_date', 'offered_time'])
+            entry.slots.all().delete()
+            Notification.objects.create(sender=entry.user, message=message, notification_type='appointment')
+        try:
+            send_mail('A slot opened up', message, settings.EMAIL_HOST_USER, [entry.user.email], fail_silently=True)
+        except Exception:
+            logger.exception("Failed to send waitlist offer email for entry %s", entry.pk)
+        return entry
+    return None
+
+
+def fulfil_offer(appointment):
+    """Mark the offer that `appointment` books as fulfilled. Returns how many entries matched."""
+    return WaitlistEntry.objects.filter(
+        status='offered', user_id=appointment.user_id, offered_doctor_id=appointment.doctor_id,
+        offered_date=appointment.appointment_date, offered_time=appointment.appointment_time,
+    ).update(status='fulfilled')
+
+
+def expire_offers():
+    """
+    Requeue offered entries whose hold ran out without a booking, oldest
+    waiter first, and offer each freed slot to the next waiter. Entries whose
+    date range has passed are withdrawn instead, and offers that were booked
+    without going through fulfil_offer (e.g. bulk imports) are marked
+    fulfilled. Returns how many expired.
+    """
+    active_hold = SlotHold.objects.filter(
+        user=OuterRef('user'), doctor=OuterRef('offered_doctor'), date=OuterRef('offered_date'),
+        start_time=OuterRef('offered_time'), expires_at__gt=timezone.now(),
+    )
+    booked = Appointment.objects.filter(
+        user=OuterRef('user'), doctor=OuterRef('offered_doctor'), appointment_date=OuterRef('offered_date'),
+        appointment_time=OuterRef('offered_time'),
+    ).exclude(status='canceled')
+    WaitlistEntry.objects.filter(Exists(booked), status='offered').update(status='fulfilled')
+    expired = list(
+        WaitlistEntry.objects.filter(status='offered')
+        .filter(~Exists(active_hold))
+        .select_related('offered_doctor__user')
+        .order_by('created_at')
+    )
+    today = timezone.now().date()
+    for entry in expired:
+        doctor, day, start_time = entry.offered_doctor, entry.offered_date, entry.offered_time
+        with transaction.atomic():
+            entry.status = 'waiting' if entry.latest_date >= today else 'withdrawn'
+            entry.offered_doctor = entry.offered_date = entry.offered_time = None
+            entry.save(update_fields=['status', 'offered_doctor', 'offered_date', 'offered_time'])
+        # the next waiter gets the slot before this entry is indexed again
+        if doctor is not None and day is not None:
+            offer_freed_slot(doctor, day, start_time)
+        if entry.status == 'waiting':
+            with transaction.atomic():
+                _index(entry)
+    return len(expired)
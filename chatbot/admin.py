@@ -1,4 +1,9 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponseNotAllowed, HttpResponseRedirect
+from django.urls import path, reverse
+
+from . import reply_cache
 from .models import ChatLog
 
 
@@ -6,4 +11,36 @@ from .models import ChatLog
 class ChatLogAdmin(admin.ModelAdmin):
     list_display = ("id", "patient_hash", "created_at")
     readonly_fields = ("created_at",)
-    search_fields = ("patient_hash", "message")
\ No newline at end of file
+    search_fields = ("patient_hash", "message")
+    # adds a "Purge reply cache" button next to "Add chat log"
+    change_list_template = "admin/chatbot/chatlog/change_list.html"
+
+    def get_urls(self):
+        return [
+            path(
+                "purge-reply-cache/",
+                self.admin_site.admin_view(self.purge_reply_cache_view),
+                name="chatbot_chatlog_purge_reply_cache",
+            ),
+        ] + super().get_urls()
+
+    def changelist_view(self, request, extra_context=None):
+        extra_context = {"can_purge_reply_cache": self.has_delete_permission(request), **(extra_context or {})}
+        return super().changelist_view(request, extra_context)
+
+    def purge_reply_cache_view(self, request):
+        """Purge the chat reply cache in all workers; POST from the change list button."""
+        if request.method != "POST":
+            return HttpResponseNotAllowed(["POST"])
+        if not self.has_delete_permission(request):
+            raise PermissionDenied
+        stats = reply_cache.stats()
+        reply_cache.purge()
+        ratio = f"{stats['hit_ratio']:.0%}" if stats["hit_ratio"] is not None else "n/a"
+        self.message_user(
+            request,
+            f"Purged the chat reply cache in all workers. So far: {stats['hits']} hits, "
+            f"{stats['misses']} misses (hit ratio {ratio}), {stats['saved_ms'] / 1000:.1f} s of model time saved.",
+            messages.SUCCESS,
+        )
+        return HttpResponseRedirect(reverse("admin:chatbot_chatlog_changelist"))
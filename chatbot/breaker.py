@@ -0,0 +1,146 @@
+"""
+Circuit breaker and adaptive timeouts for the model API.
+
+State lives in the Django cache so every worker sharing the cache sees the
+same circuit:
+
+- closed: calls go through. FAILURE_THRESHOLD consecutive failures open it.
+- open: calls are refused straight away (allow() is False) so the chat views
+  fall back to the local generator instead of waiting on a dead upstream.
+  After RESET_TIMEOUT seconds the circuit turns half-open.
+- half-open: one worker at a time gets a trial call. A success closes the
+  circuit; a failure opens it again for another RESET_TIMEOUT.
+
+The read timeout follows the upstream: TIMEOUT_FACTOR times the p95 of the
+last LATENCY_SAMPLES successful calls, clamped between MIN_TIMEOUT and the
+client's READ_TIMEOUT, which is also used until enough samples exist.
+Counters use cache.incr, atomic on shared backends; the sample list is
+read-modify-write, which at worst loses a sample.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import http_client
+
+logger = logging.getLogger("chatbot")
+
+FAILURE_THRESHOLD = getattr(settings, "CHATBOT_BREAKER_FAILURES", 5)  # consecutive failures that open the circuit
+RESET_TIMEOUT = getattr(settings, "CHATBOT_BREAKER_RESET", 30)  # seconds open before a trial call
+LATENCY_SAMPLES = getattr(settings, "CHATBOT_BREAKER_SAMPLES", 50)
+MIN_SAMPLES = 10  # below this the timeout stays at READ_TIMEOUT
+TIMEOUT_FACTOR = getattr(settings, "CHATBOT_BREAKER_TIMEOUT_FACTOR", 2.0)
+MIN_TIMEOUT = getattr(settings, "CHATBOT_BREAKER_MIN_TIMEOUT", 2.0)  # seconds
+
+_PREFIX = "chatbot:breaker"
+_STATE = f"{_PREFIX}:state"  # {"state": "open", "opened_at": ts} while not closed
+_FAILURES = f"{_PREFIX}:failures"
+_TRIPS = f"{_PREFIX}:trips"
+_PROBE = f"{_PREFIX}:probe"
+_LATENCY = f"{_PREFIX}:latency"
+
+
+class CircuitOpen(Exception):
+    """The model API is considered down; use the fallback."""
+
+
+def _incr(key):
+    try:
+        return cache.incr(key)
+    except ValueError:  # missing key
+        cache.add(key, 0, None)
+        return cache.incr(key)
+
+
+def state(now=None):
+    """'closed', 'open' or 'half-open'."""
+    data = cache.get(_STATE)
+    if not data:
+        return "closed"
+    if (now or time.time()) - data["opened_at"] >= RESET_TIMEOUT:
+        return "half-open"
+    return "open"
+
+
+def allow():
+    """Whether a call may go out now; in half-open only one caller wins the trial."""
+    current = state()
+    if current == "closed":
+        return True
+    if current == "half-open":
+        # the probe key expires in case its holder dies before reporting back
+        return cache.add(_PROBE, 1, http_client.CONNECT_TIMEOUT + http_client.READ_TIMEOUT)
+    return False
+
+
+def _open(reason):
+    cache.set(_STATE, {"state": "open", "opened_at": time.time()}, None)
+    cache.delete(_PROBE)
+    trips = _incr(_TRIPS)
+    logger.warning("Model API circuit opened (%s); trip %s", reason, trips)
+
+
+def record_success(seconds=None):
+    """A call succeeded; `seconds` is its latency, left out of the samples when None."""
+    if cache.get(_STATE):
+        cache.delete_many([_STATE, _PROBE])
+        logger.info("Model API circuit closed")
+    cache.set(_FAILURES, 0, None)
+    if seconds is None:
+        return
+    samples = (cache.get(_LATENCY) or [])[-(LATENCY_SAMPLES - 1):]
+    samples.append(round(seconds, 4))
+    cache.set(_LATENCY, samples, None)
+
+
+def record_failure():
+    if state() == "half-open":
+        _open("trial call failed")
+        return
+    failures = _incr(_FAILURES)
+    if failures >= FAILURE_THRESHOLD and not cache.get(_STATE):
+        _open(f"{failures} consecutive failures")
+
+
+def p95(samples=None):
+    if samples is None:
+        samples = cache.get(_LATENCY) or []
+    samples = sorted(samples)
+    if not samples:
+        return None
+    return samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+
+
+def read_timeout():
+    """Seconds to wait for an answer: TIMEOUT_FACTOR x p95, within [MIN_TIMEOUT, READ_TIMEOUT]."""
+    samples = cache.get(_LATENCY) or []
+    if len(samples) < MIN_SAMPLES:
+        return http_client.READ_TIMEOUT
+    return min(http_client.READ_TIMEOUT, max(MIN_TIMEOUT, p95(samples) * TIMEOUT_FACTOR))
+
+
+def timeout():
+    """(connect, read) timeout for the next call."""
+    return http_client.CONNECT_TIMEOUT, read_timeout()
+
+
+def status():
+    """Breaker state for health checks."""
+    data = cache.get(_STATE) or {}
+    samples = cache.get(_LATENCY) or []
+    latency = p95(samples)
+    return {
+        "state": state(),
+        "opened_at": int(data["opened_at"]) if data else None,
+        "consecutive_failures": cache.get(_FAILURES) or 0,
+        "trips": cache.get(_TRIPS) or 0,
+        "p95_ms": round(latency * 1000, 1) if latency is not None else None,
+        "read_timeout": round(read_timeout(), 2),
+        "samples": len(samples),
+    }
+
+
+def reset():
+    cache.delete_many([_STATE, _FAILURES, _TRIPS, _PROBE, _LATENCY])
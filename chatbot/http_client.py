@@ -0,0 +1,194 @@
+"""
+Pooled keep-alive HTTP client for the chat model API.
+
+A plain requests.post() opens a new connection (TCP and TLS handshake) for
+every call. post() here goes through one module-level Session per process
+whose adapter keeps up to POOL_SIZE connections per host open between chat
+messages. Connect and read timeouts are separate, so an unreachable endpoint
+fails fast while a slow model still gets READ_TIMEOUT to answer. Servers
+drop idle keep-alive connections eventually; after KEEPALIVE_IDLE seconds
+without a request the pool is discarded and reconnected rather than reused.
+The session is rebuilt after a fork so workers never share sockets.
+
+apost() is the asyncio counterpart for async views: an httpx.AsyncClient per
+event loop with the same timeouts and keep-alive expiry. An event loop
+holds many chats in flight at once, so it may open up to ASYNC_CONNECTIONS
+connections and keeps POOL_SIZE of them alive.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+logger = logging.getLogger("chatbot")
+
+POOL_SIZE = getattr(settings, "CHATBOT_HTTP_POOL_SIZE", 10)  # connections kept per host
+CONNECT_TIMEOUT = getattr(settings, "CHATBOT_HTTP_CONNECT_TIMEOUT", 3.05)  # seconds
+READ_TIMEOUT = getattr(settings, "CHATBOT_HTTP_READ_TIMEOUT", 10)  # seconds
+KEEPALIVE_IDLE = getattr(settings, "CHATBOT_HTTP_KEEPALIVE", 60)  # seconds an idle pool is kept
+ASYNC_CONNECTIONS = getattr(settings, "CHATBOT_HTTP_ASYNC_CONNECTIONS", 200)  # concurrent upstream calls per event loop
+
+_lock = threading.Lock()
+_session: Optional[requests.Session] = None
+_pid = None
+_last_used = 0.0
+_counters = {"requests": 0, "async_requests": 0, "errors": 0, "idle_resets": 0, "total_ms": 0.0}
+_retired_connections = 0  # connections opened by pools discarded since
+_async_clients = {}  # event loop -> httpx.AsyncClient
+
+
+def _new_session() -> requests.Session:
+    session = requests.Session()
+    # retries are handled by the caller (see chatbot.views.call_gemini_api)
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE, max_retries=0, pool_block=False)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["Connection"] = "keep-alive"
+    return session
+
+
+def _pools(session: requests.Session):
+    for adapter in session.adapters.values():
+        manager = adapter.poolmanager
+        for key in list(manager.pools.keys()):
+            pool = manager.pools.get(key)
+            if pool is not None:
+                yield pool
+
+
+def _opened(session: Optional[requests.Session]) -> int:
+    if session is None:
+        return 0
+    # the http and https prefixes share one adapter
+    return sum(pool.num_connections for pool in {id(p): p for p in _pools(session)}.values())
+
+
+def _retire(session: Optional[requests.Session]):
+    global _retired_connections
+    if session is not None:
+        _retired_connections += _opened(session)
+        session.close()
+
+
+def get_session() -> requests.Session:
+    """This process's pooled session, created on first use."""
+    global _session, _pid, _last_used
+    now = time.monotonic()
+    with _lock:
+        if _session is None or _pid != os.getpid():
+            # after a fork the inherited sockets belong to the parent
+            _session, _pid = _new_session(), os.getpid()
+        elif KEEPALIVE_IDLE and _last_used and now - _last_used > KEEPALIVE_IDLE:
+            _retire(_session)
+            _session = _new_session()
+            _counters["idle_resets"] += 1
+        _last_used = now
+        return _session
+
+
+def post(url: str, timeout=None, **kwargs) -> requests.Response:
+    """requests.post() through the pool; `timeout` defaults to (CONNECT_TIMEOUT, READ_TIMEOUT)."""
+    session = get_session()
+    started = time.perf_counter()
+    try:
+        return session.post(url, timeout=timeout or (CONNECT_TIMEOUT, READ_TIMEOUT), **kwargs)
+    except requests.RequestException:
+        with _lock:
+            _counters["errors"] += 1
+        raise
+    finally:
+        with _lock:
+            _counters["requests"] += 1
+            _counters["total_ms"] += (time.perf_counter() - started) * 1000
+
+
+def _new_async_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=ASYNC_CONNECTIONS, max_keepalive_connections=POOL_SIZE, keepalive_expiry=KEEPALIVE_IDLE,
+        ),
+        timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+    )
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """The pooled async client of the running event loop, created on first use."""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        for other in [l for l in _async_clients if l.is_closed()]:
+            # its connections went with the loop
+            del _async_clients[other]
+        client = _async_clients.get(loop)
+        if client is None:
+            client = _async_clients[loop] = _new_async_client()
+        return client
+
+
+async def apost(url: str, timeout=None, **kwargs) -> httpx.Response:
+    """post() for async code; `timeout` is seconds or (connect, read), default (CONNECT_TIMEOUT, READ_TIMEOUT)."""
+    client = get_async_client()
+    started = time.perf_counter()
+    try:
+        if timeout is not None:
+            connect, read = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+            kwargs["timeout"] = httpx.Timeout(read, connect=connect)
+        return await client.post(url, **kwargs)
+    except httpx.HTTPError:
+        with _lock:
+            _counters["errors"] += 1
+        raise
+    finally:
+        with _lock:
+            _counters["async_requests"] += 1
+            _counters["total_ms"] += (time.perf_counter() - started) * 1000
+
+
+async def aclose():
+    """Close the running event loop's async client."""
+    with _lock:
+        client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def close():
+    """Close pooled connections; the next post() reconnects."""
+    global _session
+    with _lock:
+        _retire(_session)
+        _session = None
+
+
+def stats() -> dict:
+    """
+    Pool counters for this process: requests, connections opened and reused,
+    errors, mean latency. Connection counts cover the sync session only.
+    """
+    with _lock:
+        counters = dict(_counters)
+        opened = _retired_connections + _opened(_session)
+        pools = len({id(p) for p in _pools(_session)}) if _session is not None else 0
+        async_clients = len(_async_clients)
+    total = counters["requests"] + counters["async_requests"]
+    return {
+        "requests": counters["requests"],
+        "async_requests": counters["async_requests"],
+        "async_clients": async_clients,
+        "connections_opened": opened,
+        "connections_reused": max(0, counters["requests"] - opened),
+        "errors": counters["errors"],
+        "idle_resets": counters["idle_resets"],
+        "pools": pools,
+        "pool_size": POOL_SIZE,
+        "connect_timeout": CONNECT_TIMEOUT,
+        "read_timeout": READ_TIMEOUT,
+        "keepalive_idle": KEEPALIVE_IDLE,
+        "mean_ms": round(counters["total_ms"] / total, 2) if total else None,
+    }
@@ -0,0 +1,55 @@
+import json
+import statistics
+import time as timer
+
+import requests
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from chatbot import http_client
+from chatbot.stand_in import StandIn
+from chatbot.views import call_gemini_api, parse_gemini_response
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare per-message latency of the chat model call with a fresh connection per request "
+        "(plain requests.post) and through the pooled keep-alive client, against a local stand-in server."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--messages", type=int, default=200, help="Messages per mode (default 200).")
+        parser.add_argument("--server-ms", type=float, default=0, help="Simulated model latency in ms (default 0).")
+
+    def handle(self, *args, **options):
+        server = StandIn(options["server_ms"] / 1000).start()
+        url = server.url
+        payload = {"model": "stand-in", "input": "How do I book?", "context": ""}
+
+        def unpooled():
+            resp = requests.post(url, headers={"Content-Type": "application/json"}, json=payload, timeout=10)
+            resp.raise_for_status()
+            return parse_gemini_response(resp.json())
+
+        try:
+            with override_settings(GEMINI_URL=url, GEMINI_API_KEY=""):
+                http_client.close()
+                for label, send in (("fresh connection", unpooled), ("pooled", lambda: call_gemini_api("How do I book?"))):
+                    server.reset()
+                    send()  # warm-up: imports and, when pooled, the first connection
+                    timings = []
+                    for _ in range(options["messages"]):
+                        started = timer.perf_counter()
+                        send()
+                        timings.append((timer.perf_counter() - started) * 1000)
+                    timings.sort()
+                    self.stdout.write(
+                        f"{label:17} p50 {statistics.median(timings):7.2f} ms  "
+                        f"p95 {timings[int(len(timings) * 0.95) - 1]:7.2f} ms  "
+                        f"mean {statistics.mean(timings):7.2f} ms  "
+                        f"server saw {server.connections} connection(s)"
+                    )
+                self.stdout.write(f"Pool stats: {json.dumps(http_client.stats())}")
+        finally:
+            http_client.close()
+            server.stop()
@@ -0,0 +1,163 @@
+import asyncio
+import importlib.util
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time as timer
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from chatbot.stand_in import StandIn
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _proc_status(pid):
+    """(threads, RSS in MB) of a process from /proc; (None, None) where unavailable."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            fields = dict(line.split(":", 1) for line in f)
+        return int(fields["Threads"]), int(fields["VmRSS"].split()[0]) / 1024
+    except (OSError, KeyError, ValueError):
+        return None, None
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test the sync chat view against the async one, both served by a single uvicorn (ASGI) "
+        "worker process, with a local stand-in for the model API that answers after --upstream-ms. "
+        "Reports throughput, tail latency, upstream calls in flight and the worker's threads and memory."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=300, help="Chat messages per view (default 300).")
+        parser.add_argument("--concurrency", type=int, default=100, help="Clients sending at once (default 100).")
+        parser.add_argument("--upstream-ms", type=float, default=500, help="Stand-in model latency in ms (default 500).")
+        parser.add_argument("--views", nargs="*", default=["chat", "chat_async"], help="Views to test (default both).")
+        parser.add_argument("--app", default="AppointmentBooking.asgi:application", help="ASGI application to serve.")
+        parser.add_argument("--json", action="store_true", help="Print the results as JSON.")
+
+    def handle(self, *args, **options):
+        try:
+            import httpx
+        except ImportError as e:
+            raise CommandError(f"The load test needs httpx and uvicorn: {e}")
+        # uvicorn runs below as a separate process, so only check it is installed
+        if importlib.util.find_spec("uvicorn") is None:
+            raise CommandError("The load test needs httpx and uvicorn: No module named 'uvicorn'")
+
+        upstream = StandIn(options["upstream_ms"] / 1000).start()
+        port = _free_port()
+        env = {
+            **os.environ,
+            "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", settings.SETTINGS_MODULE),
+            "USE_GEMINI": "true", "GEMINI_URL": upstream.url, "GEMINI_API_KEY": "",
+        }
+        worker = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", options["app"], "--host", "127.0.0.1", "--port", str(port),
+             "--workers", "1", "--timeout-keep-alive", "60", "--log-level", "warning", "--no-access-log"],
+            env=env, cwd=settings.BASE_DIR, stderr=subprocess.DEVNULL,
+        )
+        results = {}
+        try:
+            self._wait_for(port, worker)
+            for name in options["views"]:
+                url = f"http://127.0.0.1:{port}{reverse(f'chatbot:{name}')}"
+                upstream.reset()
+                results[name] = asyncio.run(
+                    self._run(httpx, url, name, worker.pid, options["requests"], options["concurrency"])
+                )
+                results[name]["upstream_peak_in_flight"] = upstream.peak_in_flight
+        finally:
+            worker.terminate()
+            worker.wait(timeout=10)
+            upstream.stop()
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results))
+            return
+        for name, r in results.items():
+            self.stdout.write(
+                f"{name:11} {r['ok']}/{r['requests']} ok in {r['seconds']:6.2f} s ({r['per_second']:6.1f}/s)  "
+                f"p50 {r['p50_ms']:7.0f}  p95 {r['p95_ms']:7.0f}  p99 {r['p99_ms']:7.0f}  max {r['max_ms']:7.0f} ms  "
+                f"upstream in flight <= {r['upstream_peak_in_flight']:3}  "
+                f"worker threads <= {r['peak_threads']}  RSS <= {r['peak_rss_mb']} MB"
+            )
+
+    @staticmethod
+    def _wait_for(port, worker, timeout=30):
+        deadline = timer.monotonic() + timeout
+        while timer.monotonic() < deadline:
+            if worker.poll() is not None:
+                raise CommandError("uvicorn exited during startup")
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+                return
+            except OSError:
+                timer.sleep(0.1)
+        raise CommandError("uvicorn did not start listening")
+
+    @staticmethod
+    async def _run(httpx, url, label, pid, total, concurrency):
+        gate = asyncio.Semaphore(concurrency)
+        timings, statuses = [], []
+        peaks = {"threads": 0, "rss": 0.0}
+
+        async def send(client, n):
+            async with gate:
+                started = timer.perf_counter()
+                try:
+                    resp = await client.post(
+                        # a different question each time: repeats would be answered from the reply cache
+                        url, json={"message": f"Can I book an appointment? ({label} run, message {n})", "consent": True},
+                        # one address per message keeps the per-IP rate limit out of the measurement
+                        headers={"X-Forwarded-For": f"10.{n >> 16 & 255}.{n >> 8 & 255}.{n & 255}"},
+                    )
+                    statuses.append(resp.status_code)
+                except httpx.HTTPError as e:
+                    statuses.append(type(e).__name__)
+                timings.append((timer.perf_counter() - started) * 1000)
+
+        async def sample():
+            while True:
+                threads, rss = _proc_status(pid)
+                if threads is not None:
+                    peaks["threads"] = max(peaks["threads"], threads)
+                    peaks["rss"] = max(peaks["rss"], rss)
+                await asyncio.sleep(0.02)
+
+        sampler = asyncio.ensure_future(sample())
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(limits=limits, timeout=300) as client:
+            started = timer.perf_counter()
+            await asyncio.gather(*(send(client, n) for n in range(total)))
+            seconds = timer.perf_counter() - started
+        sampler.cancel()
+        timings.sort()
+
+        def pct(p):
+            return round(timings[min(len(timings) - 1, int(len(timings) * p))], 1)
+
+        return {
+            "requests": total,
+            "concurrency": concurrency,
+            "ok": statuses.count(200),
+            "errors": {str(s): statuses.count(s) for s in set(statuses) if s != 200},
+            "seconds": round(seconds, 2),
+            "per_second": round(total / seconds, 1),
+            "p50_ms": round(statistics.median(timings), 1),
+            "p95_ms": pct(0.95),
+            "p99_ms": pct(0.99),
+            "max_ms": round(timings[-1], 1),
+            "peak_threads": peaks["threads"] or None,
+            "peak_rss_mb": round(peaks["rss"], 1) or None,
+        }
@@ -0,0 +1,86 @@
+"""
+PHI redaction shared by the chat views and the reply cache.
+
+Obvious direct identifiers (emails, phone numbers, labelled national ids and
+long number runs) are replaced by [REDACTED_*] markers before a message is
+logged, sent to the model API or used as a cache key, and before a reply is
+shown.
+"""
+import re
+
+# Basic PHI redaction to avoid sending direct identifiers to third-party APIs.
+_EMAIL_RE = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
+_PHONE_RE = re.compile(r"(?<!\d)(?:\+?\d{1,3}[-.\s]?)?(?:\(?\d{2,4}\)?[-.\s]?)?\d{3,4}[-.\s]?\d{3,4}(?!\d)")
+_NATIONAL_ID_RE = re.compile(r"\b(?:ssn|ssnn|id|passport|nric)[:\s]*\d{3,11}\b", re.IGNORECASE)
+_NUMBER_SEQ_RE = re.compile(r"\b\d{6,}\b")  # long numeric sequences
+
+
+def redact_phi(text: str) -> str:
+    """
+    Redact obvious PHI-like tokens: emails, phone numbers, labelled national ids,
+    and long number sequences. Returns a redacted copy; leaves original unchanged.
+    """
+    if not text:
+        return text
+    t = _EMAIL_RE.sub("[REDACTED_EMAIL]", text)
+    t = _PHONE_RE.sub("[REDACTED_PHONE]", t)
+    t = _NATIONAL_ID_RE.sub("[REDACTED_ID]", t)
+    t = _NUMBER_SEQ_RE.sub("[REDACTED_NUMBER]", t)
+    return t
+
+
+class StreamRedactor:
+    """
+    redact_phi() and a length cut at `limit` for text that arrives in pieces.
+    feed() returns what can be released safely: text is held back until it is
+    HOLD characters behind the newest input and not part of a possible match,
+    so an email or phone number split across chunks is still caught.
+    finish() releases the rest.
+    """
+    # longer than any phone number or labelled id (the patterns that may contain
+    # whitespace); emails and number runs cannot be split at whitespace anyway
+    HOLD = 32
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.pending = ""
+        self.sent = 0
+        self.truncated = False
+
+    def _spans(self):
+        for pattern in (_EMAIL_RE, _PHONE_RE, _NATIONAL_ID_RE, _NUMBER_SEQ_RE):
+            for m in pattern.finditer(self.pending):
+                yield m.span()
+
+    def _release(self, text: str) -> str:
+        text = redact_phi(text)
+        if self.sent + len(text) > self.limit:
+            text = text[: max(0, self.limit - self.sent - 3)] + "..."
+            self.truncated = True
+        self.sent += len(text)
+        return text
+
+    def feed(self, chunk: str) -> str:
+        if self.truncated:
+            return ""
+        self.pending += chunk
+        end = len(self.pending) - self.HOLD
+        if end <= 0:
+            return ""
+        spans = list(self._spans())
+        cut = end
+        # back off to whitespace outside every match
+        while cut > 0 and (not self.pending[cut - 1].isspace() or any(a < cut < b for a, b in spans)):
+            cut -= 1
+        if cut == 0:
+            if len(self.pending) < 4 * self.HOLD:
+                return ""
+            cut = end  # one long run without whitespace; release it anyway
+        text, self.pending = self.pending[:cut], self.pending[cut:]
+        return self._release(text)
+
+    def finish(self) -> str:
+        if self.truncated or not self.pending:
+            return ""
+        text, self.pending = self.pending, ""
+        return self._release(text)
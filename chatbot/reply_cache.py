@@ -0,0 +1,173 @@
+"""
+Reply cache for repeated chat questions.
+
+Many chat messages are the same question worded alike ("How do I book an
+appointment?"). A model API reply to one is kept for TTL seconds and served
+to the next one with the same key, without an upstream call:
+
+- the key is a SHA-256 of the model name and the normalized redacted message
+  and context (case folded, punctuation dropped, whitespace collapsed), so no
+  message text is held in the cache;
+- nothing is cached when the message or context had anything redacted, when
+  the reply itself looks like PHI to redact_phi(), when the normalized message
+  is longer than MAX_MESSAGE (long messages are personal and do not repeat),
+  or when the reply is over MAX_ENTRY_BYTES;
+- each process keeps at most MAX_ENTRIES replies and drops the least recently
+  used one first.
+
+Entries live in process memory; the hit counters and a purge generation live
+in the Django cache so stats cover every worker and purge() reaches all of
+them: a worker that sees a newer generation drops its entries on next use.
+"""
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .redaction import redact_phi
+
+logger = logging.getLogger("chatbot")
+
+TTL = getattr(settings, "CHATBOT_REPLY_CACHE_TTL", 3600)  # seconds; 0 turns the cache off
+MAX_ENTRIES = getattr(settings, "CHATBOT_REPLY_CACHE_MAX_ENTRIES", 500)  # per process
+MAX_ENTRY_BYTES = getattr(settings, "CHATBOT_REPLY_CACHE_MAX_ENTRY_BYTES", 4096)  # UTF-8 size of one reply
+MAX_MESSAGE = getattr(settings, "CHATBOT_REPLY_CACHE_MAX_MESSAGE", 200)  # normalized characters
+
+_PREFIX = "chatbot:reply_cache"
+_GENERATION = f"{_PREFIX}:generation"
+_COUNTERS = ("hits", "misses", "stores", "skipped", "saved_ms")
+
+_lock = threading.Lock()
+_entries = OrderedDict()  # key -> (reply, expires_at, upstream seconds), least recently used first
+_generation = 0
+_evictions = 0
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s]+")
+
+
+def normalize(text: Optional[str]) -> str:
+    """Case folded, punctuation dropped, whitespace collapsed."""
+    return " ".join(_PUNCTUATION_RE.sub(" ", (text or "").casefold()).split())
+
+
+def _has_phi(text: Optional[str]) -> bool:
+    return bool(text) and ("[REDACTED_" in text or redact_phi(text) != text)
+
+
+def key(message: str, context: Optional[str] = None) -> Optional[str]:
+    """Cache key of a redacted message and its context; None when it must not be cached."""
+    if not TTL or _has_phi(message) or _has_phi(context):
+        return None
+    normalized = normalize(message)
+    if not normalized or len(normalized) > MAX_MESSAGE:
+        return None
+    model = getattr(settings, "GEMINI_MODEL", "")
+    return hashlib.sha256(f"{model}\n{normalized}\n{normalize(context)}".encode("utf-8")).hexdigest()
+
+
+def _incr(name: str, delta: int = 1):
+    counter = f"{_PREFIX}:{name}"
+    try:
+        cache.incr(counter, delta)
+    except ValueError:  # missing key
+        cache.add(counter, 0, None)
+        cache.incr(counter, delta)
+
+
+def _sync_generation():
+    """Drop this process's entries if a purge happened elsewhere; call with _lock held."""
+    global _generation
+    current = cache.get(_GENERATION) or 0
+    if current != _generation:
+        _entries.clear()
+        _generation = current
+
+
+def get(message: str, context: Optional[str] = None) -> Optional[str]:
+    """The cached reply to a redacted message, or None; counts hits, misses and the latency saved."""
+    k = key(message, context)
+    if k is None:
+        if TTL:
+            _incr("skipped")
+        return None
+    now = time.monotonic()
+    with _lock:
+        _sync_generation()
+        entry = _entries.get(k)
+        if entry is not None and entry[1] <= now:
+            del _entries[k]
+            entry = None
+        if entry is not None:
+            _entries.move_to_end(k)
+    if entry is None:
+        _incr("misses")
+        return None
+    _incr("hits")
+    _incr("saved_ms", int(entry[2] * 1000))
+    return entry[0]
+
+
+def put(message: str, context: Optional[str], reply: str, seconds: float) -> bool:
+    """Cache the upstream reply to a redacted message, which took `seconds`; False when not cacheable."""
+    global _evictions
+    k = key(message, context)
+    if k is None or not reply or len(reply.encode("utf-8")) > MAX_ENTRY_BYTES or _has_phi(reply):
+        return False
+    with _lock:
+        _sync_generation()
+        _entries[k] = (reply, time.monotonic() + TTL, seconds)
+        _entries.move_to_end(k)
+        while len(_entries) > MAX_ENTRIES:
+            _entries.popitem(last=False)
+            _evictions += 1
+    _incr("stores")
+    return True
+
+
+def purge() -> int:
+    """Drop every cached reply, in all workers; returns the number dropped in this one."""
+    global _generation
+    with _lock:
+        dropped = len(_entries)
+        _entries.clear()
+        cache.add(_GENERATION, 0, None)
+        _generation = cache.incr(_GENERATION)
+    logger.info("Chat reply cache purged (%s entries in this process)", dropped)
+    return dropped
+
+
+def stats() -> dict:
+    """Hit ratio and latency saved across workers; entries and evictions of this process."""
+    counters = cache.get_many([f"{_PREFIX}:{name}" for name in _COUNTERS])
+    hits, misses, stores, skipped, saved_ms = (counters.get(f"{_PREFIX}:{name}", 0) for name in _COUNTERS)
+    with _lock:
+        entries = len(_entries)
+    lookups = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / lookups, 3) if lookups else None,
+        "saved_ms": saved_ms,
+        "mean_saved_ms": round(saved_ms / hits, 1) if hits else None,
+        "stores": stores,
+        "skipped": skipped,
+        "entries": entries,
+        "evictions": _evictions,
+        "max_entries": MAX_ENTRIES,
+        "ttl": TTL,
+        "generation": cache.get(_GENERATION) or 0,
+    }
+
+
+def reset():
+    """Drop entries and counters."""
+    global _evictions
+    purge()
+    cache.delete_many([f"{_PREFIX}:{name}" for name in _COUNTERS])
+    _evictions = 0
@@ -0,0 +1,112 @@
+"""
+Local stand-in for the model API, used by the chat benchmark commands.
+
+A minimal HTTP/1.1 keep-alive server on asyncio, run in a daemon thread:
+every POST is answered like the model API would, after `delay` seconds, or
+with "stream": true in the payload word by word as server-sent events
+spread over `delay`.
+Being event-driven it holds hundreds of slow calls open at once without a
+thread per connection, so it is not the bottleneck of a load test. It
+counts connections and the most requests in flight at once.
+"""
+import asyncio
+import json
+import threading
+
+REPLY = {"candidates": [{"content": "You can book an appointment on the booking page."}]}
+
+
+class StandIn:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.port = None
+        self.connections = 0
+        self.requests = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._writers = set()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}/v1/generate"
+
+    def start(self):
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def stop(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+
+    def reset(self):
+        self.connections = self.requests = self.peak_in_flight = 0
+
+    def _serve(self):
+        asyncio.set_event_loop(self._loop)
+        server = self._loop.run_until_complete(asyncio.start_server(self._handle, "127.0.0.1", 0, backlog=1024))
+        self.port = server.sockets[0].getsockname()[1]
+        self._ready.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            server.close()
+            # let handlers of connections still open see them close
+            for writer in self._writers:
+                writer.close()
+            tasks = asyncio.all_tasks(self._loop)
+            if tasks:
+                self._loop.run_until_complete(asyncio.wait(tasks, timeout=self.delay + 1))
+            self._loop.run_until_complete(server.wait_closed())
+            self._loop.close()
+
+    async def _stream(self, writer):
+        """Send REPLY word by word as server-sent events, spread over `delay`."""
+        words = REPLY["candidates"][0]["content"].split(" ")
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nTransfer-Encoding: chunked\r\n\r\n")
+        for n, word in enumerate(words):
+            if self.delay:
+                await asyncio.sleep(self.delay / len(words))
+            text = word if n == len(words) - 1 else word + " "
+            event = f"data: {json.dumps({'candidates': [{'content': {'parts': [{'text': text}]}}]})}\n\n".encode()
+            writer.write(f"{len(event):x}\r\n".encode() + event + b"\r\n")
+            await writer.drain()
+        writer.write(b"0\r\n\r\n")
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        self._writers.add(writer)
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n")[1:]:
+                    name, _, value = line.partition(b":")
+                    if name.strip().lower() == b"content-length":
+                        length = int(value)
+                payload = json.loads(await reader.readexactly(length) or b"{}")
+                self.requests += 1
+                self.in_flight += 1
+                self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+                try:
+                    if payload.get("stream"):
+                        await self._stream(writer)
+                    else:
+                        if self.delay:
+                            await asyncio.sleep(self.delay)
+                        body = json.dumps(REPLY).encode()
+                        writer.write(
+                            b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                            + f"Content-Length: {len(body)}\r\n\r\n".encode() + body
+                        )
+                finally:
+                    self.in_flight -= 1
+                await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError, ValueError):
+            pass  # client closed the connection, or sent something we do not speak
+        finally:
+            self._writers.discard(writer)
+            writer.close()
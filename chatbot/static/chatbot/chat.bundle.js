@@ -49,8 +49,85 @@
       d.innerText = text;
       body.appendChild(d);
       body.scrollTop = body.scrollHeight;
+      return d;
     }
-  
+
+    function showReply(data) {
+      if (!data) {
+        appendMessage('bot', 'No response from server');
+        return;
+      }
+      if (data.error) {
+        appendMessage('bot', 'Error: ' + (data.message || data.error));
+        return;
+      }
+      appendMessage('bot', data.reply || 'No reply');
+      showActions(data.actions);
+    }
+
+    function showActions(actions) {
+      if (actions && actions.suggest_booking && actions.booking_url) {
+        var link = document.createElement('a');
+        link.href = actions.booking_url;
+        link.innerText = 'Book an appointment';
+        link.className = 'chat-book-link';
+        body.appendChild(link);
+        body.scrollTop = body.scrollHeight;
+      }
+    }
+
+    // Read server-sent events from a fetch() body: "delta" events grow the reply
+    // bubble as they arrive, "done" carries the final reply and actions.
+    function readStream(response) {
+      var reader = response.body.getReader();
+      var decoder = new TextDecoder();
+      var buffer = '';
+      var bubble = appendMessage('bot', '');
+      bubble.classList.add('chat-streaming');
+
+      function handle(block) {
+        var event = 'message', data = '';
+        block.split('\n').forEach(function (line) {
+          if (line.indexOf('event:') === 0) event = line.slice(6).trim();
+          else if (line.indexOf('data:') === 0) data += line.slice(5).trim();
+        });
+        if (!data) return;
+        var payload = JSON.parse(data);
+        if (event === 'delta') {
+          bubble.innerText += payload.text;
+        } else if (event === 'done') {
+          bubble.innerText = payload.reply || bubble.innerText || 'No reply';
+          showActions(payload.actions);
+        } else if (event === 'error') {
+          bubble.innerText = payload.message || 'Error: ' + payload.error;
+        }
+        body.scrollTop = body.scrollHeight;
+      }
+
+      function pump() {
+        return reader.read().then(function (result) {
+          if (result.done) {
+            if (buffer.trim()) handle(buffer);
+            bubble.classList.remove('chat-streaming');
+            if (!bubble.innerText) bubble.innerText = 'No reply';
+            return;
+          }
+          buffer += decoder.decode(result.value, { stream: true });
+          var parts = buffer.split('\n\n');
+          buffer = parts.pop();
+          parts.forEach(handle);
+          return pump();
+        });
+      }
+      return pump().catch(function (err) {
+        bubble.classList.remove('chat-streaming');
+        throw err;
+      });
+    }
+
+    var streamUrl = window.CHAT_STREAM_URL || '/chat/stream/';
+    var canStream = !!(window.TextDecoder && window.ReadableStream);
+
     send.addEventListener('click', function () {
       var msg = input.value.trim();
       if (!msg) return;
@@ -60,35 +137,22 @@
       }
       appendMessage('user', msg);
       input.value = '';
-      fetch('/chat/', {
+      fetch(canStream ? streamUrl : '/chat/', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json', 'X-Requested-With': 'XMLHttpRequest' },
         body: JSON.stringify({ message: msg, consent: true, patient_id: null })
       }).then(function (r) {
-        return r.json();
-      }).then(function (data) {
-        if (!data) {
-          appendMessage('bot', 'No response from server');
-          return;
-        }
-        if (data.error) {
-          appendMessage('bot', 'Error: ' + (data.message || data.error));
-          return;
-        }
-        appendMessage('bot', data.reply || 'No reply');
-        if (data.actions && data.actions.suggest_booking && data.actions.booking_url) {
-          var link = document.createElement('a');
-          link.href = data.actions.booking_url;
-          link.innerText = 'Book an appointment';
-          link.className = 'chat-book-link';
-          body.appendChild(link);
+        // errors (rate limit, consent, ...) come back as JSON even from the stream endpoint
+        if (r.body && (r.headers.get('Content-Type') || '').indexOf('text/event-stream') === 0) {
+          return readStream(r);
         }
+        return r.json().then(showReply);
       }).catch(function (err) {
         appendMessage('bot', 'Network error');
         console.error(err);
       });
     });
-  
+
     input.addEventListener('keyup', function (e) {
       if (e.key === 'Enter') send.click();
     });
@@ -1,3 +1,140 @@
-from django.test import TestCase
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from . import breaker, reply_cache
+from .redaction import StreamRedactor, redact_phi
+
+REPLY_WITH_PHI = (
+    "Thanks! We will write to jane.doe@example.com and call +44 20 7946 0958 to confirm. "
+    "Please bring ID: 12345678 and your card 4111111111111111 to the clinic. "
+) * 3
+
+
+class StreamRedactorTests(TestCase):
+    def _stream(self, text, size, limit=10_000):
+        redactor = StreamRedactor(limit)
+        out = [redactor.feed(text[i:i + size]) for i in range(0, len(text), size)]
+        return "".join(out) + redactor.finish()
+
+    def test_matches_redact_phi_whatever_the_chunking(self):
+        for size in (1, 2, 5, 13, 64, len(REPLY_WITH_PHI)):
+            self.assertEqual(self._stream(REPLY_WITH_PHI, size), redact_phi(REPLY_WITH_PHI), size)
+
+    def test_cuts_at_the_limit(self):
+        streamed = self._stream(REPLY_WITH_PHI, 7, limit=100)
+        self.assertLessEqual(len(streamed), 100)
+        self.assertTrue(streamed.endswith("..."))
+        self.assertTrue(redact_phi(REPLY_WITH_PHI).startswith(streamed[:-3]))
+
+
+class BreakerTests(TestCase):
+    def setUp(self):
+        breaker.reset()
+
+    def test_opens_after_consecutive_failures(self):
+        for _ in range(breaker.FAILURE_THRESHOLD - 1):
+            breaker.record_failure()
+        breaker.record_success(0.1)
+        for _ in range(breaker.FAILURE_THRESHOLD - 1):
+            breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state(), "open")
+        self.assertFalse(breaker.allow())
+
+    def test_half_open_lets_one_trial_call_through(self):
+        for _ in range(breaker.FAILURE_THRESHOLD):
+            breaker.record_failure()
+        later = time.time() + breaker.RESET_TIMEOUT
+        with mock.patch("chatbot.breaker.time.time", return_value=later):
+            self.assertEqual(breaker.state(), "half-open")
+            self.assertTrue(breaker.allow())
+            self.assertFalse(breaker.allow())
+            breaker.record_failure()
+            self.assertEqual(breaker.state(), "open")
+        with mock.patch("chatbot.breaker.time.time", return_value=later + breaker.RESET_TIMEOUT):
+            self.assertTrue(breaker.allow())
+            breaker.record_success(0.1)
+            self.assertEqual(breaker.state(), "closed")
+            self.assertTrue(breaker.allow())
+
+    def test_read_timeout_follows_latency(self):
+        for _ in range(breaker.MIN_SAMPLES):
+            breaker.record_success(2.0)
+        self.assertEqual(breaker.read_timeout(), max(breaker.MIN_TIMEOUT, 2.0 * breaker.TIMEOUT_FACTOR))
+
+
+class ReplyCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        reply_cache.reset()
+
+    def test_same_question_worded_alike_hits(self):
+        self.assertIsNone(reply_cache.get("How do I book an appointment?"))
+        self.assertTrue(reply_cache.put("How do I book an appointment?", None, "Use the booking page.", 0.8))
+        self.assertEqual(reply_cache.get("  how do I BOOK an appointment "), "Use the booking page.")
+        self.assertIsNone(reply_cache.get("How do I book an appointment?", "cardiology"))
+        stats = reply_cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["saved_ms"]), (1, 2, 800))
+
+    def test_nothing_personal_is_cached(self):
+        self.assertIsNone(reply_cache.key("Email me at [REDACTED_EMAIL]"))
+        self.assertIsNone(reply_cache.key("My number is 07700 900123"))
+        self.assertIsNone(reply_cache.key("word " * 100))
+        self.assertFalse(reply_cache.put("Who do I call?", None, "Call Dr Smith on 020 7946 0958.", 0.5))
+        self.assertFalse(reply_cache.put("Tell me everything", None, "x" * (reply_cache.MAX_ENTRY_BYTES + 1), 0.5))
+        self.assertIsNone(reply_cache.get("Who do I call?"))
+
+    def test_least_recently_used_entry_goes_first(self):
+        with mock.patch.object(reply_cache, "MAX_ENTRIES", 2):
+            reply_cache.put("first question", None, "one", 0.1)
+            reply_cache.put("second question", None, "two", 0.1)
+            reply_cache.get("first question")
+            reply_cache.put("third question", None, "three", 0.1)
+        self.assertEqual(reply_cache.get("first question"), "one")
+        self.assertIsNone(reply_cache.get("second question"))
+        self.assertEqual(reply_cache.stats()["evictions"], 1)
+
+    def test_entries_expire(self):
+        reply_cache.put("opening hours", None, "9 to 5.", 0.1)
+        later = time.monotonic() + reply_cache.TTL
+        with mock.patch("chatbot.reply_cache.time.monotonic", return_value=later):
+            self.assertIsNone(reply_cache.get("opening hours"))
+
+    def test_purge_reaches_other_workers(self):
+        reply_cache.put("opening hours", None, "9 to 5.", 0.1)
+        # another worker purging bumps the shared generation
+        cache.incr(reply_cache._GENERATION)
+        self.assertIsNone(reply_cache.get("opening hours"))
+
+
+@override_settings(USE_GEMINI=True, GEMINI_URL="http://model.invalid/", GEMINI_API_KEY="")
+class ChatAsyncTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        reply_cache.reset()
+        breaker.reset()
+
+    async def _post(self, message):
+        return await self.async_client.post(
+            "/chat/async/", {"message": message, "consent": True}, content_type="application/json",
+        )
+
+    async def test_cached_reply_skips_the_model(self):
+        reply_cache.put("What are your opening hours?", None, "9 to 5.", 0.3)
+        with mock.patch("chatbot.http_client.apost") as apost:
+            response = await self._post("what are your opening hours")
+        self.assertEqual(response.json()["reply"], "9 to 5.")
+        apost.assert_not_called()
+
+    async def test_open_circuit_falls_back_without_calling_the_model(self):
+        for _ in range(breaker.FAILURE_THRESHOLD):
+            breaker.record_failure()
+        with mock.patch("chatbot.http_client.apost") as apost:
+            response = await self._post("Can I book an appointment?")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()["reply"])
+        apost.assert_not_called()
@@ -6,6 +6,10 @@ app_name = "chatbot"
 
 urlpatterns = [
     path("ping/", views.ping, name="ping"),
+    path("pool-stats/", views.http_pool_stats, name="http_pool_stats"),
+    path("reply-cache-stats/", views.reply_cache_stats, name="reply_cache_stats"),
     path("", views.chat, name="chat"),        # POST API endpoint
+    path("async/", views.chat_async, name="chat_async"),  # same API, non-blocking under ASGI
+    path("stream/", views.chat_stream, name="chat_stream"),  # same API, reply as server-sent events
     path("page/", views.chat_page, name="page"),  # GET page for full chat UI
 ]
\ No newline at end of file
@@ -1,21 +1,25 @@
+import asyncio
 import os
 import hashlib
 import logging
 import json
 import time
-import re
 from typing import Optional
 from urllib.parse import quote
 
+import httpx
 import requests
+from asgiref.sync import sync_to_async
 from django.core.cache import cache
-from django.http import JsonResponse, HttpResponseBadRequest, HttpResponseForbidden, HttpResponse
+from django.http import JsonResponse, HttpResponseBadRequest, HttpResponseForbidden, HttpResponse, StreamingHttpResponse
 from django.views.decorators.http import require_POST, require_GET
 from django.views.decorators.csrf import csrf_exempt
 from django.conf import settings
 from django.urls import reverse, NoReverseMatch
 from django.shortcuts import render
 
+from . import breaker, http_client, reply_cache
+from .redaction import StreamRedactor, redact_phi
 from .models import ChatLog
 
 logger = logging.getLogger("chatbot")
@@ -41,27 +45,6 @@ def hash_id(value: str) -> str:
     return hashlib.sha256(value.encode("utf-8")).hexdigest()
 
 
-# Basic PHI redaction to avoid sending direct identifiers to third-party APIs.
-_EMAIL_RE = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
-_PHONE_RE = re.compile(r"(?<!\d)(?:\+?\d{1,3}[-.\s]?)?(?:\(?\d{2,4}\)?[-.\s]?)?\d{3,4}[-.\s]?\d{3,4}(?!\d)")
-_NATIONAL_ID_RE = re.compile(r"\b(?:ssn|ssnn|id|passport|nric)[:\s]*\d{3,11}\b", re.IGNORECASE)
-_NUMBER_SEQ_RE = re.compile(r"\b\d{6,}\b")  # long numeric sequences
-
-
-def redact_phi(text: str) -> str:
-    """
-    Redact obvious PHI-like tokens: emails, phone numbers, labelled national ids,
-    and long number sequences. Returns a redacted copy; leaves original unchanged.
-    """
-    if not text:
-        return text
-    t = _EMAIL_RE.sub("[REDACTED_EMAIL]", text)
-    t = _PHONE_RE.sub("[REDACTED_PHONE]", t)
-    t = _NATIONAL_ID_RE.sub("[REDACTED_ID]", t)
-    t = _NUMBER_SEQ_RE.sub("[REDACTED_NUMBER]", t)
-    return t
-
-
 def safe_truncate(s: Optional[str], n: int) -> str:
     if not s:
         return ""
@@ -166,11 +149,11 @@ def parse_gemini_response(j: dict) -> str:
     return json.dumps(j)[:1500]
 
 
-def call_gemini_api(message: str, context: Optional[str] = None) -> str:
-    """
-    Adapter for calling a Gemini API endpoint with small retries and timeouts.
-    Uses Django settings first (recommended). Raises on failure.
-    """
+GEMINI_BACKOFF = (0, 1, 2)  # seconds to wait before each attempt
+
+
+def _gemini_request(message: str, context: Optional[str] = None):
+    """(url, headers, payload) of a Gemini API call, from Django settings first (recommended)."""
     url = getattr(settings, "GEMINI_URL", None) or os.environ.get("GEMINI_URL")
     api_key = getattr(settings, "GEMINI_API_KEY", None) or os.environ.get("GEMINI_API_KEY")
     model = getattr(settings, "GEMINI_MODEL", "gemini-lite") or os.environ.get("GEMINI_MODEL", "gemini-lite")
@@ -190,32 +173,176 @@ def call_gemini_api(message: str, context: Optional[str] = None) -> str:
         "max_output_tokens": 512,
         "temperature": 0.2,
     }
+    return url, headers, payload
+
+
+def call_gemini_api(message: str, context: Optional[str] = None) -> str:
+    """
+    Adapter for calling a Gemini API endpoint with small retries and timeouts.
+    Requests go through the pooled keep-alive client (see chatbot.http_client)
+    and the circuit breaker (see chatbot.breaker): while the circuit is open
+    this raises breaker.CircuitOpen at once, and the read timeout follows the
+    observed latency. Uses Django settings first (recommended). Raises on failure.
+    """
+    url, headers, payload = _gemini_request(message, context)
 
     # Basic retry/backoff strategy for transient network errors
-    backoff = [0, 1, 2]  # seconds
     last_exc = None
-    for attempt, wait in enumerate(backoff):
+    for attempt, wait in enumerate(GEMINI_BACKOFF):
+        if not breaker.allow():
+            if attempt == 0:
+                raise breaker.CircuitOpen("Gemini circuit is open")
+            break
         if attempt > 0:
             time.sleep(wait)
+        started = time.monotonic()
         try:
-            resp = requests.post(url, headers=headers, json=payload, timeout=10)
+            resp = http_client.post(url, headers=headers, json=payload, timeout=breaker.timeout())
             resp.raise_for_status()
             j = resp.json()
-            return parse_gemini_response(j)
+            reply = parse_gemini_response(j)
         except requests.RequestException as e:
+            breaker.record_failure()
             last_exc = e
             logger.warning("Gemini request attempt %s failed: %s", attempt + 1, e)
             continue
         except ValueError as e:
             # invalid JSON
+            breaker.record_failure()
             last_exc = e
             logger.exception("Invalid JSON from Gemini: %s", e)
             raise
+        breaker.record_success(time.monotonic() - started)
+        return reply
 
     # if we reach here, all attempts failed
     raise RuntimeError(f"Gemini API error: {last_exc}")
 
 
+def _breaker_gate() -> Optional[float]:
+    """breaker.allow() and, when it lets the call go out, breaker.timeout(); None when refused."""
+    return breaker.timeout() if breaker.allow() else None
+
+
+async def acall_gemini_api(message: str, context: Optional[str] = None, timeout: Optional[float] = None) -> str:
+    """
+    call_gemini_api() for async views: the same retries and circuit breaker,
+    with asyncio.sleep backoff and the pooled async client, so waiting never
+    blocks a worker. Pass `timeout` when the caller already got the first
+    attempt past the breaker (see _breaker_gate). The breaker's cache calls
+    run on the shared thread pool rather than the one thread-sensitive
+    thread, so concurrent chats do not queue behind each other there.
+    """
+    url, headers, payload = _gemini_request(message, context)
+
+    last_exc = None
+    for attempt, wait in enumerate(GEMINI_BACKOFF):
+        if attempt > 0 or timeout is None:
+            timeout = await sync_to_async(_breaker_gate, thread_sensitive=False)()
+            if timeout is None:
+                if attempt == 0:
+                    raise breaker.CircuitOpen("Gemini circuit is open")
+                break
+        if attempt > 0:
+            await asyncio.sleep(wait)
+        started = time.monotonic()
+        try:
+            resp = await http_client.apost(url, headers=headers, json=payload, timeout=timeout)
+            resp.raise_for_status()
+            reply = parse_gemini_response(resp.json())
+        except httpx.HTTPError as e:
+            await sync_to_async(breaker.record_failure, thread_sensitive=False)()
+            last_exc = e
+            logger.warning("Gemini request attempt %s failed: %s", attempt + 1, e)
+            continue
+        except ValueError as e:
+            await sync_to_async(breaker.record_failure, thread_sensitive=False)()
+            last_exc = e
+            logger.exception("Invalid JSON from Gemini: %s", e)
+            raise
+        await sync_to_async(breaker.record_success, thread_sensitive=False)(time.monotonic() - started)
+        return reply
+
+    raise RuntimeError(f"Gemini API error: {last_exc}")
+
+
+def _delta_text(j) -> str:
+    """Text of one streamed chunk; '' when it carries none (e.g. a final usage record)."""
+    if not isinstance(j, dict):
+        return ""
+    candidates = j.get("candidates")
+    if isinstance(candidates, list) and candidates and isinstance(candidates[0], dict):
+        content = candidates[0].get("content")
+        if isinstance(content, dict) and isinstance(content.get("parts"), list):
+            return "".join(part.get("text", "") for part in content["parts"] if isinstance(part, dict))
+    choices = j.get("choices")
+    if isinstance(choices, list) and choices and isinstance(choices[0], dict):
+        delta = choices[0].get("delta")
+        if isinstance(delta, dict):
+            return delta.get("content") or ""
+    text = parse_gemini_response(j)
+    # parse_gemini_response falls back to dumping the JSON it did not understand
+    return "" if text == json.dumps(j)[:1500] else text
+
+
+def stream_gemini_api(message: str, context: Optional[str] = None):
+    """
+    Yield the reply in pieces as the endpoint streams it (server-sent events
+    or JSON lines). GEMINI_STREAM_URL is used when set, else GEMINI_URL with
+    "stream": true in the payload. Attempts are retried and the circuit
+    breaker consulted as in call_gemini_api, but only until the first piece
+    arrives; a failure after that ends the stream. Returns the whole reply
+    once the stream completed, None when it broke off. Raises when nothing
+    could be read.
+    """
+    url, headers, payload = _gemini_request(message, context)
+    url = getattr(settings, "GEMINI_STREAM_URL", None) or url
+    payload["stream"] = True
+    headers["Accept"] = "text/event-stream"
+
+    last_exc = None
+    for attempt, wait in enumerate(GEMINI_BACKOFF):
+        if not breaker.allow():
+            if attempt == 0:
+                raise breaker.CircuitOpen("Gemini circuit is open")
+            break
+        if attempt > 0:
+            time.sleep(wait)
+        first, received = True, []
+        try:
+            with http_client.post(url, headers=headers, json=payload, timeout=breaker.timeout(), stream=True) as resp:
+                resp.raise_for_status()
+                for line in resp.iter_lines(decode_unicode=True):
+                    line = (line or "").strip()
+                    if line.startswith("data:"):
+                        line = line[5:].strip()
+                    elif line.startswith(("event:", "id:", "retry:", ":")):
+                        continue
+                    if not line or line == "[DONE]":
+                        continue
+                    text = _delta_text(json.loads(line))
+                    if not text:
+                        continue
+                    if first:
+                        # time to first piece is not comparable with whole replies; no latency sample
+                        breaker.record_success()
+                        first = False
+                    received.append(text)
+                    yield text
+            if first:
+                breaker.record_success()
+            return "".join(received)
+        except (requests.RequestException, ValueError) as e:
+            if not first:
+                logger.warning("Gemini stream broke off: %s", e)
+                return None
+            breaker.record_failure()
+            last_exc = e
+            logger.warning("Gemini stream attempt %s failed: %s", attempt + 1, e)
+
+    raise RuntimeError(f"Gemini API error: {last_exc}")
+
+
 def generate_reply_fallback(message: str, context: Optional[str] = None) -> str:
     """
     Robust fallback reply generator.
@@ -299,139 +426,127 @@ def generate_reply_fallback(message: str, context: Optional[str] = None) -> str:
 
 @require_GET
 def ping(request):
-    return JsonResponse({"ok": True, "time": int(time.time())})
+    return JsonResponse({"ok": True, "time": int(time.time()), "gemini_breaker": breaker.status()})
 
 
-@csrf_exempt
-@require_POST
-def chat(request):
+@require_GET
+def http_pool_stats(request):
+    """Connection pool counters of this worker process (staff only)."""
+    if not request.user.is_staff:
+        return HttpResponseForbidden(json.dumps({"error": "staff_only"}), content_type="application/json")
+    return JsonResponse(http_client.stats())
+
+
+@require_GET
+def reply_cache_stats(request):
+    """Reply cache hit ratio and latency saved (staff only)."""
+    if not request.user.is_staff:
+        return HttpResponseForbidden(json.dumps({"error": "staff_only"}), content_type="application/json")
+    return JsonResponse(reply_cache.stats())
+
+
+def _rate_limited_response(client_ip: str) -> JsonResponse:
+    reset_key = f"chatbot:rl:{client_ip}"
+    data = cache.get(reset_key) or {}
+    reset_ts = data.get("reset", int(time.time()) + RATE_LIMIT_WINDOW)
+    retry_after = max(0, reset_ts - int(time.time()))
+    body = {"error": "rate_limited", "message": "Too many requests", "retry_after": retry_after}
+    resp = JsonResponse(body, status=429)
+    resp["X-RateLimit-Remaining"] = "0"
+    resp["Retry-After"] = str(retry_after)
+    return resp
+
+
+def _read_chat_request(request):
     """
-    POST /chat/
-    payload JSON: { "message": "...", "context": "...", "patient_id": "...", "consent": true }
-    response JSON: { "reply": "...", "actions": { "suggest_booking": bool, "booking_url": "...",
-                                                   "suggest_doctors": bool, "doctors_url": "...",
-                                                   "suggest_view_appointments": bool, "appointments_url": "..." } }
+    (fields, None) for a valid chat payload, where fields holds message,
+    context and patient_id; (None, error response) otherwise.
     """
-    client_ip = get_client_ip(request)
-    rl_limited, rl_remaining = is_rate_limited(client_ip)
-    if rl_limited:
-        reset_key = f"chatbot:rl:{client_ip}"
-        data = cache.get(reset_key) or {}
-        reset_ts = data.get("reset", int(time.time()) + RATE_LIMIT_WINDOW)
-        retry_after = max(0, reset_ts - int(time.time()))
-        body = {"error": "rate_limited", "message": "Too many requests", "retry_after": retry_after}
-        resp = JsonResponse(body, status=429)
-        resp["X-RateLimit-Remaining"] = "0"
-        resp["Retry-After"] = str(retry_after)
-        return resp
-
     try:
         data = json.loads(request.body.decode("utf-8"))
     except Exception:
-        return HttpResponseBadRequest(json.dumps({"error": "invalid_json"}), content_type="application/json")
+        return None, HttpResponseBadRequest(json.dumps({"error": "invalid_json"}), content_type="application/json")
 
     message = (data.get("message") or "").strip()
-    context = data.get("context")
-    patient_id = data.get("patient_id", "")
     consent = data.get("consent", False)
 
     if not message:
-        return HttpResponseBadRequest(json.dumps({"error": "message_required"}), content_type="application/json")
+        return None, HttpResponseBadRequest(json.dumps({"error": "message_required"}), content_type="application/json")
     if not consent:
-        return HttpResponseForbidden(json.dumps({"error": "consent_required", "message": "User consent required to process chat"}), content_type="application/json")
+        return None, HttpResponseForbidden(json.dumps({"error": "consent_required", "message": "User consent required to process chat"}), content_type="application/json")
 
     if len(message) > MAX_MESSAGE_LENGTH:
-        return HttpResponse(json.dumps({"error": "message_too_long", "max_length": MAX_MESSAGE_LENGTH}), status=413, content_type="application/json")
+        return None, HttpResponse(json.dumps({"error": "message_too_long", "max_length": MAX_MESSAGE_LENGTH}), status=413, content_type="application/json")
 
-    # Redact PHI from the message before any logging or external API calls
-    redacted_message = redact_phi(message)
-    patient_hash = hash_id(patient_id)
-
-    # minimal structured logging
-    logger.info("chat_request patient_hash=%s ip=%s message_snippet=%s", patient_hash, client_ip, safe_truncate(redacted_message, 200))
+    return {"message": message, "context": data.get("context"), "patient_id": data.get("patient_id", "")}, None
 
-    use_gemini = bool(getattr(settings, "USE_GEMINI", False))
 
-    reply = None
+# Resolve accurate URLs for booking app (prefer namespaced reverses). If the user is anonymous,
+# return a login redirect URL with a next parameter so clients can redirect the user to login first.
+def maybe_wrap_with_login(user, url: str, login_url: str = None) -> str:
+    if user and user.is_authenticated:
+        return url
+    login = login_url or getattr(settings, "LOGIN_URL", "/accounts/login/")
+    # ensure next is a relative path or absolute path returned by reverse
     try:
-        if use_gemini:
-            try:
-                # Send the redacted message to Gemini to avoid sending PHI
-                reply_raw = call_gemini_api(redacted_message, context=context)
-                reply = safe_truncate(reply_raw, MAX_REPLY_LENGTH)
-            except Exception as e:
-                logger.exception("Gemini API error, falling back to local generator: %s", e)
-                reply = generate_reply_fallback(message, context=context)
-        else:
-            reply = generate_reply_fallback(message, context=context)
+        next_path = url
+        # quote the next param
+        return f"{login}?next={quote(next_path)}"
     except Exception:
-        logger.exception("Error generating reply")
-        reply = "Sorry, I couldn't process that right now. Please try again later."
+        return login
+
+
+# Attempt to reverse using the booking namespace first, fall back to plain names or fixed paths.
+def resolve_booking_path() -> str:
+    candidates = [
+        "booking:appointmentBooking",
+        "booking:book_appointment",
+        "booking:startup",
+        "appointmentBooking",
+        "book_appointment",
+        ""
+    ]
+    for name in candidates:
+        if not name:
+            continue
+        try:
+            return reverse(name)
+        except NoReverseMatch:
+            continue
+    # fallback hard path
+    return "/book_appointment/"
+
 
-    # Resolve accurate URLs for booking app (prefer namespaced reverses). If the user is anonymous,
-    # return a login redirect URL with a next parameter so clients can redirect the user to login first.
-    def maybe_wrap_with_login(request, url: str, login_url: str = None) -> str:
-        if request.user and request.user.is_authenticated:
-            return url
-        login = login_url or getattr(settings, "LOGIN_URL", "/accounts/login/")
-        # ensure next is a relative path or absolute path returned by reverse
+def resolve_doctors_path() -> str:
+    candidates = ["booking:list_doctors", "list_doctors", "/doctors/"]
+    for name in candidates:
         try:
-            next_path = url
-            # quote the next param
-            return f"{login}?next={quote(next_path)}"
-        except Exception:
-            return login
-
-    # Attempt to reverse using the booking namespace first, fall back to plain names or fixed paths.
-    def resolve_booking_path(request) -> str:
-        candidates = [
-            "booking:appointmentBooking",
-            "booking:book_appointment",
-            "booking:startup",
-            "appointmentBooking",
-            "book_appointment",
-            ""
-        ]
-        for name in candidates:
-            if not name:
-                continue
-            try:
-                return reverse(name)
-            except NoReverseMatch:
-                continue
-        # fallback hard path
-        return "/book_appointment/"
-
-    def resolve_doctors_path(request) -> str:
-        candidates = ["booking:list_doctors", "list_doctors", "/doctors/"]
-        for name in candidates:
-            try:
-                if name.startswith("/"):
-                    return name
-                return reverse(name)
-            except NoReverseMatch:
-                continue
-        return "/doctors/"
-
-    def resolve_appointments_path(request) -> str:
-        candidates = ["booking:appointment_list", "appointment_list", "/appointments/"]
-        for name in candidates:
-            try:
-                if name.startswith("/"):
-                    return name
-                return reverse(name)
-            except NoReverseMatch:
-                continue
-        return "/appointments/"
+            if name.startswith("/"):
+                return name
+            return reverse(name)
+        except NoReverseMatch:
+            continue
+    return "/doctors/"
 
-    booking_url = resolve_booking_path(request)
-    doctors_url = resolve_doctors_path(request)
-    appointments_url = resolve_appointments_path(request)
 
+def resolve_appointments_path() -> str:
+    candidates = ["booking:appointment_list", "appointment_list", "/appointments/"]
+    for name in candidates:
+        try:
+            if name.startswith("/"):
+                return name
+            return reverse(name)
+        except NoReverseMatch:
+            continue
+    return "/appointments/"
+
+
+def chat_actions(user, message: str, reply: str) -> dict:
+    """Booking / navigation suggestions for a message and its reply."""
     # If user not authenticated, wrap links with a login redirect
-    booking_url = maybe_wrap_with_login(request, booking_url)
-    doctors_url = maybe_wrap_with_login(request, doctors_url)
-    appointments_url = maybe_wrap_with_login(request, appointments_url)
+    booking_url = maybe_wrap_with_login(user, resolve_booking_path())
+    doctors_url = maybe_wrap_with_login(user, resolve_doctors_path())
+    appointments_url = maybe_wrap_with_login(user, resolve_appointments_path())
 
     # Basic booking / navigation action detection
     actions = {
@@ -464,6 +579,69 @@ def chat(request):
         actions["suggest_booking"] = actions["suggest_booking"] or True
         actions["booking_url"] = actions["booking_url"] or booking_url
 
+    return actions
+
+
+def _chat_response(reply: str, actions: dict, rl_remaining: int) -> JsonResponse:
+    response = JsonResponse({"reply": reply, "actions": actions})
+    # Expose remaining quota to client (optional)
+    response["X-RateLimit-Remaining"] = str(rl_remaining)
+    return response
+
+
+@csrf_exempt
+@require_POST
+def chat(request):
+    """
+    POST /chat/
+    payload JSON: { "message": "...", "context": "...", "patient_id": "...", "consent": true }
+    response JSON: { "reply": "...", "actions": { "suggest_booking": bool, "booking_url": "...",
+                                                   "suggest_doctors": bool, "doctors_url": "...",
+                                                   "suggest_view_appointments": bool, "appointments_url": "..." } }
+    """
+    client_ip = get_client_ip(request)
+    rl_limited, rl_remaining = is_rate_limited(client_ip)
+    if rl_limited:
+        return _rate_limited_response(client_ip)
+
+    fields, error = _read_chat_request(request)
+    if error:
+        return error
+    message, context = fields["message"], fields["context"]
+
+    # Redact PHI from the message before any logging or external API calls
+    redacted_message = redact_phi(message)
+    patient_hash = hash_id(fields["patient_id"])
+
+    # minimal structured logging
+    logger.info("chat_request patient_hash=%s ip=%s message_snippet=%s", patient_hash, client_ip, safe_truncate(redacted_message, 200))
+
+    use_gemini = bool(getattr(settings, "USE_GEMINI", False))
+
+    reply = None
+    try:
+        if use_gemini:
+            try:
+                # Send the redacted message to Gemini to avoid sending PHI
+                reply_raw = reply_cache.get(redacted_message, context)
+                if reply_raw is None:
+                    started = time.monotonic()
+                    reply_raw = call_gemini_api(redacted_message, context=context)
+                    reply_cache.put(redacted_message, context, reply_raw, time.monotonic() - started)
+                reply = safe_truncate(reply_raw, MAX_REPLY_LENGTH)
+            except breaker.CircuitOpen:
+                reply = generate_reply_fallback(message, context=context)
+            except Exception as e:
+                logger.exception("Gemini API error, falling back to local generator: %s", e)
+                reply = generate_reply_fallback(message, context=context)
+        else:
+            reply = generate_reply_fallback(message, context=context)
+    except Exception:
+        logger.exception("Error generating reply")
+        reply = "Sorry, I couldn't process that right now. Please try again later."
+
+    actions = chat_actions(request.user, message, reply)
+
     # Save minimal log; ensure we never save raw PHI here. Use redacted_message.
     try:
         ChatLog.objects.create(
@@ -476,8 +654,182 @@ def chat(request):
 
     logger.info("chat_response patient_hash=%s ip=%s reply_snippet=%s", patient_hash, client_ip, safe_truncate(reply, 200))
 
-    response = JsonResponse({"reply": reply, "actions": actions})
-    # Expose remaining quota to client (optional)
+    return _chat_response(reply, actions, rl_remaining)
+
+
+def _admit_async_chat(client_ip: str, redacted_message: Optional[str], context: Optional[str]):
+    """
+    The cache work chat_async does before the model call, in one call so it
+    takes one trip to a worker thread: the rate limit, then for a message to
+    send to the model the reply cache and the circuit breaker. Returns (429
+    response or None, requests remaining, cached reply or None, read timeout
+    or None when the breaker refuses the call).
+    """
+    limited, remaining = is_rate_limited(client_ip)
+    if limited:
+        return _rate_limited_response(client_ip), remaining, None, None
+    if redacted_message is None:
+        return None, remaining, None, None
+    cached = reply_cache.get(redacted_message, context)
+    return None, remaining, cached, None if cached is not None else _breaker_gate()
+
+
+@csrf_exempt
+@require_POST
+async def chat_async(request):
+    """
+    POST /chat/async/ -- chat() for ASGI deployments, same payload and response.
+    The model call, its backoff and the ChatLog write are awaited instead of
+    blocking, so one worker process holds many chats in flight at once.
+    """
+    client_ip = get_client_ip(request)
+    fields, error = _read_chat_request(request)
+    message = context = redacted_message = None
+    if not error:
+        message, context = fields["message"], fields["context"]
+        redacted_message = redact_phi(message)
+
+    use_gemini = bool(getattr(settings, "USE_GEMINI", False))
+
+    limited, rl_remaining, cached, timeout = await sync_to_async(_admit_async_chat, thread_sensitive=False)(
+        client_ip, redacted_message if use_gemini else None, context
+    )
+    if limited:
+        return limited
+    if error:
+        return error
+    patient_hash = hash_id(fields["patient_id"])
+
+    logger.info("chat_request patient_hash=%s ip=%s message_snippet=%s", patient_hash, client_ip, safe_truncate(redacted_message, 200))
+
+    reply = None
+    try:
+        if use_gemini:
+            try:
+                reply_raw = cached
+                if reply_raw is None:
+                    if timeout is None:
+                        raise breaker.CircuitOpen("Gemini circuit is open")
+                    started = time.monotonic()
+                    reply_raw = await acall_gemini_api(redacted_message, context=context, timeout=timeout)
+                    await sync_to_async(reply_cache.put, thread_sensitive=False)(
+                        redacted_message, context, reply_raw, time.monotonic() - started
+                    )
+                reply = safe_truncate(reply_raw, MAX_REPLY_LENGTH)
+            except breaker.CircuitOpen:
+                reply = generate_reply_fallback(message, context=context)
+            except Exception as e:
+                logger.exception("Gemini API error, falling back to local generator: %s", e)
+                reply = generate_reply_fallback(message, context=context)
+        else:
+            reply = generate_reply_fallback(message, context=context)
+    except Exception:
+        logger.exception("Error generating reply")
+        reply = "Sorry, I couldn't process that right now. Please try again later."
+
+    # request.user would query the session synchronously
+    actions = chat_actions(await request.auser(), message, reply)
+
+    try:
+        await ChatLog.objects.acreate(
+            patient_hash=patient_hash,
+            message=safe_truncate(redacted_message, 2000),
+            reply=safe_truncate(reply, 4000),
+        )
+    except Exception:
+        logger.exception("Could not save chat log")
+
+    logger.info("chat_response patient_hash=%s ip=%s reply_snippet=%s", patient_hash, client_ip, safe_truncate(reply, 200))
+
+    return _chat_response(reply, actions, rl_remaining)
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@csrf_exempt
+@require_POST
+def chat_stream(request):
+    """
+    POST /chat/stream/ -- chat() with the reply streamed as server-sent events.
+    Same payload; validation and rate-limit errors are the same JSON responses.
+    events: "delta" {"text": "..."} for each piece of the reply, then "done"
+    {"reply": "...", "actions": {...}} with the whole (redacted, length-limited)
+    reply. The ChatLog row is written when the stream ends.
+    """
+    client_ip = get_client_ip(request)
+    rl_limited, rl_remaining = is_rate_limited(client_ip)
+    if rl_limited:
+        return _rate_limited_response(client_ip)
+
+    fields, error = _read_chat_request(request)
+    if error:
+        return error
+    message, context = fields["message"], fields["context"]
+    redacted_message = redact_phi(message)
+    patient_hash = hash_id(fields["patient_id"])
+    user = request.user
+
+    logger.info("chat_stream_request patient_hash=%s ip=%s message_snippet=%s", patient_hash, client_ip, safe_truncate(redacted_message, 200))
+
+    def pieces():
+        if bool(getattr(settings, "USE_GEMINI", False)):
+            try:
+                cached = reply_cache.get(redacted_message, context)
+                if cached is not None:
+                    yield cached
+                    return
+                # Send the redacted message to Gemini to avoid sending PHI
+                started = time.monotonic()
+                reply = yield from stream_gemini_api(redacted_message, context=context)
+                if reply is not None:
+                    reply_cache.put(redacted_message, context, reply, time.monotonic() - started)
+                return
+            except breaker.CircuitOpen:
+                pass
+            except Exception as e:
+                logger.exception("Gemini API error, falling back to local generator: %s", e)
+        yield generate_reply_fallback(message, context=context)
+
+    def events():
+        redactor = StreamRedactor(MAX_REPLY_LENGTH)
+        parts = []
+        source = pieces()
+        try:
+            for piece in source:
+                text = redactor.feed(piece)
+                if text:
+                    parts.append(text)
+                    yield _sse("delta", {"text": text})
+                if redactor.truncated:
+                    break
+            text = redactor.finish()
+            if text:
+                parts.append(text)
+                yield _sse("delta", {"text": text})
+            reply = "".join(parts)
+            yield _sse("done", {"reply": reply, "actions": chat_actions(user, message, reply)})
+        except Exception:
+            logger.exception("Error streaming reply")
+            yield _sse("error", {"error": "stream_failed", "message": "Sorry, I couldn't process that right now. Please try again later."})
+        finally:
+            # also reached when the client goes away mid-stream; stop reading upstream
+            source.close()
+            reply = "".join(parts)
+            try:
+                ChatLog.objects.create(
+                    patient_hash=patient_hash,
+                    message=safe_truncate(redacted_message, 2000),
+                    reply=safe_truncate(reply, 4000),
+                )
+            except Exception:
+                logger.exception("Could not save chat log")
+            logger.info("chat_stream_response patient_hash=%s ip=%s reply_snippet=%s", patient_hash, client_ip, safe_truncate(reply, 200))
+
+    response = StreamingHttpResponse(events(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # keep nginx from buffering the stream
     response["X-RateLimit-Remaining"] = str(rl_remaining)
     return response
 
@@ -7,11 +7,15 @@ urlpatterns = [
     path('appointment-types/create/', views.appointment_type_create, name='appointment_type_create'),
     path('appointment-types/edit/<int:pk>/', views.appointment_type_edit, name='appointment_type_edit'),
     path('appointment/<int:id>/', views.appointment_detail, name='appointment_detail'),
+    path('appointments/import/', views.appointment_import, name='appointment_import'),
+    path('appointments/export/', views.appointment_export, name='appointment_export'),
     path('doctors/', views.doctor_list, name='doctor_list'),
     path('doctors/create/', views.doctor_create, name='doctor_create'),
     path('doctors/edit/<int:pk>/', views.doctor_edit, name='doctor_edit'),
     path('staff_reports/', views.reports_view, name='reports-view'),
+    path('staff_reports/data/', views.report_data, name='report_data'),
     path('staff_reports/download/<str:report_type>/', views.download_report, name='download_report'),
+    path('availability-cache/stats/', views.availability_cache_stats, name='availability_cache_stats'),
 
     # Notification URLs
     path('notifications/', views.staff_notification_dashboard, name='notification_dashboard'),
@@ -1,34 +1,55 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from booking.models import Appointment, AppointmentType, Doctor, Notification
-from booking.forms import AppointmentTypeForm, DoctorForm, ReportForm, NotificationForm
+from booking.models import Appointment, AppointmentSeries, AppointmentType, Doctor, Notification
+from booking.forms import AppointmentTypeForm, DoctorForm, ReportForm, ReportFilterForm, NotificationForm
+from booking import availability_cache, recurrence, report_jobs, report_stats
+from booking.views import report_job_response
+from booking.bulk_import import import_appointments
+from booking import export
 from django.contrib.auth.models import User
-from datetime import timedelta
+from datetime import date, timedelta
 from django.utils import timezone
 from django.contrib.admin.views.decorators import staff_member_required
 from django.template.loader import render_to_string
-from weasyprint import HTML
-from django.http import HttpResponse, JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
+from django.core.paginator import Paginator
 from django.db.models import Q
 from django.views.decorators.http import require_POST
 import logging
+from operator import attrgetter
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
+SERIES_WINDOW_DAYS = 30
+
 @staff_member_required 
 def staff_view(request):
     current_date = timezone.now().date()
     current_time = timezone.now().time()
 
-    bookings = Appointment.objects.all()
+    bookings = Appointment.objects.select_related('user', 'doctor__user', 'appointment_type')
     past_date = current_date - timedelta(days=1)
     tomorrow_date = current_date + timedelta(days=1)
 
-    today_bookings = bookings.filter(appointment_date=current_date).order_by('appointment_time')
-    tomorrow_bookings = bookings.filter(appointment_date=tomorrow_date).order_by('appointment_time')
-    other_bookings = bookings.exclude(appointment_date__in=[past_date, current_date, tomorrow_date]).order_by('appointment_date', 'appointment_time')
+    # recurring series only show their occurrences within the next SERIES_WINDOW_DAYS
+    occurrences = recurrence.expand(AppointmentSeries.objects.all(), current_date, current_date + timedelta(days=SERIES_WINDOW_DAYS))
+    by_date_time = attrgetter('appointment_date', 'appointment_time')
+
+    today_bookings = sorted(
+        [*bookings.filter(appointment_date=current_date), *(o for o in occurrences if o.appointment_date == current_date)], key=by_date_time
+    )
+    tomorrow_bookings = sorted(
+        [*bookings.filter(appointment_date=tomorrow_date), *(o for o in occurrences if o.appointment_date == tomorrow_date)], key=by_date_time
+    )
+    other_bookings = sorted(
+        [
+            *bookings.exclude(appointment_date__in=[past_date, current_date, tomorrow_date]),
+            *(o for o in occurrences if o.appointment_date > tomorrow_date),
+        ],
+        key=by_date_time,
+    )
 
     context = {
         'today_bookings': today_bookings,
@@ -39,6 +60,51 @@ def staff_view(request):
 
     return render(request, 'staff.html', context)
 
+@staff_member_required
+def availability_cache_stats(request):
+    return JsonResponse(availability_cache.stats())
+
+@staff_member_required
+def appointment_import(request):
+    result = None
+    error = None
+    if request.method == 'POST':
+        upload = request.FILES.get('file')
+        if not upload:
+            error = "Choose a CSV or NDJSON file to import."
+        else:
+            fmt = request.POST.get('format') or ('ndjson' if upload.name.endswith(('.ndjson', '.jsonl')) else 'csv')
+            try:
+                result = import_appointments(upload, fmt).as_dict()
+            except ValueError as e:
+                error = str(e)
+        if request.headers.get('Accept') == 'application/json':
+            if error:
+                return JsonResponse({'error': error}, status=400)
+            return JsonResponse(result)
+    return render(request, 'appointments/import_appointments.html', {'result': result, 'error': error})
+
+@staff_member_required
+def appointment_export(request):
+    """
+    Stream appointments as CSV or NDJSON (?format=), optionally limited to
+    ?start= and ?end= dates (YYYY-MM-DD) and a ?doctor= id.
+    """
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in export.FORMATS:
+        return HttpResponse('Invalid export format', status=400)
+    try:
+        start = date.fromisoformat(request.GET['start']) if request.GET.get('start') else None
+        end = date.fromisoformat(request.GET['end']) if request.GET.get('end') else None
+        doctor_id = int(request.GET['doctor']) if request.GET.get('doctor') else None
+    except ValueError:
+        return HttpResponse('Invalid date or doctor filter', status=400)
+    response = StreamingHttpResponse(
+        export.stream(fmt, export.appointments(start, end, doctor_id)), content_type=export.FORMATS[fmt]
+    )
+    response['Content-Disposition'] = f'attachment; filename="appointments.{fmt}"'
+    return response
+
 def appointment_type_list(request):
     appointment_types = AppointmentType.objects.all()
     return render(request, 'appointments/appointments_types.html', {'appointment_types': appointment_types})
@@ -102,8 +168,7 @@ def reports_view(request):
         form = ReportForm(request.POST)
         if form.is_valid():
             report_type = form.cleaned_data['report_type']
-            appointments = get_appointments(report_type)
-            report_html = render_to_string(f'reports/{report_type}_report.html', {'appointments': appointments})
+            report_html = render_to_string(f'reports/{report_type}_report.html', report_stats.report_context(report_type))
     else:
         form = ReportForm()
 
@@ -113,30 +178,42 @@ def reports_view(request):
         'report_type': report_type,
     })
 
-def get_appointments(report_type):
-    now = timezone.now()
-    if report_type == 'weekly':
-        week_start = now - timezone.timedelta(days=7)
-        return Appointment.objects.filter(appointment_date__gte=week_start.date())
-    elif report_type == 'monthly':
-        month_start = now.replace(day=1)
-        return Appointment.objects.filter(appointment_date__gte=month_start.date())
-    elif report_type == 'yearly':
-        year_start = now.replace(month=1, day=1)
-        return Appointment.objects.filter(appointment_date__gte=year_start.date())
-    return Appointment.objects.none()
-
-def generate_pdf_response(html_string, filename):
-    html = HTML(string=html_string)
-    pdf = html.write_pdf()
-    response = HttpResponse(pdf, content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    return response
+REPORT_PAGE_SIZE = 100
 
+@staff_member_required
+def report_data(request):
+    """
+    JSON report for any date range and doctor, type and status filters:
+    cached aggregates plus one ?page= of the matching appointments.
+    """
+    form = ReportFilterForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+    filters = form.filters()
+    page = Paginator(filters.appointments(), REPORT_PAGE_SIZE).get_page(request.GET.get('page'))
+    return JsonResponse({
+        **report_stats.aggregates(filters),
+        'page': page.number,
+        'pages': page.paginator.num_pages,
+        'appointments': [
+            {
+                'id': appt.pk,
+                'patient': appt.user.username,
+                'doctor': appt.doctor.user.username,
+                'type': appt.appointment_type.name,
+                'date': appt.appointment_date.isoformat(),
+                'time': appt.appointment_time.strftime('%H:%M'),
+                'status': appt.status,
+            }
+            for appt in page
+        ],
+    })
+
+@login_required
 def download_report(request, report_type):
-    appointments = get_appointments(report_type)
-    html_string = render_to_string(f'reports/{report_type}_report.html', {'appointments': appointments})
-    return generate_pdf_response(html_string, f'{report_type}_report.pdf')
+    if report_type not in report_stats.REPORT_TYPES:
+        return HttpResponse('Invalid report type', status=400)
+    return report_job_response(request, report_jobs.request(report_type, user=request.user))
 
 
 